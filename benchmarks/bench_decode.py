@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer import codec
+
+
+def decode_all(c: codec.Codec, frames: List[bytes]) -> None:
+    for frame in frames:
+        c.loads(frame)
+
+
+def run() -> List[BenchmarkResult]:
+    results = []
+
+    streams = [
+        ("deltas", encode_stream(create_stream(markets=100, deltas=20000))[100:]),
+        ("images", encode_stream(create_stream(markets=500, deltas=0, image_levels=100))),
+    ]
+
+    for name, frames in streams:
+        for codec_name in codec.available_codecs():
+            c = codec.CODECS[codec_name]
+            results.append(measure(f"decode {codec_name} {name}", len(frames), lambda: decode_all(c, frames)))
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import bz2
+import os
+import tempfile
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.historical.exporter import export_market_series, load_market_series
+from betfairstreamer.historical.reader import read_historical_messages
+from betfairstreamer.models.market_cache import MarketCache
+
+
+def replay(path: str) -> None:
+    # What every analysis pays without an export, decode and apply the whole stream.
+    market_cache = MarketCache()
+
+    for message in read_historical_messages(path):
+        market_cache.update(message)  # type: ignore
+
+
+def load(paths: List[str]) -> None:
+    for path in paths:
+        series = load_market_series(path)
+        series.best_offers.sum()
+
+
+def run() -> List[BenchmarkResult]:
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stream.bz2")
+
+        with bz2.open(path, "wb") as f:
+            f.write(b"\n".join(encode_stream(create_stream(markets=10, deltas=20000))))
+
+        results.append(measure("replay historical stream", 20010, lambda: replay(path), repeat=1))
+
+        for fmt in ["npz", "npy"]:
+            written = export_market_series([path], os.path.join(directory, fmt), fmt=fmt)
+            paths = list(written.values())
+
+            results.append(measure(f"load_market_series {fmt}", 20010, lambda: load(paths)))
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import bz2
+import os
+import tempfile
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer import codec
+from betfairstreamer.historical.reader import open_historical_file, read_historical_batches, read_historical_messages
+
+
+def readlines(path: str) -> None:
+    # The documented recipe, decompress the whole file, then decode line by line.
+    loads = codec.get_codec().loads
+
+    for line in open_historical_file(path).readlines():
+        loads(line)
+
+
+def read_messages(path: str) -> None:
+    for _ in read_historical_messages(path):
+        pass
+
+
+def read_batches(path: str) -> None:
+    for _ in read_historical_batches(path):
+        pass
+
+
+def run() -> List[BenchmarkResult]:
+    lines = encode_stream(create_stream(markets=100, deltas=50000))
+    data = b"\n".join(lines) + b"\n"
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, write in [("plain", open), ("bz2", bz2.open)]:
+            path = os.path.join(directory, f"stream.{name}")
+
+            with write(path, "wb") as f:  # type: ignore
+                f.write(data)
+
+            results += [
+                measure(f"{name} readlines + loads", len(lines), lambda: readlines(path)),
+                measure(f"{name} read_historical_messages", len(lines), lambda: read_messages(path)),
+                measure(f"{name} read_historical_batches", len(lines), lambda: read_batches(path)),
+            ]
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
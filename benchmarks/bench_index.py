@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import bz2
+import os
+import tempfile
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.historical.index import HistoricalIndex
+from betfairstreamer.historical.reader import read_historical_messages
+
+MARKET_ID = "1.25"
+
+
+def create_markets(markets: int, deltas: int) -> bytes:
+    # Markets one after another, like a day of racing in one file.
+    lines = []
+
+    for i in range(markets):
+        messages = create_stream(markets=1, deltas=deltas, seed=i)
+
+        for message in messages:
+            for market_change in message["mc"]:
+                market_change["id"] = f"1.{i}"
+
+        lines += encode_stream(messages)
+
+    return b"\n".join(lines) + b"\n"
+
+
+def scan(path: str) -> None:
+    # Without an index every message is decoded to find the market.
+    for message in read_historical_messages(path):
+        [mc for mc in message.get("mc", []) if mc["id"] == MARKET_ID]
+
+
+def replay(index: HistoricalIndex) -> None:
+    for _ in index.replay([MARKET_ID]):
+        pass
+
+
+def run() -> List[BenchmarkResult]:
+    data = create_markets(markets=50, deltas=1000)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, write in [("plain", open), ("bz2", bz2.open)]:
+            path = os.path.join(directory, f"stream.{name}")
+
+            with write(path, "wb") as f:  # type: ignore
+                f.write(data)
+
+            index = HistoricalIndex.build([path])
+            messages = index.markets[MARKET_ID].messages
+
+            results += [
+                measure(f"{name} scan for one market", messages, lambda: scan(path), repeat=1),
+                measure(f"{name} HistoricalIndex.replay one market", messages, lambda: replay(index), repeat=1),
+            ]
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import random
+from test.generators import generate_full_price_ladder, market_definition_generator
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from benchmarks.common import BenchmarkResult, draw_examples, measure, report
+from benchmarks.synthetic import create_market_delta, create_market_image
+from betfairstreamer.models.market_book import BETFAIR_TICKS, FULL_PRICE_LADDER_INDEX, MarketBook, update_ladder
+
+FIELD_MIXES: List[Sequence[str]] = [("bdatb",), ("atb",), ("trd",), ("bdatb", "atb", "trd")]
+
+
+def create_generated_images(count: int) -> List[Dict[str, Any]]:
+    # Market definitions and full price ladders drawn from the hypothesis generators in test/generators.py.
+    market_definitions = draw_examples(market_definition_generator(), count)
+    ladders = draw_examples(generate_full_price_ladder(), 200)
+    images = []
+
+    for i, market_definition in enumerate(market_definitions):
+        rc = []
+
+        for j, runner in enumerate(market_definition["runners"]):
+            back, lay = ladders[(i + j) % len(ladders)]
+            rc.append({"id": runner["id"], "atb": back, "atl": lay})
+
+        images.append({"id": "1." + str(i), "img": True, "marketDefinition": market_definition, "rc": rc})
+
+    return images
+
+
+def create_all(images: List[Dict[str, Any]]) -> None:
+    for image in images:
+        MarketBook.create_new_market_book(image)  # type: ignore
+
+
+def update_all(market_book: MarketBook, deltas: List[Dict[str, Any]]) -> None:
+    for delta in deltas:
+        market_book.update(delta)  # type: ignore
+
+
+def update_ladder_per_level(ladder: np.ndarray, levels: List[List[float]]) -> None:
+    # The per level dict lookup update_ladder replaced, as a baseline.
+    for u in levels:
+        if u[1] == 0:
+            ladder[FULL_PRICE_LADDER_INDEX[u[0]], :] = 0
+        else:
+            ladder[FULL_PRICE_LADDER_INDEX[u[0]], :] = u
+
+
+def update_ladders(update: Any, ladder: np.ndarray, updates: List[List[List[float]]]) -> None:
+    for levels in updates:
+        update(ladder, levels)
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    results = []
+
+    for levels in [10, 100, 350]:
+        images = [
+            create_market_image(rng, "1." + str(i), 10, ("bdatb", "atb", "trd"), levels) for i in range(200)
+        ]
+        results.append(measure(f"create_new_market_book {levels} levels", len(images), lambda: create_all(images)))
+
+    generated = create_generated_images(200)
+    results.append(measure("create_new_market_book generated", len(generated), lambda: create_all(generated)))
+
+    for fields in FIELD_MIXES:
+        for levels in [2, 40]:
+            image = create_market_image(rng, "1.1", 10, fields, 40)
+            deltas = [create_market_delta(rng, "1.1", 10, fields, levels) for _ in range(10000 // levels * 2)]
+            market_book = MarketBook.create_new_market_book(image)  # type: ignore
+
+            results.append(
+                measure(
+                    f"MarketBook.update {'/'.join(fields)} {levels} levels",
+                    len(deltas),
+                    lambda: update_all(market_book, deltas),
+                )
+            )
+
+    # Images clear some levels of a full ladder, deltas change a few levels.
+    for levels in [2, 40, 350]:
+        ladder = np.zeros((len(BETFAIR_TICKS), 2))
+        updates = [
+            [[BETFAIR_TICKS[t], rng.choice([0, round(rng.uniform(2, 500), 2)])] for t in rng.sample(range(350), levels)]
+            for _ in range(200000 // levels)
+        ]
+
+        for name, update in [("update_ladder", update_ladder), ("per level", update_ladder_per_level)]:
+            results.append(
+                measure(f"{name} {levels} levels", len(updates), lambda: update_ladders(update, ladder, updates))
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
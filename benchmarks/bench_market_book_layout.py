@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_delta, create_market_image
+from betfairstreamer.models.market_book import COMPACT_LAYOUT, FULL_LAYOUT, MarketBookLayout
+from betfairstreamer.models.market_cache import MarketCache
+
+LAYOUTS = {
+    "full": FULL_LAYOUT,
+    "compact float64": MarketBookLayout(compact=True),
+    "compact float32": COMPACT_LAYOUT,
+}
+
+
+def create_market_cache(layout: MarketBookLayout, images: List[Dict[str, Any]]) -> MarketCache:
+    market_cache = MarketCache(layout=layout)
+    market_cache.update({"op": "mcm", "pt": 1, "mc": images})  # type: ignore
+
+    return market_cache
+
+
+def update_all(market_cache: MarketCache, deltas: List[Dict[str, Any]]) -> None:
+    for delta in deltas:
+        market_cache.update(delta)  # type: ignore
+
+
+def expand_all(market_cache: MarketCache) -> None:
+    for market_book in market_cache.market_books.values():
+        market_book.get_full_price_ladder()
+        market_book.get_trd()
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    fields = ("bdatb", "atb", "trd")
+    images = [create_market_image(rng, "1." + str(i), 15, fields, 40) for i in range(300)]
+    deltas = [
+        {"op": "mcm", "pt": 2 + i, "mc": [create_market_delta(rng, "1." + str(rng.randrange(300)), 15, fields, 2)]}
+        for i in range(10000)
+    ]
+    results = []
+
+    for name, layout in LAYOUTS.items():
+        market_cache = create_market_cache(layout, images)
+        ladder_bytes = sum(m.full_price_ladder.nbytes + m.trd.nbytes for m in market_cache.market_books.values())
+        kilobytes = ladder_bytes // len(images) // 1024
+
+        results += [
+            measure(f"{name} create ({kilobytes} KB/market)", len(images), lambda: create_market_cache(layout, images)),
+            measure(f"{name} update", len(deltas), lambda: update_all(market_cache, deltas)),
+            measure(f"{name} MarketCache.serialise_bytes", len(images), market_cache.serialise_bytes),
+            measure(f"{name} get_full_price_ladder + get_trd", len(images), lambda: expand_all(market_cache)),
+        ]
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+from typing import List
+
+import zmq
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_image
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.stream.market_book_publisher import MarketBookPublisher, MarketBookSubscriber
+
+
+def json_round_trip(market_books: List[MarketBook]) -> None:
+    # What a subscriber pays today, serialise to JSON, decode and rebuild the MarketBook.
+    for market_book in market_books:
+        MarketBook.create_new_market_book(codec.loads(codec.dumps(market_book.serialise())))
+
+
+def binary_round_trip(
+    publisher: MarketBookPublisher, subscriber: MarketBookSubscriber, market_books: List[MarketBook]
+) -> None:
+    for market_book in market_books:
+        publisher.publish(market_book, 1)
+        subscriber.receive()
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    market_books = [
+        MarketBook.create_new_market_book(create_market_image(rng, "1." + str(i), 10, ("bdatb", "atb", "trd"), 40))
+        for i in range(500)
+    ]
+
+    context = zmq.Context()
+    publisher = MarketBookPublisher.create_publisher(context, "inproc://bench-market-books")
+    subscriber = MarketBookSubscriber.create_subscriber(context, "inproc://bench-market-books")
+
+    while True:
+        publisher.publish(market_books[0], 0)
+
+        if subscriber.poll(10):
+            break
+
+    while subscriber.poll(10):
+        subscriber.receive()
+
+    results = [
+        measure("MarketBook JSON serialise/decode", len(market_books), lambda: json_round_trip(market_books)),
+        measure(
+            "MarketBookPublisher/Subscriber",
+            len(market_books),
+            lambda: binary_round_trip(publisher, subscriber, market_books),
+        ),
+    ]
+
+    context.destroy(linger=0)
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
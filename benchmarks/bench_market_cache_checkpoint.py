@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+import random
+import tempfile
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_image
+from betfairstreamer import codec
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.market_cache_checkpoint import load_checkpoint, save_checkpoint
+
+
+def restore_serialised(data: bytes) -> None:
+    # The existing persistence, MarketCache.serialise as JSON and a replay of the images.
+    MarketCache().update(codec.loads(data))
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    images = [create_market_image(rng, "1." + str(i), 10, ("bdatb", "atb", "trd"), 40) for i in range(500)]
+
+    market_cache = MarketCache()
+    market_cache.update({"op": "mcm", "clk": "1", "pt": 1, "mc": images})  # type: ignore
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "market_cache.bin")
+        serialised = codec.dumps(market_cache.serialise())
+
+        results = [
+            measure("MarketCache.serialise + dumps", len(images), lambda: codec.dumps(market_cache.serialise())),
+            measure("loads + replay serialised images", len(images), lambda: restore_serialised(serialised)),
+            measure("save_checkpoint", len(images), lambda: save_checkpoint(market_cache, path)),
+            measure("load_checkpoint mmap", len(images), lambda: load_checkpoint(path)),
+            measure("load_checkpoint read", len(images), lambda: load_checkpoint(path, use_mmap=False)),
+        ]
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
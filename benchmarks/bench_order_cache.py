@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_order_stream
+from betfairstreamer.models.order_cache import OrderCache
+
+
+def update_all(messages: List[Dict[str, Any]]) -> None:
+    order_cache = OrderCache()
+
+    for message in messages:
+        order_cache.update(message)  # type: ignore
+
+
+def run() -> List[BenchmarkResult]:
+    results = []
+
+    for orders in [100, 10000]:
+        messages = create_order_stream(orders=orders, updates=20000)
+        results.append(measure(f"OrderCache.update {orders} orders", len(messages), lambda: update_all(messages)))
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
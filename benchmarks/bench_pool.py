@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import socket
+import threading
+import time
+from typing import List
+
+from benchmarks.common import BenchmarkResult, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+
+
+def send_all(peer: socket.socket, data: bytes) -> None:
+    peer.sendall(data)
+
+
+def pool_to_cache(frames: List[bytes], repeat: int = 3) -> BenchmarkResult:
+    # A sender thread writes the encoded stream into a socket pair, the pool reads, decodes and updates a MarketCache.
+    data = b"".join(frame + b"\r\n" for frame in frames)
+    best = float("inf")
+
+    for _ in range(repeat):
+        s1, s2 = socket.socketpair()
+        connection_pool = BetfairConnectionPool(timeout=1000)
+        connection_pool.add_connection(BetfairConnection(connection=s1, app_key=""))
+        market_cache = MarketCache()
+
+        sender = threading.Thread(target=send_all, args=(s2, data))
+
+        start = time.perf_counter()
+        sender.start()
+        received = 0
+
+        for batch in connection_pool.read_batches(market_cache=market_cache):
+            received += sum(len(messages) for messages in batch.messages.values())
+
+            if received >= len(frames):
+                break
+
+        best = min(best, time.perf_counter() - start)
+
+        sender.join()
+        connection_pool.close()
+        s2.close()
+
+    return BenchmarkResult(name="BetfairConnectionPool to MarketCache", operations=len(frames), seconds=best)
+
+
+def run() -> List[BenchmarkResult]:
+    return [pool_to_cache(encode_stream(create_stream(markets=100, deltas=50000)))]
+
+
+if __name__ == "__main__":
+    report(run())
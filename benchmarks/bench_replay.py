@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import bz2
+import os
+import tempfile
+from typing import List, Optional
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.historical.replay import replay_files
+from betfairstreamer.models.market_book import MarketBook
+
+
+def ignore_market_book(market_book: MarketBook) -> Optional[float]:
+    return None
+
+
+def create_files(directory: str, files: int, deltas: int) -> List[str]:
+    paths = []
+
+    for i in range(files):
+        path = os.path.join(directory, f"{i}.bz2")
+
+        with bz2.open(path, "wb") as f:
+            f.write(b"\n".join(encode_stream(create_stream(markets=1, deltas=deltas, seed=i))) + b"\n")
+
+        paths.append(path)
+
+    return paths
+
+
+def replay(paths: List[str], processes: Optional[int]) -> None:
+    for result in replay_files(paths, ignore_market_book, processes=processes):
+        assert result.ok, result.error
+
+
+def run() -> List[BenchmarkResult]:
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = create_files(directory, files=16, deltas=2000)
+        messages = len(paths) * 2001
+
+        for processes in [0, os.cpu_count() or 1]:
+            results.append(
+                measure(f"replay_files, processes={processes}", messages, lambda: replay(paths, processes), repeat=1)
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
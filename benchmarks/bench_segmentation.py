@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import copy
+import random
+from typing import Any, Dict, List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_image
+from betfairstreamer.models.betfair_api import SegmentMode
+from betfairstreamer.models.market_cache import MarketCache
+
+
+def create_segmented_image(markets: int, markets_per_segment: int, number_of_runners: int) -> List[Dict[str, Any]]:
+    rng = random.Random(0)
+    images = [
+        create_market_image(rng, "1." + str(170000000 + i), number_of_runners, ("bdatb", "atb", "trd"), 40)
+        for i in range(markets)
+    ]
+    segments = [images[i : i + markets_per_segment] for i in range(0, len(images), markets_per_segment)]
+
+    messages = []
+
+    for i, mc in enumerate(segments):
+        segment_type = "SEG_START" if i == 0 else "SEG_END" if i == len(segments) - 1 else "SEG"
+        messages.append({"op": "mcm", "id": 1, "ct": "SUB_IMAGE", "pt": i + 1, "segmentType": segment_type, "mc": mc})
+
+    return messages
+
+
+def apply_all(market_cache: MarketCache, messages: List[Dict[str, Any]]) -> None:
+    for message in messages:
+        market_cache.update(message)  # type: ignore
+
+
+def run() -> List[BenchmarkResult]:
+    results = []
+
+    for markets in [100, 1000]:
+        segmented = create_segmented_image(markets, markets_per_segment=50, number_of_runners=10)
+        unsegmented = copy.deepcopy(segmented)
+
+        for message in unsegmented:
+            del message["segmentType"]
+
+        for name, messages, segment_mode in [
+            ("unsegmented", unsegmented, SegmentMode.BUFFER),
+            ("BUFFER", segmented, SegmentMode.BUFFER),
+            ("EAGER", segmented, SegmentMode.EAGER),
+        ]:
+            results.append(
+                measure(
+                    f"MarketCache {name} {markets} market image",
+                    markets,
+                    lambda: apply_all(MarketCache(segment_mode=segment_mode), messages),
+                )
+            )
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
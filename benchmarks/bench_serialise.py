@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_image
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+
+
+def serialise_per_runner(market_book: MarketBook) -> Dict[str, Any]:
+    # The previous MarketBook.serialise, masks and tolist per runner and side.
+    rcs = []
+
+    for selection_id, sort_priority in market_book.sort_priority_mapping.items():
+        i = sort_priority - 1
+        fpl = market_book.full_price_ladder
+
+        rcs.append(
+            {
+                "id": selection_id,
+                "bdatb": [[j] + v for j, v in enumerate(market_book.best_display[i, 0, :, :].tolist())],
+                "bdatl": [[j] + v for j, v in enumerate(market_book.best_display[i, 1, :, :].tolist())],
+                "batb": [[j] + v for j, v in enumerate(market_book.best_offers[i, 0, :, :].tolist())],
+                "batl": [[j] + v for j, v in enumerate(market_book.best_offers[i, 1, :, :].tolist())],
+                "atb": fpl[i, 0, fpl[i, 0, :, 1] > 0, :].tolist(),
+                "atl": fpl[i, 1, fpl[i, 1, :, 1] > 0, :].tolist(),
+                "trd": market_book.trd[i, market_book.trd[i, :, 1] > 0, :].tolist(),
+                "ltp": market_book.metadata[i, 0],
+                "tv": market_book.metadata[i, 1],
+            }
+        )
+
+    return {"img": True, "marketDefinition": market_book.market_definition, "id": market_book.market_id, "rc": rcs}
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    fields = ("bdatb", "batb", "atb", "atl", "trd")
+    images = [create_market_image(rng, "1." + str(i), 10, fields, 40) for i in range(2000)]
+
+    market_cache = MarketCache()
+    market_cache.update({"op": "mcm", "pt": 1, "mc": images})  # type: ignore
+
+    market_books = list(market_cache.market_books.values())
+    n = len(market_books)
+
+    return [
+        measure("per runner serialise", n, lambda: [serialise_per_runner(m) for m in market_books], repeat=1),
+        measure("MarketBook.serialise", n, lambda: [m.serialise() for m in market_books], repeat=1),
+        measure("dumps(MarketCache.serialise())", n, lambda: codec.dumps(market_cache.serialise()), repeat=1),
+        measure("MarketCache.serialise_bytes", n, market_cache.serialise_bytes, repeat=1),
+    ]
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import List
+
+from benchmarks.common import BenchmarkResult, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.stream.sharded_pipeline import ShardedMarketProcessor
+
+
+def noop(market_books: List[MarketBook]) -> None:
+    pass
+
+
+def run_shards(shards: int, frames: List[bytes]) -> BenchmarkResult:
+    processor = ShardedMarketProcessor(shards=shards, handler=noop)
+    processor.start()
+
+    start = time.perf_counter()
+
+    for frame in frames:
+        processor.route(frame)
+
+    statistics = processor.stop()
+    seconds = time.perf_counter() - start
+
+    assert sum(s.messages for s in statistics) >= len(frames)
+
+    return BenchmarkResult(name=f"ShardedMarketProcessor {shards} shards", operations=len(frames), seconds=seconds)
+
+
+def run() -> List[BenchmarkResult]:
+    frames = encode_stream(create_stream(markets=200, deltas=50000))
+
+    return [run_shards(shards, frames) for shards in [1, 2, 4, 8] if shards <= (os.cpu_count() or 1) * 2]
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import random
+from typing import List
+
+from benchmarks.common import BenchmarkResult, measure, report
+from benchmarks.synthetic import create_market_image
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.shared_market_store import SharedMarketStore
+
+
+def read_versions(reader: SharedMarketStore, market_ids: List[str]) -> None:
+    for market_id in market_ids:
+        reader.version(market_id)
+
+
+def read_snapshots(reader: SharedMarketStore, market_ids: List[str]) -> None:
+    for market_id in market_ids:
+        reader.snapshot(market_id)
+
+
+def run() -> List[BenchmarkResult]:
+    rng = random.Random(0)
+    images = [create_market_image(rng, "1." + str(i), 10, ("bdatb", "atb", "trd"), 40) for i in range(500)]
+    market_ids = [image["id"] for image in images]
+
+    store = SharedMarketStore.create(capacity=len(images))
+    market_cache = MarketCache(market_store=store)
+    for image in images:
+        market_cache.apply({"op": "mcm", "pt": 1, "mc": [image]})  # type: ignore
+
+    reader = SharedMarketStore.attach(store.name)
+    read_snapshots(reader, market_ids)
+
+    results = [
+        measure("SharedMarketStore version", len(market_ids), lambda: read_versions(reader, market_ids)),
+        measure("SharedMarketStore snapshot", len(market_ids), lambda: read_snapshots(reader, market_ids)),
+    ]
+
+    reader.close()
+    store.unlink()
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+from test.generators import generate_message
+from typing import List
+
+from benchmarks.common import BenchmarkResult, draw_examples, measure, report
+from benchmarks.synthetic import create_stream, encode_stream
+from betfairstreamer.models.market_book import BETFAIR_TICKS
+from betfairstreamer.stream.stream_parser import BufferParser, Parser
+
+
+def create_image_frame(number_of_runners: int, target_size: int) -> bytes:
+    mc = []
+    market_index = 0
+
+    while True:
+        rc = [
+            {
+                "id": selection_id,
+                "atb": [[p, 10.0 + i] for i, p in enumerate(BETFAIR_TICKS[:175])],
+                "atl": [[p, 12.0 + i] for i, p in enumerate(BETFAIR_TICKS[175:])],
+                "trd": [[p, 100.0 + i] for i, p in enumerate(BETFAIR_TICKS)],
+            }
+            for selection_id in range(number_of_runners)
+        ]
+        mc.append({"id": "1." + str(market_index), "img": True, "rc": rc})
+        market_index += 1
+
+        frame = json.dumps({"op": "mcm", "id": 1, "clk": "AAAA", "pt": 1, "ct": "SUB_IMAGE", "mc": mc}).encode()
+
+        if len(frame) >= target_size:
+            return frame + b"\r\n"
+
+
+def fragment(data: bytes, size: int) -> List[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def parse_all(parser_factory: type, parts: List[bytes]) -> None:
+    parser = parser_factory()
+
+    for part in parts:
+        parser.parse_message(part)
+
+
+def parse_all_frames(parts: List[bytes]) -> None:
+    parser = BufferParser()
+
+    for part in parts:
+        parser.parse_frames(part)
+
+
+def run_fragmented() -> List[BenchmarkResult]:
+    results = []
+
+    stream = b"".join(frame + b"\r\n" for frame in encode_stream(create_stream(markets=100, deltas=20000)))
+    generated = b"".join(data for _, data, _ in draw_examples(generate_message(), 200))
+
+    for name, data, frames in [("stream", stream, 20100), ("generated", generated, generated.count(b"\r\n"))]:
+        for size in [1500, 8192, 65536]:
+            parts = fragment(data, size)
+
+            results.append(
+                measure(f"Parser.parse_message {name} {size} B parts", frames, lambda: parse_all(Parser, parts))
+            )
+            results.append(
+                measure(
+                    f"BufferParser.parse_message {name} {size} B parts",
+                    frames,
+                    lambda: parse_all(BufferParser, parts),
+                )
+            )
+
+    return results
+
+
+def run() -> List[BenchmarkResult]:
+    results = run_fragmented()
+
+    for megabytes in [1, 4, 16]:
+        frame = create_image_frame(number_of_runners=20, target_size=megabytes * 1024 * 1024)
+        parts = fragment(frame * 4, 8192)
+
+        results.append(measure(f"Parser.parse_message {megabytes} MB frames", 4, lambda: parse_all(Parser, parts)))
+        results.append(
+            measure(f"BufferParser.parse_message {megabytes} MB frames", 4, lambda: parse_all(BufferParser, parts))
+        )
+        results.append(measure(f"BufferParser.parse_frames {megabytes} MB frames", 4, lambda: parse_all_frames(parts)))
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, List
+
+import attr
+from hypothesis import HealthCheck, Phase, given, settings
+from hypothesis.strategies import SearchStrategy
+
+
+@attr.s(auto_attribs=True, slots=True)
+class BenchmarkResult:
+    name: str
+    operations: int
+    seconds: float
+
+    @property
+    def operations_per_second(self) -> float:
+        return self.operations / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "operations": self.operations,
+            "seconds": self.seconds,
+            "operations_per_second": self.operations_per_second,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<50} {self.operations:>10} ops {self.seconds:>10.4f} s "
+            f"{self.operations_per_second:>14.1f} ops/s"
+        )
+
+
+def measure(name: str, operations: int, f: Callable[[], object], repeat: int = 3) -> BenchmarkResult:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+
+    return BenchmarkResult(name=name, operations=operations, seconds=best)
+
+
+def report(results: List[BenchmarkResult]) -> None:
+    for result in results:
+        print(result)
+
+
+def draw_examples(strategy: SearchStrategy, count: int) -> List[Any]:
+    # Derandomized, so the same examples are drawn on every run.
+    examples: List[Any] = []
+
+    @settings(
+        max_examples=count,
+        derandomize=True,
+        database=None,
+        deadline=None,
+        phases=[Phase.generate],
+        suppress_health_check=list(HealthCheck),
+    )
+    @given(strategy)
+    def collect(example: Any) -> None:
+        examples.append(example)
+
+    collect()
+
+    return examples
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import BenchmarkResult, report
+from betfairstreamer import codec
+
+BENCHMARKS = [
+    "bench_stream_parser",
+    "bench_decode",
+    "bench_market_book",
+    "bench_serialise",
+    "bench_market_book_layout",
+    "bench_order_cache",
+    "bench_segmentation",
+    "bench_pool",
+    "bench_historical_reader",
+    "bench_exporter",
+    "bench_index",
+    "bench_replay",
+    "bench_market_book_publisher",
+    "bench_shared_market_store",
+    "bench_market_cache_checkpoint",
+    "bench_sharded_pipeline",
+]
+
+
+def get_version() -> Optional[str]:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # pragma: no cover
+        return None
+
+    try:
+        return version("betfairstreamer")
+    except PackageNotFoundError:
+        return None
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names: List[str]) -> Dict[str, List[BenchmarkResult]]:
+    results = {}
+
+    for name in names:
+        module = importlib.import_module(f"benchmarks.{name}")
+        results[name] = module.run()  # type: ignore
+
+        report(results[name])
+
+    return results
+
+
+def to_json(results: Dict[str, List[BenchmarkResult]]) -> Dict[str, Any]:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "version": get_version(),
+        "commit": get_commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "codec": codec.get_codec().name,
+        "benchmarks": {name: [r.to_dict() for r in benchmark] for name, benchmark in results.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the betfairstreamer benchmarks, e.g. python -m benchmarks.run")
+    parser.add_argument("benchmarks", nargs="*", default=BENCHMARKS, choices=BENCHMARKS, metavar="benchmark")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--codec", choices=codec.available_codecs(), help="JSON codec to decode with")
+
+    args = parser.parse_args()
+
+    if args.codec:
+        codec.set_codec(args.codec)
+
+    results = to_json(run_benchmarks(args.benchmarks))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
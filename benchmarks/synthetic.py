@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import random
+from typing import Any, Dict, List, Sequence
+
+from betfairstreamer.models.market_book import BETFAIR_TICKS
+
+
+def create_market_definition(number_of_runners: int) -> Dict[str, Any]:
+    return {
+        "eventId": "29735121",
+        "eventTypeId": "7",
+        "marketType": "WIN",
+        "countryCode": "GB",
+        "status": "OPEN",
+        "version": 1,
+        "runners": [
+            {"id": 1000 + i, "sortPriority": i + 1, "status": "ACTIVE"} for i in range(number_of_runners)
+        ],
+    }
+
+
+def create_ladder(rng: random.Random, tick: int, levels: int, direction: int) -> List[List[float]]:
+    ticks = [tick + direction * i for i in range(levels)]
+
+    return [[BETFAIR_TICKS[t], round(rng.uniform(2, 500), 2)] for t in ticks if 0 <= t < len(BETFAIR_TICKS)]
+
+
+def create_runner_change(rng: random.Random, selection_id: int, fields: Sequence[str], levels: int) -> Dict[str, Any]:
+    tick = rng.randrange(10, len(BETFAIR_TICKS) - 10)
+    rc: Dict[str, Any] = {"id": selection_id}
+
+    if "bdatb" in fields:
+        rc["bdatb"] = [[i] + ps for i, ps in enumerate(create_ladder(rng, tick, min(levels, 10), -1))]
+        rc["bdatl"] = [[i] + ps for i, ps in enumerate(create_ladder(rng, tick + 1, min(levels, 10), 1))]
+
+    if "atb" in fields:
+        rc["atb"] = create_ladder(rng, tick, levels, -1)
+        rc["atl"] = create_ladder(rng, tick + 1, levels, 1)
+
+    if "trd" in fields:
+        rc["trd"] = create_ladder(rng, tick - levels // 2, levels, 1)
+        rc["ltp"] = BETFAIR_TICKS[tick]
+        rc["tv"] = round(rng.uniform(100, 100000), 2)
+
+    return rc
+
+
+def create_market_image(
+    rng: random.Random, market_id: str, number_of_runners: int, fields: Sequence[str], levels: int
+) -> Dict[str, Any]:
+    return {
+        "id": market_id,
+        "img": True,
+        "marketDefinition": create_market_definition(number_of_runners),
+        "rc": [create_runner_change(rng, 1000 + i, fields, levels) for i in range(number_of_runners)],
+    }
+
+
+def create_market_delta(
+    rng: random.Random, market_id: str, number_of_runners: int, fields: Sequence[str], levels: int
+) -> Dict[str, Any]:
+    runners = rng.sample(range(number_of_runners), k=rng.randint(1, min(3, number_of_runners)))
+
+    return {"id": market_id, "rc": [create_runner_change(rng, 1000 + i, fields, levels) for i in runners]}
+
+
+def create_stream(
+    markets: int = 100,
+    deltas: int = 10000,
+    number_of_runners: int = 10,
+    fields: Sequence[str] = ("bdatb", "atb", "trd"),
+    image_levels: int = 40,
+    delta_levels: int = 2,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    market_ids = ["1." + str(170000000 + i) for i in range(markets)]
+
+    pt = 1583578555932
+    messages = []
+
+    for market_id in market_ids:
+        pt += 1
+        messages.append(
+            {
+                "op": "mcm",
+                "id": 1,
+                "clk": str(pt),
+                "pt": pt,
+                "ct": "SUB_IMAGE",
+                "mc": [create_market_image(rng, market_id, number_of_runners, fields, image_levels)],
+            }
+        )
+
+    for _ in range(deltas):
+        pt += rng.randint(1, 50)
+        market_id = rng.choice(market_ids)
+        messages.append(
+            {
+                "op": "mcm",
+                "id": 1,
+                "clk": str(pt),
+                "pt": pt,
+                "mc": [create_market_delta(rng, market_id, number_of_runners, fields, delta_levels)],
+            }
+        )
+
+    return messages
+
+
+def encode_stream(messages: List[Dict[str, Any]]) -> List[bytes]:
+    return [json.dumps(m, separators=(",", ":")).encode() for m in messages]
+
+
+def create_unmatched_order(bet_id: int, size_matched: float, size: float = 50.0) -> Dict[str, Any]:
+    return {
+        "id": str(bet_id),
+        "p": BETFAIR_TICKS[bet_id * 7 % len(BETFAIR_TICKS)],
+        "s": size,
+        "side": "B" if bet_id % 2 else "L",
+        "status": "EC" if size_matched >= size else "E",
+        "pt": "L",
+        "ot": "L",
+        "pd": 1583502407000,
+        "sm": size_matched,
+        "sr": size - size_matched,
+        "sl": 0,
+        "sc": 0,
+        "sv": 0,
+        "rac": "",
+        "rc": "REG_SWE",
+        "rfo": "",
+        "rfs": "",
+    }
+
+
+def create_order_stream(
+    orders: int = 1000, updates: int = 10000, markets: int = 10, seed: int = 0
+) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    size_matched = [0.0] * orders
+    pt = 1583578555932
+    messages = []
+
+    for i in range(orders + updates):
+        bet_id = i if i < orders else rng.randrange(orders)
+
+        if i >= orders:
+            size_matched[bet_id] = min(50.0, size_matched[bet_id] + rng.randint(1, 10))
+
+        pt += rng.randint(1, 50)
+        runner_change = {"id": 1000 + bet_id % 10, "uo": [create_unmatched_order(bet_id, size_matched[bet_id])]}
+
+        messages.append(
+            {
+                "op": "ocm",
+                "id": 2,
+                "clk": str(pt),
+                "pt": pt,
+                "oc": [{"id": "1." + str(170000000 + bet_id % markets), "orc": [runner_change]}],
+            }
+        )
+
+    return messages
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import functools
-import json
 import logging
 import time
 from datetime import datetime
@@ -11,6 +10,7 @@ from typing import Any, Dict, List, Literal, Optional, Union
 import attr
 import requests
 
+from betfairstreamer import codec
 from betfairstreamer.models.betfair_api import (
     BetfairCancelOrder,
     BetfairPlaceOrder,
@@ -148,8 +148,8 @@ class BetfairHTTPClient:
 
     @session_header
     def send(self, operation: str, payload: Dict[str, Any], header: dict):
-        response = requests.post(operation, data=json.dumps(payload), headers=header)
-        return response.json()
+        response = requests.post(operation, data=codec.dumps(payload), headers=header)
+        return codec.loads(response.content)
 
     def valid_session_token(self) -> bool:
         return (datetime.now() - self.session_fetched_date).total_seconds() < 3600 * 7 + 1800
@@ -296,7 +296,7 @@ class BetfairAPIClient:
             self.api_ng.get_account_statement, params, start_index=start_index, page_size=page_size,
         ):
             yield [
-                json.loads(statement["itemClassData"]["unknownStatementItem"])
+                codec.loads(statement["itemClassData"]["unknownStatementItem"])
                 for statement in account_statements["accountStatement"]
             ]
 
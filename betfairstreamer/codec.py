@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import attr
+
+JSONInput = Union[bytes, bytearray, memoryview, str]
+
+CODEC_ENVIRONMENT_VARIABLE = "BETFAIRSTREAMER_JSON"
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class Codec:
+    name: str
+    priority: int
+    loads: Callable[[JSONInput], Any]
+    dumps: Callable[[Any], bytes]
+
+
+def _json_loads(s: JSONInput) -> Any:
+    if isinstance(s, memoryview):
+        s = s.tobytes()
+
+    return json.loads(s)
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default).encode("utf-8")
+
+
+def _default(obj: Any) -> Any:
+    # numpy scalars and arrays, e.g. ltp/tv from MarketBook.serialise
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+CODECS: Dict[str, Codec] = {"json": Codec(name="json", priority=0, loads=_json_loads, dumps=_json_dumps)}
+
+try:
+    import orjson
+
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+    def _orjson_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    CODECS["orjson"] = Codec(name="orjson", priority=20, loads=orjson.loads, dumps=_orjson_dumps)
+except ImportError:  # pragma: no cover
+    pass
+
+try:
+    import ujson
+
+    def _ujson_loads(s: JSONInput) -> Any:
+        if isinstance(s, memoryview):
+            s = s.tobytes()
+
+        return ujson.loads(s)
+
+    def _ujson_dumps(obj: Any) -> bytes:
+        return ujson.dumps(obj, ensure_ascii=False, default=_default).encode("utf-8")
+
+    CODECS["ujson"] = Codec(name="ujson", priority=10, loads=_ujson_loads, dumps=_ujson_dumps)
+except ImportError:  # pragma: no cover
+    pass
+
+
+def register_codec(codec: Codec) -> None:
+    CODECS[codec.name] = codec
+
+
+def available_codecs() -> List[str]:
+    return [c.name for c in sorted(CODECS.values(), key=lambda c: c.priority, reverse=True)]
+
+
+def _select_codec(name: Optional[str] = None) -> Codec:
+    if name:
+        if name not in CODECS:
+            raise ValueError(f"Unknown JSON codec {name}, available codecs: {available_codecs()}")
+
+        return CODECS[name]
+
+    return CODECS[available_codecs()[0]]
+
+
+_codec = _select_codec(os.environ.get(CODEC_ENVIRONMENT_VARIABLE))
+
+
+def get_codec() -> Codec:
+    return _codec
+
+
+def set_codec(name: Optional[str] = None) -> Codec:
+    global _codec
+    _codec = _select_codec(name)
+    return _codec
+
+
+def loads(s: JSONInput) -> Any:
+    return _codec.loads(s)
+
+
+def dumps(obj: Any) -> bytes:
+    return _codec.dumps(obj)
@@ -8,6 +8,7 @@ from betfairstreamer.models.betfair_api import (
     BetfairOrderFilter,
     BetfairOrderSubscriptionMessage,
 )
+from betfairstreamer.models.betfair_api_extensions import BetfairMessage
 
 
 def create_market_subscription(
@@ -178,3 +179,17 @@ def create_order_subscription(
         heartbeatMs=heartbeat_ms,
         conflateMs=conflate_ms,
     )
+
+
+def create_resubscription_message(
+    subscription_message: BetfairMessage, initial_clk: Optional[str], clk: Optional[str]
+) -> BetfairMessage:
+    # Subscribing with the clocks of the last message makes Betfair send a RESUB_DELTA instead of full images.
+    if initial_clk is None or clk is None:
+        return subscription_message
+
+    resubscription_message = subscription_message.copy()
+    resubscription_message["initialClk"] = initial_clk  # type: ignore
+    resubscription_message["clk"] = clk  # type: ignore
+
+    return resubscription_message
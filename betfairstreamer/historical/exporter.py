@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Literal, Optional, Set
+
+import attr
+import numpy as np
+
+from betfairstreamer import codec
+from betfairstreamer.historical.reader import read_historical_messages
+from betfairstreamer.models.betfair_api import BetfairMarketDefinition
+from betfairstreamer.models.market_book import MarketBook, create_array_shapes
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.utils import PathLike
+
+logger = logging.getLogger("market_series_exporter")
+
+# Dense columns, one row per update of the market.
+SNAPSHOT_COLUMNS = ("metadata", "best_offers", "best_display")
+
+# Sparse columns, index rows are (step, runner, side, tick) for the ladder and (step, runner, tick) for trd, with
+# the new (price, size) in the values array. A removed level has size 0.
+SPARSE_COLUMNS = ("full_price_ladder", "trd")
+
+
+def encode_definition(market_definition: BetfairMarketDefinition) -> np.ndarray:
+    return np.frombuffer(codec.dumps(market_definition), dtype=np.uint8)
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MarketSeries:
+    market_id: str
+    market_definition: BetfairMarketDefinition
+    pt: np.ndarray
+    selection_ids: np.ndarray
+    metadata: np.ndarray
+    best_offers: np.ndarray
+    best_display: np.ndarray
+    full_price_ladder_index: Optional[np.ndarray] = None
+    full_price_ladder_values: Optional[np.ndarray] = None
+    trd_index: Optional[np.ndarray] = None
+    trd_values: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.pt)
+
+    def replay_sparse(self, name: str, step: int) -> np.ndarray:
+        # Applies the deltas up to and including step, e.g. the full price ladder after the step-th update.
+        index = getattr(self, name + "_index")
+        values = getattr(self, name + "_values")
+
+        if index is None or values is None:
+            raise ValueError(f"{name} was not exported for {self.market_id}")
+
+        array = np.zeros(create_array_shapes(self.selection_ids.shape[1])[name])
+        rows = index[:, 0] <= step
+        array[tuple(index[rows, 1:].T)] = values[rows]
+
+        return array
+
+    def full_price_ladder_at(self, step: int) -> np.ndarray:
+        return self.replay_sparse("full_price_ladder", step)
+
+    def trd_at(self, step: int) -> np.ndarray:
+        return self.replay_sparse("trd", step)
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MarketSeriesBuilder:
+    market_id: str
+    full_price_ladder: bool = False
+    trd: bool = False
+    market_definition: Optional[BetfairMarketDefinition] = None
+    pt: List[int] = attr.Factory(list)
+    selection_ids: List[List[int]] = attr.Factory(list)
+    snapshots: Dict[str, List[np.ndarray]] = attr.Factory(lambda: {name: [] for name in SNAPSHOT_COLUMNS})
+    previous: Dict[str, np.ndarray] = attr.Factory(dict)
+    sparse_index: Dict[str, List[np.ndarray]] = attr.Factory(lambda: {name: [] for name in SPARSE_COLUMNS})
+    sparse_values: Dict[str, List[np.ndarray]] = attr.Factory(lambda: {name: [] for name in SPARSE_COLUMNS})
+
+    def append(self, market_book: MarketBook, pt: int) -> None:
+        if self.selection_ids and len(self.selection_ids[0]) != len(market_book.metadata):
+            raise ValueError(f"Number of runners changed in {self.market_id}")
+
+        step = len(self.pt)
+
+        self.market_definition = market_book.market_definition
+        self.pt.append(pt)
+        self.selection_ids.append(sorted(market_book.sort_priority_mapping, key=market_book.sort_priority_mapping.get))
+
+        for name in SNAPSHOT_COLUMNS:
+            self.snapshots[name].append(getattr(market_book, name).copy())
+
+        # The series hold [price, size] levels whatever the layout of the market books.
+        if self.full_price_ladder:
+            self.append_delta("full_price_ladder", market_book.get_full_price_ladder(), step)
+
+        if self.trd:
+            self.append_delta("trd", market_book.get_trd(), step)
+
+    def append_delta(self, name: str, array: np.ndarray, step: int) -> None:
+        previous = self.previous.get(name)
+        changed = np.any(array != (0 if previous is None else previous), axis=-1)
+        index = np.argwhere(changed)
+
+        if len(index):
+            self.sparse_index[name].append(np.column_stack([np.full(len(index), step), index]).astype(np.int32))
+            self.sparse_values[name].append(array[changed])
+
+        self.previous[name] = array.copy()
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        assert self.market_definition is not None, "No updates for market"
+
+        columns = {
+            "pt": np.array(self.pt, dtype=np.int64),
+            "selection_ids": np.array(self.selection_ids, dtype=np.int64),
+            "market_definition": encode_definition(self.market_definition),
+        }
+
+        for name in SNAPSHOT_COLUMNS:
+            columns[name] = np.stack(self.snapshots[name])
+
+        for name in SPARSE_COLUMNS:
+            if getattr(self, name):
+                index_width = 4 if name == "full_price_ladder" else 3
+                columns[name + "_index"] = np.concatenate(
+                    self.sparse_index[name] or [np.empty((0, index_width), dtype=np.int32)]
+                )
+                columns[name + "_values"] = np.concatenate(self.sparse_values[name] or [np.empty((0, 2))])
+
+        return columns
+
+
+def write_market_series(directory: str, market_id: str, columns: Dict[str, np.ndarray], fmt: str = "npz") -> str:
+    # npz is compressed, npy writes one file per column that np.load can memory map.
+    if fmt == "npz":
+        path = os.path.join(directory, market_id + ".npz")
+        np.savez_compressed(path, **columns)  # type: ignore
+    elif fmt == "npy":
+        path = os.path.join(directory, market_id)
+        os.makedirs(path, exist_ok=True)
+
+        for name, column in columns.items():
+            np.save(os.path.join(path, name + ".npy"), column)
+    else:
+        raise ValueError(f"Unknown format {fmt}, npz or npy")
+
+    return path
+
+
+def load_market_series(path: PathLike, mmap: bool = True) -> MarketSeries:
+    path = os.fspath(path)
+
+    if os.path.isdir(path):
+        mmap_mode: Optional[Literal["r"]] = "r" if mmap else None
+        columns = {
+            name[:-4]: np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+            for name in os.listdir(path)
+            if name.endswith(".npy")
+        }
+        market_id = os.path.basename(path.rstrip(os.sep))
+    else:
+        with np.load(path) as npz:
+            columns = {name: npz[name] for name in npz.files}
+
+        market_id = os.path.basename(path)[: -len(".npz")]
+
+    market_definition = codec.loads(np.asarray(columns.pop("market_definition")).tobytes())
+
+    return MarketSeries(market_id=market_id, market_definition=market_definition, **columns)
+
+
+@attr.s(auto_attribs=True)
+class MarketSeriesExporter:
+    # Drives a MarketCache over historical streams and collects the series of every updated market, a market is
+    # written as soon as its definition says it is closed and the rest when the exporter is closed.
+    directory: str
+    fmt: str = "npz"
+    full_price_ladder: bool = False
+    trd: bool = False
+    market_ids: Optional[Set[str]] = None
+    market_cache: MarketCache = attr.Factory(MarketCache)
+    builders: Dict[str, MarketSeriesBuilder] = attr.Factory(dict)
+    written: Dict[str, str] = attr.Factory(dict)
+    # Closed markets are written once, later frames such as a re-sent CLOSED or settled definition are ignored.
+    closed: Set[str] = attr.Factory(set)
+
+    def __attrs_post_init__(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def update(self, message: Dict[str, Any]) -> None:
+        pt = message.get("pt", 0)
+
+        for market_book in self.market_cache.update(message):  # type: ignore
+            market_id = market_book.market_id
+
+            if (self.market_ids is not None and market_id not in self.market_ids) or market_id in self.closed:
+                continue
+
+            builder = self.builders.get(market_id)
+
+            if builder is None:
+                builder = self.builders[market_id] = MarketSeriesBuilder(
+                    market_id=market_id, full_price_ladder=self.full_price_ladder, trd=self.trd
+                )
+
+            builder.append(market_book, pt)
+
+            if market_book.market_definition.get("status") == "CLOSED":
+                self.closed.add(market_id)
+                self.write(market_id)
+
+    def write(self, market_id: str) -> str:
+        builder = self.builders.pop(market_id)
+        path = self.written[market_id] = write_market_series(self.directory, market_id, builder.columns(), self.fmt)
+
+        logger.info(f"Exported {len(builder.pt)} updates of {market_id} to {path}")
+
+        return path
+
+    def export(self, files: Iterable[PathLike]) -> Dict[str, str]:
+        for path in files:
+            for message in read_historical_messages(path):
+                self.update(message)
+
+        return self.close()
+
+    def close(self) -> Dict[str, str]:
+        for market_id in list(self.builders):
+            self.write(market_id)
+
+        return self.written
+
+
+def export_market_series(
+    files: Iterable[PathLike],
+    directory: str,
+    fmt: str = "npz",
+    full_price_ladder: bool = False,
+    trd: bool = False,
+    market_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, str]:
+    exporter = MarketSeriesExporter(
+        directory=directory,
+        fmt=fmt,
+        full_price_ladder=full_price_ladder,
+        trd=trd,
+        market_ids=None if market_ids is None else set(market_ids),
+    )
+
+    return exporter.export(files)
+
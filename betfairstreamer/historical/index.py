@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import attr
+
+from betfairstreamer import codec
+from betfairstreamer.historical.reader import is_compressed, open_historical_file, read_historical_chunks
+from betfairstreamer.utils import PathLike
+
+logger = logging.getLogger("historical_index")
+
+INDEX_VERSION = 1
+
+# Decompressed bytes per indexed block, the unit a replay seeks to and decodes.
+BLOCK_SIZE = 256 * 1024
+
+# Market definition fields kept in the index, the latest value seen wins.
+SUMMARY_FIELDS = ("eventTypeId", "eventId", "marketType", "countryCode", "venue", "marketTime", "status")
+
+
+@attr.s(auto_attribs=True, slots=True)
+class Block:
+    # Offset and length in the decompressed file, always whole lines.
+    offset: int
+    length: int
+    first_pt: int
+    last_pt: int
+
+
+@attr.s(auto_attribs=True, slots=True)
+class IndexedFile:
+    path: str
+    size: int
+    mtime: float
+    blocks: List[Block] = attr.Factory(list)
+
+
+@attr.s(auto_attribs=True, slots=True)
+class IndexedMarket:
+    market_id: str
+    first_pt: int
+    last_pt: int
+    messages: int = 0
+    summary: Dict[str, Any] = attr.Factory(dict)
+    # (file, block) positions in the index holding messages of this market.
+    blocks: List[Tuple[int, int]] = attr.Factory(list)
+
+
+def read_block(f: IO[bytes], position: int, block: Block, compressed: bool) -> bytes:
+    # Plain files seek straight to the block, compressed streams are decompressed forward to it.
+    if not compressed:
+        f.seek(block.offset)
+    else:
+        while position < block.offset:
+            skipped = len(f.read(min(block.offset - position, BLOCK_SIZE)))
+
+            if not skipped:
+                raise EOFError(f"Block at {block.offset} is past the end of the file")
+
+            position += skipped
+
+    return f.read(block.length)
+
+
+@attr.s(auto_attribs=True)
+class HistoricalIndex:
+    files: List[IndexedFile] = attr.Factory(list)
+    markets: Dict[str, IndexedMarket] = attr.Factory(dict)
+
+    def add_file(self, path: PathLike, block_size: int = BLOCK_SIZE) -> None:
+        path = os.fspath(path)
+        stat = os.stat(path)
+        file_index = len(self.files)
+        indexed_file = IndexedFile(path=path, size=stat.st_size, mtime=stat.st_mtime)
+        self.files.append(indexed_file)
+
+        loads = codec.get_codec().loads
+        offset = 0
+
+        for lines in read_historical_chunks(path, block_size):
+            block_index = len(indexed_file.blocks)
+            block = Block(offset=offset, length=0, first_pt=-1, last_pt=-1)
+
+            for line in lines:
+                block.length += len(line) + 1
+
+                if len(line) <= 1:
+                    continue
+
+                message = loads(line)
+                pt = message.get("pt")
+
+                if message.get("op") != "mcm" or pt is None:
+                    continue
+
+                if block.first_pt == -1:
+                    block.first_pt = pt
+
+                block.last_pt = pt
+
+                for market_change in message.get("mc", []):
+                    self.add_market_change(market_change, pt, (file_index, block_index))
+
+            if block.length:
+                indexed_file.blocks.append(block)
+                offset += block.length
+
+    def add_market_change(self, market_change: Dict[str, Any], pt: int, position: Tuple[int, int]) -> None:
+        market_id = market_change["id"]
+        market = self.markets.get(market_id)
+
+        if market is None:
+            market = self.markets[market_id] = IndexedMarket(market_id=market_id, first_pt=pt, last_pt=pt)
+
+        market.last_pt = pt
+        market.messages += 1
+
+        if not market.blocks or market.blocks[-1] != position:
+            market.blocks.append(position)
+
+        market_definition = market_change.get("marketDefinition")
+
+        if market_definition is not None:
+            market.summary.update({k: market_definition[k] for k in SUMMARY_FIELDS if k in market_definition})
+
+    def find(
+        self,
+        event_type_ids: Optional[Iterable[str]] = None,
+        market_types: Optional[Iterable[str]] = None,
+        country_codes: Optional[Iterable[str]] = None,
+        start_pt: Optional[int] = None,
+        end_pt: Optional[int] = None,
+    ) -> List[str]:
+        filters = [
+            ("eventTypeId", None if event_type_ids is None else set(event_type_ids)),
+            ("marketType", None if market_types is None else set(market_types)),
+            ("countryCode", None if country_codes is None else set(country_codes)),
+        ]
+
+        return [
+            market.market_id
+            for market in self.markets.values()
+            if all(values is None or market.summary.get(field) in values for field, values in filters)
+            and (start_pt is None or market.last_pt >= start_pt)
+            and (end_pt is None or market.first_pt <= end_pt)
+        ]
+
+    def select_blocks(
+        self, market_ids: Optional[Iterable[str]], start_pt: Optional[int], end_pt: Optional[int]
+    ) -> Dict[int, List[int]]:
+        if market_ids is None:
+            positions: Set[Tuple[int, int]] = {
+                (i, j) for i, indexed_file in enumerate(self.files) for j in range(len(indexed_file.blocks))
+            }
+        else:
+            positions = {position for m in market_ids if m in self.markets for position in self.markets[m].blocks}
+
+        selected: Dict[int, List[int]] = {}
+
+        for file_index, block_index in sorted(positions):
+            block = self.files[file_index].blocks[block_index]
+
+            if (start_pt is not None and block.last_pt < start_pt) or (end_pt is not None and block.first_pt > end_pt):
+                continue
+
+            selected.setdefault(file_index, []).append(block_index)
+
+        return selected
+
+    def replay(
+        self,
+        market_ids: Optional[Iterable[str]] = None,
+        start_pt: Optional[int] = None,
+        end_pt: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        # Decodes only the blocks holding the markets within the time window, and keeps only their market changes.
+        # Markets starting before start_pt have no image in the replay.
+        wanted = None if market_ids is None else set(market_ids)
+        loads = codec.get_codec().loads
+
+        for file_index, block_indices in self.select_blocks(wanted, start_pt, end_pt).items():
+            indexed_file = self.files[file_index]
+            compressed = is_compressed(indexed_file.path)
+            position = 0
+
+            with open_historical_file(indexed_file.path) as f:
+                for block_index in block_indices:
+                    block = indexed_file.blocks[block_index]
+                    data = read_block(f, position, block, compressed)
+                    position = block.offset + len(data)
+
+                    for line in data.split(b"\n"):
+                        if len(line) <= 1:
+                            continue
+
+                        message = loads(line)
+                        pt = message.get("pt")
+
+                        if message.get("op") != "mcm" or pt is None:
+                            continue
+
+                        if (start_pt is not None and pt < start_pt) or (end_pt is not None and pt > end_pt):
+                            continue
+
+                        if wanted is not None:
+                            message["mc"] = [mc for mc in message.get("mc", []) if mc["id"] in wanted]
+
+                            if not message["mc"]:
+                                continue
+
+                        yield message
+
+    def stale_files(self) -> List[str]:
+        stale = []
+
+        for indexed_file in self.files:
+            try:
+                stat = os.stat(indexed_file.path)
+            except FileNotFoundError:
+                stale.append(indexed_file.path)
+                continue
+
+            if stat.st_size != indexed_file.size or stat.st_mtime != indexed_file.mtime:
+                stale.append(indexed_file.path)
+
+        return stale
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "files": [
+                {
+                    "path": f.path,
+                    "size": f.size,
+                    "mtime": f.mtime,
+                    "blocks": [[b.offset, b.length, b.first_pt, b.last_pt] for b in f.blocks],
+                }
+                for f in self.files
+            ],
+            "markets": [
+                {
+                    "id": m.market_id,
+                    "firstPt": m.first_pt,
+                    "lastPt": m.last_pt,
+                    "messages": m.messages,
+                    "summary": m.summary,
+                    "blocks": m.blocks,
+                }
+                for m in self.markets.values()
+            ],
+        }
+
+    def save(self, path: PathLike) -> None:
+        with open(path, "wb") as f:
+            f.write(codec.dumps(self.to_dict()))
+
+    @classmethod
+    def from_dict(cls, index: Dict[str, Any]) -> HistoricalIndex:
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {index.get('version')}")
+
+        return cls(
+            files=[
+                IndexedFile(path=f["path"], size=f["size"], mtime=f["mtime"], blocks=[Block(*b) for b in f["blocks"]])
+                for f in index["files"]
+            ],
+            markets={
+                m["id"]: IndexedMarket(
+                    market_id=m["id"],
+                    first_pt=m["firstPt"],
+                    last_pt=m["lastPt"],
+                    messages=m["messages"],
+                    summary=m["summary"],
+                    blocks=[(i, j) for i, j in m["blocks"]],
+                )
+                for m in index["markets"]
+            },
+        )
+
+    @classmethod
+    def load(cls, path: PathLike) -> HistoricalIndex:
+        with open(path, "rb") as f:
+            return cls.from_dict(codec.loads(f.read()))
+
+    @classmethod
+    def build(cls, files: Iterable[PathLike], block_size: int = BLOCK_SIZE) -> HistoricalIndex:
+        index = cls()
+
+        for path in files:
+            index.add_file(path, block_size)
+
+        logger.info(f"Indexed {len(index.markets)} markets in {len(index.files)} files")
+
+        return index
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import os
+from typing import IO, Any, Dict, Iterator, List, cast
+
+from betfairstreamer import codec
+from betfairstreamer.stream.stream_parser import BufferParser
+from betfairstreamer.utils import PathLike
+
+# Decompressed bytes read per chunk, memory stays bounded by this plus the longest line.
+CHUNK_SIZE = 1024 * 1024
+
+
+COMPRESSED_EXTENSIONS = (".bz2", ".gz", ".zst")
+
+
+def is_compressed(path: PathLike) -> bool:
+    return os.fspath(path).endswith(COMPRESSED_EXTENSIONS)
+
+
+def open_historical_file(path: PathLike) -> IO[bytes]:
+    # Betfair ships historical data as bz2, recordings may also be gzip or zstd compressed.
+    path = os.fspath(path)
+
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+
+    if path.endswith(".gz"):
+        return cast(IO[bytes], gzip.open(path, "rb"))
+
+    if path.endswith(".zst"):
+        import zstandard
+
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+
+    return open(path, "rb")
+
+
+def read_historical_chunks(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[List[memoryview]]:
+    # Lines are views on the parser buffer, they are only valid until the next chunk is read.
+    parser = BufferParser(delimiter=b"\n")
+
+    with open_historical_file(path) as f:
+        while True:
+            chunk = f.read(chunk_size)
+
+            if not chunk:
+                break
+
+            yield parser.parse_frames(chunk)
+
+        remainder = parser.flush()
+
+        if remainder:
+            yield [memoryview(remainder)]
+
+
+def read_historical_file(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    for lines in read_historical_chunks(path, chunk_size):
+        for line in lines:
+            stripped = bytes(line).strip()
+
+            if stripped:
+                yield stripped
+
+
+def read_historical_messages(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    # Decoded lazily straight from the parser buffer, the lines are never copied.
+    loads = codec.get_codec().loads
+
+    for lines in read_historical_chunks(path, chunk_size):
+        for line in lines:
+            # A message is at least "{}", shorter lines are blank or the \r of a CRLF line ending.
+            if len(line) > 1:
+                yield loads(line)
+
+
+def read_historical_batches(path: PathLike, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    # One batch per chunk, holding a batch of decoded messages costs more garbage collection than
+    # consuming them one by one from read_historical_messages.
+    loads = codec.get_codec().loads
+
+    for lines in read_historical_chunks(path, chunk_size):
+        batch = [loads(line) for line in lines if len(line) > 1]
+
+        if batch:
+            yield batch
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import bz2
+import gzip
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import IO, Dict, Iterable, List, Optional, Set, Tuple, Union, cast
+
+import attr
+
+logger = logging.getLogger("stream_recorder")
+
+StreamId = Union[int, str]
+
+# File extension per compression, the same extensions open_historical_file reads back.
+COMPRESSION_EXTENSIONS = {"bz2": ".bz2", "gzip": ".gz", "zstd": ".zst", "none": ""}
+
+
+def available_compressions() -> List[str]:
+    compressions = ["bz2", "gzip", "none"]
+
+    try:
+        import zstandard  # noqa: F401
+
+        compressions.insert(0, "zstd")
+    except ImportError:  # pragma: no cover
+        pass
+
+    return compressions
+
+
+def open_recording_file(path: str, compression: str, level: Optional[int] = None) -> IO[bytes]:
+    if compression == "bz2":
+        return bz2.open(path, "wb", compresslevel=level or 9)
+
+    if compression == "gzip":
+        return cast(IO[bytes], gzip.open(path, "wb", compresslevel=level or 6))
+
+    if compression == "zstd":
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=level or 3)
+
+        return cast(IO[bytes], compressor.stream_writer(open(path, "wb"), closefd=True))
+
+    return open(path, "wb")
+
+
+@attr.s(auto_attribs=True, slots=True)
+class RecordingFile:
+    path: str
+    f: IO[bytes]
+    opened: float
+    size: int = 0
+    messages: int = 0
+
+    def write(self, frames: Iterable[bytes]) -> None:
+        # One message per line like Betfair historical data, size counts uncompressed bytes.
+        for frame in frames:
+            self.f.write(frame)
+            self.f.write(b"\n")
+            self.size += len(frame) + 1
+            self.messages += 1
+
+    def close(self) -> None:
+        self.f.close()
+
+
+@attr.s(auto_attribs=True)
+class StreamRecorder:
+    # Raw frames are queued by the read loop and written by a background thread, bz2, zlib and zstd release the
+    # GIL while compressing so the read loop keeps running.
+    directory: str
+    compression: str = "bz2"
+    compression_level: Optional[int] = None
+    # A file is rotated when either limit is reached, None disables the limit.
+    max_bytes: Optional[int] = 256 * 1024 * 1024
+    max_seconds: Optional[float] = 3600
+    prefix: str = "stream"
+    queue_size: int = 10000
+    # Block the read loop when the queue is full instead of dropping frames.
+    block: bool = False
+    queue: "queue.Queue[Optional[Tuple[StreamId, List[bytes]]]]" = attr.ib(init=False)
+    files: Dict[StreamId, RecordingFile] = attr.ib(factory=dict)
+    stream_ids: Set[StreamId] = attr.ib(factory=set)
+    closed_files: List[str] = attr.ib(factory=list)
+    thread: Optional[threading.Thread] = None
+    dropped: int = 0
+    recorded: int = 0
+    error: Optional[BaseException] = None
+
+    def __attrs_post_init__(self) -> None:
+        if self.compression not in available_compressions():
+            raise ValueError(f"Unknown compression {self.compression}, available: {available_compressions()}")
+
+        self.queue = queue.Queue(maxsize=self.queue_size)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self) -> StreamRecorder:
+        self.thread = threading.Thread(target=self.run, name="stream_recorder", daemon=True)
+        self.thread.start()
+
+        return self
+
+    def register(self, name: str) -> str:
+        # A stream id per connection, connections with the same name get numbered ids.
+        stream_id = name
+        i = 1
+
+        while stream_id in self.stream_ids:
+            i += 1
+            stream_id = f"{name}_{i}"
+
+        self.stream_ids.add(stream_id)
+
+        return stream_id
+
+    def check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError(f"Stream recorder writing to {self.directory} failed") from self.error
+
+        if self.thread is not None and not self.thread.is_alive():
+            raise RuntimeError(f"Stream recorder writing to {self.directory} is not running")
+
+    def record(self, frames: List[bytes], stream_id: StreamId = 0) -> bool:
+        # Raises once the writer thread has stopped, a blocking record would otherwise wait on a full queue forever.
+        self.check()
+
+        if not frames:
+            return True
+
+        try:
+            if self.block:
+                while True:
+                    try:
+                        self.queue.put((stream_id, frames), timeout=0.1)
+                        break
+                    except queue.Full:
+                        self.check()
+            else:
+                self.queue.put_nowait((stream_id, frames))
+        except queue.Full:
+            if self.dropped == 0:
+                logger.warning(f"Recorder queue is full, dropping frames to {self.directory}")
+
+            self.dropped += len(frames)
+
+            return False
+
+        return True
+
+    def create_path(self, stream_id: StreamId) -> str:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        extension = COMPRESSION_EXTENSIONS[self.compression]
+
+        return os.path.join(self.directory, f"{self.prefix}-{stream_id}-{timestamp}{extension}")
+
+    def get_file(self, stream_id: StreamId) -> RecordingFile:
+        recording_file = self.files.get(stream_id)
+        now = time.monotonic()
+
+        if recording_file is not None and (
+            (self.max_bytes is not None and recording_file.size >= self.max_bytes)
+            or (self.max_seconds is not None and now - recording_file.opened >= self.max_seconds)
+        ):
+            self.close_file(stream_id)
+            recording_file = None
+
+        if recording_file is None:
+            path = self.create_path(stream_id)
+            f = open_recording_file(path, self.compression, self.compression_level)
+            recording_file = self.files[stream_id] = RecordingFile(path=path, f=f, opened=now)
+
+        return recording_file
+
+    def close_file(self, stream_id: StreamId) -> None:
+        recording_file = self.files.pop(stream_id)
+        recording_file.close()
+
+        self.closed_files.append(recording_file.path)
+
+        logger.info(f"Recorded {recording_file.messages} messages to {recording_file.path}")
+
+    def write(self, stream_id: StreamId, frames: List[bytes]) -> None:
+        self.get_file(stream_id).write(frames)
+        self.recorded += len(frames)
+
+    def run(self) -> None:
+        try:
+            while True:
+                item = self.queue.get()
+
+                if item is None:
+                    break
+
+                self.write(*item)
+        except BaseException as e:
+            # Raised again from record and close.
+            self.error = e
+            logger.exception("Stream recorder failed")
+        finally:
+            self.close_files()
+
+    def close_files(self) -> None:
+        for stream_id in list(self.files):
+            self.close_file(stream_id)
+
+    def close(self, timeout: float = 30.0) -> None:
+        # Writes everything already queued before the files are closed.
+        if self.thread is None:
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+
+                if item is not None:
+                    self.write(*item)
+
+            self.close_files()
+        elif self.thread.is_alive():
+            deadline = time.monotonic() + timeout
+
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+
+            self.thread.join(max(0.0, deadline - time.monotonic()))
+
+            if self.thread.is_alive():
+                raise TimeoutError(f"Stream recorder did not finish writing to {self.directory} within {timeout} s")
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import time
+import traceback
+from functools import partial
+from typing import Any, Callable, Generic, Iterator, List, Optional, Sequence, TypeVar
+
+import attr
+
+from betfairstreamer.historical.reader import read_historical_batches
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.utils import PathLike
+
+logger = logging.getLogger("historical_replay")
+
+T = TypeVar("T")
+
+# Called with every updated MarketBook, results other than None are collected per file.
+MarketBookHandler = Callable[[MarketBook], Optional[T]]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ReplayResult(Generic[T]):
+    path: str
+    results: List[T] = attr.Factory(list)
+    messages: int = 0
+    market_books: int = 0
+    seconds: float = 0.0
+    # Formatted traceback of the exception that stopped the file, results hold what was handled until then.
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ReplayProgress:
+    total: int
+    completed: int = 0
+    failed: int = 0
+    messages: int = 0
+    started: float = attr.Factory(time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def update(self, result: ReplayResult[Any]) -> None:
+        self.completed += 1
+        self.failed += not result.ok
+        self.messages += result.messages
+
+
+def replay_file(path: PathLike, handler: MarketBookHandler[T]) -> ReplayResult[T]:
+    # Historical files hold independent markets, every file gets a fresh MarketCache.
+    result: ReplayResult[T] = ReplayResult(path=str(path))
+    market_cache = MarketCache()
+    start = time.perf_counter()
+
+    try:
+        for batch in read_historical_batches(path):
+            for message in batch:
+                result.messages += 1
+
+                for market_book in market_cache.update(message):  # type: ignore
+                    result.market_books += 1
+                    handled = handler(market_book)
+
+                    if handled is not None:
+                        result.results.append(handled)
+    except Exception:
+        result.error = traceback.format_exc()
+
+    result.seconds = time.perf_counter() - start
+
+    return result
+
+
+def replay_files(
+    files: Sequence[PathLike],
+    handler: MarketBookHandler[T],
+    processes: Optional[int] = None,
+    ordered: bool = True,
+    progress: Optional[Callable[[ReplayProgress, ReplayResult[T]], None]] = None,
+) -> Iterator[ReplayResult[T]]:
+    # Files are replayed in a process pool, one file per task, processes=0 replays them in this process. The
+    # handler is pickled to the workers, it has to be a module level function or a partial of one.
+    replay_progress = ReplayProgress(total=len(files))
+    replay = partial(replay_file, handler=handler)
+
+    def report(result: ReplayResult[T]) -> ReplayResult[T]:
+        replay_progress.update(result)
+
+        if not result.ok:
+            logger.error(f"Replay of {result.path} failed\n{result.error}")
+
+        if progress is not None:
+            progress(replay_progress, result)
+
+        return result
+
+    if processes == 0:
+        for path in files:
+            yield report(replay(path))
+
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.imap(replay, files) if ordered else pool.imap_unordered(replay, files)
+
+        for result in results:
+            yield report(result)
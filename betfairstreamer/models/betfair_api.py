@@ -67,6 +67,19 @@ class OP(Enum):
     orderSubscription = "orderSubscription"
 
 
+class SegmentType(Enum):
+    SEG_START = "SEG_START"
+    SEG = "SEG"
+    SEG_END = "SEG_END"
+
+
+class SegmentMode(Enum):
+    # BUFFER holds segments until SEG_END and applies them together, EAGER applies each segment on
+    # arrival. Either way the updates of a segmented message are returned once, at SEG_END.
+    BUFFER = "BUFFER"
+    EAGER = "EAGER"
+
+
 class BettingType(Enum):
     ODDS = "ODDS"
     LINE = "LINE"
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import attr
+
+from betfairstreamer.models.betfair_api import BetfairMarketChangeMessage
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+
+if TYPE_CHECKING:
+    from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+
+
+@attr.s(auto_attribs=True)
+class ConflatedMarketCache:
+    # Every delta is applied to the market books as it arrives, but a changed market is handed to the
+    # consumer at most once per take(), and take() is rate limited to one per window by wait().
+    window_ms: int = 0
+    copy_market_books: bool = True
+    market_cache: MarketCache = attr.Factory(MarketCache)
+    pending: Dict[str, MarketBook] = attr.ib(factory=dict)
+    coalesced: Dict[str, int] = attr.ib(factory=dict)
+    updates: int = 0
+    deltas_coalesced: int = 0
+    deliveries: int = 0
+    last_delivery: float = 0.0
+    error: Optional[BaseException] = None
+    lock: threading.Lock = attr.ib(factory=threading.Lock)
+    changed: threading.Condition = attr.ib(init=False)
+
+    @changed.default
+    def _create_changed(self) -> threading.Condition:
+        return threading.Condition(self.lock)
+
+    def update(self, stream_update: BetfairMarketChangeMessage) -> None:
+        # Called by the reader, only holds the lock while applying, never waits for the consumer.
+        with self.lock:
+            market_books = self.market_cache.update(stream_update)
+
+            for market_book in market_books:
+                self.updates += 1
+
+                if market_book.market_id in self.pending:
+                    self.deltas_coalesced += 1
+                    self.coalesced[market_book.market_id] = self.coalesced.get(market_book.market_id, 0) + 1
+                else:
+                    self.pending[market_book.market_id] = market_book
+
+            if market_books:
+                self.changed.notify_all()
+
+    def __call__(self, stream_update: BetfairMarketChangeMessage) -> None:
+        self.update(stream_update)
+
+    def take_pending(self) -> Dict[str, MarketBook]:
+        # Called with the lock held, swaps the pending markets out without copying them.
+        pending = self.pending
+        self.pending = {}
+
+        if pending:
+            self.deliveries += 1
+            self.last_delivery = time.monotonic()
+
+        return pending
+
+    def copy_pending(self, pending: Dict[str, MarketBook]) -> List[MarketBook]:
+        # Copies outside the lock so the reader keeps applying deltas. A market the reader changed meanwhile may be
+        # torn, it is pending again and copied once more under the lock, in its latest state.
+        if not self.copy_market_books:
+            return list(pending.values())
+
+        market_books = {market_id: market_book.copy() for market_id, market_book in pending.items()}
+
+        with self.lock:
+            for market_id in pending.keys() & self.pending.keys():
+                market_books[market_id] = self.pending.pop(market_id).copy()
+
+        return list(market_books.values())
+
+    def take(self) -> List[MarketBook]:
+        # Ready signal, returns the markets changed since the previous take.
+        with self.lock:
+            pending = self.take_pending()
+
+        return self.copy_pending(pending)
+
+    def wait(self, timeout: Optional[float] = None) -> List[MarketBook]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                window_left = self.last_delivery + self.window_ms / 1000 - now
+
+                if self.pending and window_left <= 0:
+                    pending = self.take_pending()
+                    break
+
+                if self.error is not None and not self.pending:
+                    raise self.error
+
+                if deadline is not None and now >= deadline:
+                    return []
+
+                wait = window_left if self.pending else None
+
+                if deadline is not None:
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+
+                self.changed.wait(wait)
+
+        return self.copy_pending(pending)
+
+    def read(self, connection_pool: BetfairConnectionPool) -> None:
+        try:
+            for batch in connection_pool.read_batches():
+                for messages in batch.messages.values():
+                    for message in messages:
+                        if message.get("op") == "mcm":
+                            self.update(message)  # type: ignore
+        except Exception as e:
+            # Handed to the consumer, wait() raises it once the pending markets are delivered.
+            with self.lock:
+                self.error = e
+                self.changed.notify_all()
+
+    def start(self, connection_pool: BetfairConnectionPool) -> threading.Thread:
+        thread = threading.Thread(target=self.read, args=(connection_pool,), daemon=True)
+        thread.start()
+
+        return thread
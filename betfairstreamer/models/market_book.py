@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import attr
 import numpy as np
 
+from betfairstreamer import codec
 from betfairstreamer.models.betfair_api import BetfairMarketChange, BetfairMarketDefinition, BetfairRunnerChange
 
 BETFAIR_TICKS = [
@@ -360,12 +361,147 @@ BETFAIR_TICKS = [
     1000,
 ]
 FULL_PRICE_LADDER_INDEX = dict(zip(BETFAIR_TICKS, range(len(BETFAIR_TICKS))))
+TICKS = np.array(BETFAIR_TICKS)
+TICK_MIDPOINTS = (TICKS[1:] + TICKS[:-1]) / 2
+
+# Prices within the tolerance of a tick map to it, the closest ticks are 0.01 apart.
+TICK_TOLERANCE = 1e-6
+
+# Below this many levels the numpy call overhead is more than a dict lookup per level, most deltas are 1 to 3 levels.
+VECTORIZE_MIN_LEVELS = 32
 
 
 def create_sort_priority_mapping(market_definition: BetfairMarketDefinition,) -> Dict[int, int]:
     return {r["id"]: r["sortPriority"] for r in market_definition["runners"]}
 
 
+def create_array_shapes(
+    number_of_runners: int, ladder_levels: int = 10, compact: bool = False
+) -> Dict[str, Tuple[int, ...]]:
+    # Compact full price ladders and trd hold only the size per tick, the prices are BETFAIR_TICKS.
+    level = () if compact else (2,)
+
+    return {
+        "metadata": (number_of_runners, 2),
+        "best_display": (number_of_runners, 2, ladder_levels, 2),
+        "best_offers": (number_of_runners, 2, ladder_levels, 2),
+        "full_price_ladder": (number_of_runners, 2, len(BETFAIR_TICKS)) + level,
+        "trd": (number_of_runners, len(BETFAIR_TICKS)) + level,
+    }
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class MarketBookLayout:
+    # Storage of the MarketBook arrays. The compact layout needs a quarter of the memory with float32 sizes, those
+    # keep about 7 significant digits. metadata, best_display and best_offers are always float64.
+    compact: bool = False
+    size_dtype: str = "float64"
+
+    def __attrs_post_init__(self) -> None:
+        if not self.compact and np.dtype(self.size_dtype) != np.float64:
+            raise ValueError(f"Prices are stored with the sizes, {self.size_dtype} sizes need a compact layout")
+
+    def create_array_shapes(self, number_of_runners: int) -> Dict[str, Tuple[int, ...]]:
+        return create_array_shapes(number_of_runners, compact=self.compact)
+
+    def create_array_dtypes(self) -> Dict[str, np.dtype]:
+        size_dtype = np.dtype(self.size_dtype)
+        float64 = np.dtype(np.float64)
+
+        return {
+            "metadata": float64,
+            "best_display": float64,
+            "best_offers": float64,
+            "full_price_ladder": size_dtype,
+            "trd": size_dtype,
+        }
+
+    def create_arrays(self, number_of_runners: int) -> Dict[str, np.ndarray]:
+        dtypes = self.create_array_dtypes()
+
+        return {
+            name: np.zeros(shape=shape, dtype=dtypes[name])
+            for name, shape in self.create_array_shapes(number_of_runners).items()
+        }
+
+
+FULL_LAYOUT = MarketBookLayout()
+COMPACT_LAYOUT = MarketBookLayout(compact=True, size_dtype="float32")
+
+
+def price_to_tick(prices: np.ndarray) -> np.ndarray:
+    # Index of the nearest tick to every price, prices between ticks raise KeyError like FULL_PRICE_LADDER_INDEX.
+    ticks = np.searchsorted(TICK_MIDPOINTS, prices)
+    invalid = np.abs(TICKS[ticks] - prices) > TICK_TOLERANCE
+
+    if invalid.any():
+        raise KeyError(prices[invalid][0].item())
+
+    return ticks
+
+
+def update_ladder(ladder: np.ndarray, levels: List[List[float]], remove_empty: bool = True) -> None:
+    # Writes [price, size] levels into a (ticks, 2) ladder, a level with size 0 is cleared when remove_empty. A
+    # compact (ticks,) ladder takes only the sizes.
+    compact = ladder.ndim == 1
+
+    if len(levels) < VECTORIZE_MIN_LEVELS:
+        for level in levels:
+            try:
+                tick = FULL_PRICE_LADDER_INDEX[level[0]]
+            except KeyError:
+                tick = int(price_to_tick(np.array(level[:1]))[0])
+
+            if compact:
+                ladder[tick] = level[1]
+            elif remove_empty and level[1] == 0:
+                ladder[tick] = 0
+            else:
+                ladder[tick] = level
+
+        return
+
+    values = np.array(levels, dtype=np.float64)
+    ticks = price_to_tick(values[:, 0])
+
+    if compact:
+        ladder[ticks] = values[:, 1]
+        return
+
+    if remove_empty:
+        values[values[:, 1] == 0] = 0
+
+    ladder[ticks] = values
+
+
+def expand_ladder(sizes: np.ndarray) -> np.ndarray:
+    # [price, size] levels of a compact ladder, levels without a size are zeros like in the full layout.
+    ladder = np.zeros(sizes.shape + (2,))
+    ladder[..., 1] = sizes
+    np.multiply(sizes > 0, TICKS, out=ladder[..., 0])
+
+    return ladder
+
+
+def select_traded_levels(ladder: np.ndarray, compact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    # Rows with a size, in runner, side and tick order. bounds[k]:bounds[k + 1] are the rows of the k-th ladder.
+    mask = (ladder if compact else ladder[..., 1]) > 0
+    bounds = np.zeros(mask[..., 0].size + 1, dtype=np.int64)
+    np.cumsum(mask.sum(axis=-1).ravel(), out=bounds[1:])
+
+    if compact:
+        return np.column_stack([TICKS[np.nonzero(mask)[-1]], ladder[mask].astype(np.float64)]), bounds
+
+    return ladder[mask], bounds
+
+
+def add_level_index(levels: np.ndarray) -> np.ndarray:
+    # [level, price, size] rows like bdatb and batb.
+    index = np.broadcast_to(np.arange(levels.shape[-2], dtype=levels.dtype)[:, None], levels.shape[:-1] + (1,))
+
+    return np.concatenate([index, levels], axis=-1)
+
+
 @attr.s(slots=True, auto_attribs=True)
 class MarketBook:
     market_id: str
@@ -413,60 +549,113 @@ class MarketBook:
                 self.best_offers[sort_priority, 1, batl_index, :] = new_values[:, 1:]
 
             if atb:
-                for u in atb:
-                    if u[1] == 0:
-                        self.full_price_ladder[sort_priority, 0, FULL_PRICE_LADDER_INDEX[u[0]], :] = 0
-                    else:
-                        self.full_price_ladder[sort_priority, 0, FULL_PRICE_LADDER_INDEX[u[0]], :] = u
+                update_ladder(self.full_price_ladder[sort_priority, 0], atb)
 
             if atl:
-                for u in atl:
-                    if u[1] == 0:
-                        self.full_price_ladder[sort_priority, 1, FULL_PRICE_LADDER_INDEX[u[0]], :] = 0
-                    else:
-                        self.full_price_ladder[sort_priority, 1, FULL_PRICE_LADDER_INDEX[u[0]], :] = u
+                update_ladder(self.full_price_ladder[sort_priority, 1], atl)
 
             if trd:
-                for u in trd:
-                    self.trd[sort_priority, FULL_PRICE_LADDER_INDEX[u[0]], :] = u
+                update_ladder(self.trd[sort_priority], trd, remove_empty=False)
 
             if "ltp" in r:
                 self.metadata[sort_priority, 0] = r.get("ltp")
             if "tv" in r:
                 self.metadata[sort_priority, 1] = r.get("tv")
 
+    @property
+    def compact(self) -> bool:
+        return self.trd.ndim == 2
+
+    def get_full_price_ladder(self) -> np.ndarray:
+        # (runners, 2, ticks, 2) [price, size] levels in either layout, a new array for compact layouts.
+        return expand_ladder(self.full_price_ladder) if self.compact else self.full_price_ladder
+
+    def get_trd(self) -> np.ndarray:
+        return expand_ladder(self.trd) if self.compact else self.trd
+
+    def get_full_price_ladder_sizes(self) -> np.ndarray:
+        # (runners, 2, ticks) sizes by tick index, a view in either layout.
+        return self.full_price_ladder if self.compact else self.full_price_ladder[..., 1]
+
+    def get_trd_sizes(self) -> np.ndarray:
+        return self.trd if self.compact else self.trd[..., 1]
+
+    def runner_positions(self) -> Union[slice, List[int]]:
+        # Rows in the order of the sort priority mapping, a slice avoids copying when that is the array order.
+        positions = [sort_priority - 1 for sort_priority in self.sort_priority_mapping.values()]
+
+        return slice(None) if positions == list(range(len(self.metadata))) else positions
+
     def serialise(self) -> BetfairMarketChange:
+        # Whole array selections and one tolist per array, the per runner lists are slices of those.
+        positions = self.runner_positions()
 
-        rcs = []
+        ladder, ladder_bounds = select_traded_levels(self.full_price_ladder[positions], self.compact)
+        trd, trd_bounds = select_traded_levels(self.trd[positions], self.compact)
+
+        ladder_rows, ladder_bounds = ladder.tolist(), ladder_bounds.tolist()
+        trd_rows, trd_bounds = trd.tolist(), trd_bounds.tolist()
+        best_display = self.best_display[positions].tolist()
+        best_offers = self.best_offers[positions].tolist()
+        metadata = self.metadata[positions].tolist()
 
-        for selection_id, sort_priority in self.sort_priority_mapping.items():
-            sort_priority = sort_priority - 1
+        levels = range(self.best_display.shape[2])
+        rcs = []
 
-            atb = self.full_price_ladder[
-                sort_priority, 0, self.full_price_ladder[sort_priority, 0, :, 1] > 0, :
-            ].tolist()
-            atl = self.full_price_ladder[
-                sort_priority, 1, self.full_price_ladder[sort_priority, 1, :, 1] > 0, :
-            ].tolist()
-            trd = self.trd[sort_priority, self.trd[sort_priority, :, 1] > 0, :].tolist()
+        for i, selection_id in enumerate(self.sort_priority_mapping):
+            (bdatb, bdatl), (batb, batl) = best_display[i], best_offers[i]
 
             rcs.append(
                 BetfairRunnerChange(
                     id=selection_id,
-                    bdatb=[[i] + v for i, v in enumerate(self.best_display[sort_priority, 0, :, :].tolist())],
-                    bdatl=[[i] + v for i, v in enumerate(self.best_display[sort_priority, 1, :, :].tolist())],
-                    batb=[[i] + v for i, v in enumerate(self.best_offers[sort_priority, 0, :, :].tolist())],
-                    batl=[[i] + v for i, v in enumerate(self.best_offers[sort_priority, 1, :, :].tolist())],
-                    atb=atb,
-                    atl=atl,
-                    trd=trd,
-                    ltp=self.metadata[sort_priority, 0],
-                    tv=self.metadata[sort_priority, 1],
+                    bdatb=[[level, price, size] for level, (price, size) in zip(levels, bdatb)],
+                    bdatl=[[level, price, size] for level, (price, size) in zip(levels, bdatl)],
+                    batb=[[level, price, size] for level, (price, size) in zip(levels, batb)],
+                    batl=[[level, price, size] for level, (price, size) in zip(levels, batl)],
+                    atb=ladder_rows[ladder_bounds[2 * i] : ladder_bounds[2 * i + 1]],
+                    atl=ladder_rows[ladder_bounds[2 * i + 1] : ladder_bounds[2 * i + 2]],
+                    trd=trd_rows[trd_bounds[i] : trd_bounds[i + 1]],
+                    ltp=metadata[i][0],
+                    tv=metadata[i][1],
                 )
             )
 
         return BetfairMarketChange(img=True, marketDefinition=self.market_definition, id=self.market_id, rc=rcs)
 
+    def serialise_arrays(self) -> Dict[str, Any]:
+        # Same payload as serialise with numpy arrays in place of the lists, for codecs that encode numpy arrays
+        # natively. Level indexes are floats here, the MarketBook update casts them back.
+        positions = self.runner_positions()
+
+        ladder, ladder_bounds = select_traded_levels(self.full_price_ladder[positions], self.compact)
+        trd, trd_bounds = select_traded_levels(self.trd[positions], self.compact)
+        best_display = add_level_index(self.best_display[positions])
+        best_offers = add_level_index(self.best_offers[positions])
+        metadata = self.metadata[positions].tolist()
+
+        rcs = []
+
+        for i, selection_id in enumerate(self.sort_priority_mapping):
+            rcs.append(
+                {
+                    "id": selection_id,
+                    "bdatb": best_display[i, 0],
+                    "bdatl": best_display[i, 1],
+                    "batb": best_offers[i, 0],
+                    "batl": best_offers[i, 1],
+                    "atb": ladder[ladder_bounds[2 * i] : ladder_bounds[2 * i + 1]],
+                    "atl": ladder[ladder_bounds[2 * i + 1] : ladder_bounds[2 * i + 2]],
+                    "trd": trd[trd_bounds[i] : trd_bounds[i + 1]],
+                    "ltp": metadata[i][0],
+                    "tv": metadata[i][1],
+                }
+            )
+
+        return {"img": True, "marketDefinition": self.market_definition, "id": self.market_id, "rc": rcs}
+
+    def serialise_bytes(self) -> bytes:
+        return codec.dumps(self.serialise_arrays())
+
     def update(self, market_change_message: BetfairMarketChange) -> None:
 
         market_definition = market_change_message.get("marketDefinition")
@@ -489,22 +678,35 @@ class MarketBook:
 
         self.update_runners(market_change_message.get("rc", []))
 
+    def copy(self) -> MarketBook:
+        return attr.evolve(
+            self,
+            metadata=self.metadata.copy(),
+            sort_priority_mapping=self.sort_priority_mapping.copy(),
+            best_display=self.best_display.copy(),
+            best_offers=self.best_offers.copy(),
+            full_price_ladder=self.full_price_ladder.copy(),
+            trd=self.trd.copy(),
+        )
+
     @classmethod
-    def create_new_market_book(cls, market_change_message: BetfairMarketChange) -> MarketBook:
+    def create_new_market_book(
+        cls,
+        market_change_message: BetfairMarketChange,
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+        layout: MarketBookLayout = FULL_LAYOUT,
+    ) -> MarketBook:
 
         number_of_runners = len(market_change_message["marketDefinition"]["runners"])
 
-        ladder_levels = 10
+        if arrays is None:
+            arrays = layout.create_arrays(number_of_runners)
 
         market_book = cls(
             market_id=market_change_message["id"],
-            best_display=np.zeros(shape=(number_of_runners, 2, ladder_levels, 2)),
-            best_offers=np.zeros(shape=(number_of_runners, 2, ladder_levels, 2)),
-            full_price_ladder=np.zeros(shape=(number_of_runners, 2, 350, 2)),
-            metadata=np.zeros(shape=(number_of_runners, 2)),
             sort_priority_mapping=create_sort_priority_mapping(market_change_message["marketDefinition"]),
             market_definition=market_change_message["marketDefinition"],
-            trd=np.zeros(shape=(number_of_runners, 350, 2)),
+            **arrays,
         )
 
         market_book.update(market_change_message)
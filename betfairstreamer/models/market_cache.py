@@ -1,34 +1,108 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import logging
+from typing import Dict, List, Optional
 
 import attr
 
-from betfairstreamer.models.betfair_api import BetfairMarketChangeMessage
-from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer import codec
+from betfairstreamer.models.betfair_api import BetfairMarketChangeMessage, SegmentMode, SegmentType
+from betfairstreamer.models.market_book import FULL_LAYOUT, MarketBook, MarketBookLayout
+from betfairstreamer.models.shared_market_store import SharedMarketStore
+
+logger = logging.getLogger("market_cache")
 
 
 @attr.s(auto_attribs=True, slots=True)
 class MarketCache:
     market_books: Dict[str, MarketBook] = attr.Factory(dict)
     publish_time: int = 0
+    # Stream clocks of the last applied message, a resubscription with them resumes the stream from here.
+    initial_clk: Optional[str] = None
+    clk: Optional[str] = None
+    segment_mode: SegmentMode = SegmentMode.BUFFER
+    segments: List[BetfairMarketChangeMessage] = attr.Factory(list)
+    segment_market_books: Dict[str, MarketBook] = attr.Factory(dict)
+    # Allocates the market book arrays in shared memory for reader processes, see SharedMarketStore.
+    market_store: Optional[SharedMarketStore] = None
+    # Array layout of new market books, a market store has its own.
+    layout: MarketBookLayout = FULL_LAYOUT
 
     def update(self, stream_update: BetfairMarketChangeMessage) -> List[MarketBook]:
 
         if "pt" not in stream_update:
             return []
 
+        segment_type = stream_update.get("segmentType")
+
+        if segment_type is None:
+            return self.apply(stream_update)
+
+        if segment_type == SegmentType.SEG_START.value and (self.segments or self.segment_market_books):
+            # Eagerly applied segments stay in the cache, but are not published with the next message.
+            logger.warning(
+                f"SEG_START before SEG_END, dropping {len(self.segments)} buffered segments"
+                f" and {len(self.segment_market_books)} updated market books"
+            )
+            self.segments.clear()
+            self.segment_market_books.clear()
+
+        if self.segment_mode == SegmentMode.BUFFER:
+            self.segments.append(stream_update)
+        else:
+            for market_book in self.apply(stream_update):
+                self.segment_market_books[market_book.market_id] = market_book
+
+        if segment_type != SegmentType.SEG_END.value:
+            return []
+
+        for segment in self.segments:
+            for market_book in self.apply(segment):
+                self.segment_market_books[market_book.market_id] = market_book
+
+        updated_market_books = list(self.segment_market_books.values())
+
+        self.segments.clear()
+        self.segment_market_books.clear()
+
+        return updated_market_books
+
+    def apply(self, stream_update: BetfairMarketChangeMessage) -> List[MarketBook]:
         updated_market_books = []
 
         self.publish_time = stream_update["pt"]
 
+        if stream_update.get("initialClk") is not None:
+            self.initial_clk = stream_update["initialClk"]
+
+        if stream_update.get("clk") is not None:
+            self.clk = stream_update["clk"]
+
+        resubscribed = stream_update.get("ct") == "RESUB_DELTA"
+
         for market_update in stream_update.get("mc", []):
 
-            if market_update.get("img"):
-                market_book = MarketBook.create_new_market_book(market_update)
+            market_book = self.market_books.get(market_update["id"])
+            # A RESUB_DELTA applies as deltas to cached markets, but can define markets first seen in it.
+            defined = resubscribed and market_book is None and "marketDefinition" in market_update
+
+            if market_update.get("img") or defined:
+                if self.market_store is not None:
+                    market_book = self.market_store.create_market_book(market_update)
+                else:
+                    market_book = MarketBook.create_new_market_book(market_update, layout=self.layout)
+
+                self.market_books[market_book.market_id] = market_book
+            elif market_book is None:
+                if not resubscribed:
+                    raise KeyError(market_update["id"])
+
+                logger.warning(f"RESUB_DELTA for uncached market {market_update['id']}")
+                continue
+            elif self.market_store is not None:
+                market_book = self.market_store.update_market_book(market_book, market_update)
                 self.market_books[market_book.market_id] = market_book
             else:
-                market_book = self.market_books[market_update["id"]]
                 market_book.update(market_update)
 
             updated_market_books.append(market_book)
@@ -43,6 +117,16 @@ class MarketCache:
             mc=[market_book.serialise() for market_id, market_book in self.market_books.items()],
         )
 
+    def serialise_bytes(self) -> bytes:
+        # One encoder pass over numpy arrays, without building the nested lists of serialise.
+        return codec.dumps(
+            {
+                "op": "mcm",
+                "pt": self.publish_time,
+                "mc": [market_book.serialise_arrays() for market_book in self.market_books.values()],
+            }
+        )
+
     def __call__(self, stream_update: BetfairMarketChangeMessage) -> List[MarketBook]:
 
         if "pt" not in stream_update:
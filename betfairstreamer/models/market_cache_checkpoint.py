@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from typing import Any, Dict, Union
+
+import numpy as np
+
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.utils import MARKET_BOOK_ARRAYS, PathLike, align
+
+# Magic, then the length of the JSON header, then the header and the raw arrays at 64 byte aligned offsets.
+CHECKPOINT_MAGIC = b"BFSCKPT1"
+CHECKPOINT_PREFIX = struct.Struct("<8sQ")
+CHECKPOINT_VERSION = 1
+
+
+def create_checkpoint_header(market_cache: MarketCache) -> Dict[str, Any]:
+    markets = []
+    offset = 0
+
+    for market_book in market_cache.market_books.values():
+        arrays = {}
+
+        for name in MARKET_BOOK_ARRAYS:
+            array = getattr(market_book, name)
+            arrays[name] = [offset, array.dtype.str, list(array.shape)]
+            offset = align(offset + array.nbytes)
+
+        markets.append(
+            {
+                "id": market_book.market_id,
+                "marketDefinition": market_book.market_definition,
+                "sortPriorityMapping": list(market_book.sort_priority_mapping.items()),
+                "arrays": arrays,
+            }
+        )
+
+    return {
+        "version": CHECKPOINT_VERSION,
+        "pt": market_cache.publish_time,
+        "initialClk": market_cache.initial_clk,
+        "clk": market_cache.clk,
+        "size": offset,
+        "markets": markets,
+    }
+
+
+def save_checkpoint(market_cache: MarketCache, path: PathLike) -> None:
+    # Buffered segments are not saved, checkpoint between messages of a segmented image.
+    checkpoint_header = create_checkpoint_header(market_cache)
+    header = codec.dumps(checkpoint_header)
+    data_offset = align(CHECKPOINT_PREFIX.size + len(header))
+
+    path = os.fspath(path)
+    temporary_path = path + ".tmp"
+
+    with open(temporary_path, "wb") as f:
+        f.write(CHECKPOINT_PREFIX.pack(CHECKPOINT_MAGIC, len(header)))
+        f.write(header)
+
+        for market_book, market in zip(market_cache.market_books.values(), checkpoint_header["markets"]):
+            for name in MARKET_BOOK_ARRAYS:
+                f.seek(data_offset + market["arrays"][name][0])
+                f.write(np.ascontiguousarray(getattr(market_book, name)).data)
+
+        f.truncate(data_offset + checkpoint_header["size"])
+
+    # Readers never see a half written checkpoint.
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: PathLike, use_mmap: bool = True) -> MarketCache:
+    # The arrays are views on one buffer, a private copy on write mapping of the file or the file read into memory.
+    # Updates to the restored MarketCache never change the checkpoint.
+    with open(path, "rb") as f:
+        magic, header_length = CHECKPOINT_PREFIX.unpack(f.read(CHECKPOINT_PREFIX.size))
+
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(f"{os.fspath(path)} is not a MarketCache checkpoint")
+
+        header = codec.loads(f.read(header_length))
+
+        if header["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {header['version']}")
+
+        data_offset = align(CHECKPOINT_PREFIX.size + header_length)
+        buffer: Union[mmap.mmap, bytearray]
+
+        if use_mmap and header["size"] > 0:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            f.seek(0)
+            buffer = bytearray(f.read())
+
+    market_books: Dict[str, MarketBook] = {}
+
+    for market in header["markets"]:
+        arrays = {
+            name: np.frombuffer(
+                buffer, dtype=np.dtype(dtype), count=int(np.prod(shape)), offset=data_offset + offset
+            ).reshape(shape)
+            for name, (offset, dtype, shape) in market["arrays"].items()
+        }
+
+        market_books[market["id"]] = MarketBook(
+            market_id=market["id"],
+            market_definition=market["marketDefinition"],
+            sort_priority_mapping=dict(market["sortPriorityMapping"]),
+            **arrays,
+        )
+
+    return MarketCache(
+        market_books=market_books,
+        publish_time=header["pt"],
+        initial_clk=header["initialClk"],
+        clk=header["clk"],
+    )
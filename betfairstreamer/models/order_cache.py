@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import logging
 from collections import defaultdict
 from typing import Dict, List, Optional, Tuple
 
 import attr
 
-from betfairstreamer.models.betfair_api import BetfairOrderChangeMessage, CurrentOrderSummary, Side
+from betfairstreamer.models.betfair_api import (
+    BetfairOrderChangeMessage,
+    CurrentOrderSummary,
+    SegmentMode,
+    SegmentType,
+    Side,
+)
 from betfairstreamer.models.betfair_api_extensions import CurrentOrderSummaryRecord
 from betfairstreamer.models.order_book import Order
 
+logger = logging.getLogger("order_cache")
+
 
 @attr.s(auto_attribs=True, slots=True, weakref_slot=False)
 class OrderCache:
@@ -24,7 +33,46 @@ class OrderCache:
 
     latest_order: Dict[Tuple[str, int, Side], Order] = attr.Factory(dict)
 
+    segment_mode: SegmentMode = SegmentMode.BUFFER
+    segments: List[BetfairOrderChangeMessage] = attr.Factory(list)
+    segment_orders: Dict[str, Order] = attr.Factory(dict)
+
     def update(self, order_change_message: BetfairOrderChangeMessage) -> List[Order]:
+        segment_type = order_change_message.get("segmentType")
+
+        if segment_type is None:
+            return self.apply(order_change_message)
+
+        if segment_type == SegmentType.SEG_START.value and (self.segments or self.segment_orders):
+            # Eagerly applied segments stay in the cache, but are not published with the next message.
+            logger.warning(
+                f"SEG_START before SEG_END, dropping {len(self.segments)} buffered segments"
+                f" and {len(self.segment_orders)} updated orders"
+            )
+            self.segments.clear()
+            self.segment_orders.clear()
+
+        if self.segment_mode == SegmentMode.BUFFER:
+            self.segments.append(order_change_message)
+        else:
+            for order in self.apply(order_change_message):
+                self.segment_orders[order.bet_id] = order
+
+        if segment_type != SegmentType.SEG_END.value:
+            return []
+
+        for segment in self.segments:
+            for order in self.apply(segment):
+                self.segment_orders[order.bet_id] = order
+
+        updated_orders = list(self.segment_orders.values())
+
+        self.segments.clear()
+        self.segment_orders.clear()
+
+        return updated_orders
+
+    def apply(self, order_change_message: BetfairOrderChangeMessage) -> List[Order]:
         updated_orders = []
 
         for m in order_change_message.get("oc", []):
@@ -0,0 +1,469 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import attr
+import numpy as np
+from numpy.typing import DTypeLike
+
+from betfairstreamer import codec
+from betfairstreamer.models.betfair_api import BetfairMarketChange, BetfairMarketDefinition
+from betfairstreamer.models.market_book import FULL_LAYOUT, MarketBook, MarketBookLayout
+from betfairstreamer.utils import align
+
+# Segment header, uint64 words: seqlock, number of runners, definition version, length and capacity.
+SEQUENCE, NUMBER_OF_RUNNERS, DEFINITION_VERSION, DEFINITION_LENGTH, DEFINITION_CAPACITY = range(5)
+SEGMENT_HEADER_WORDS = 8
+
+DIRECTORY_DTYPE = np.dtype([("market_id", "S32"), ("segment", "S64"), ("generation", "<u8")])
+DIRECTORY_HEADER_WORDS = 8
+
+# Directory header, uint64 words: seqlock, number of markets, then the layout of the market book arrays, compact
+# and the bytes per size.
+DIRECTORY_COMPACT, DIRECTORY_SIZE_BYTES = 2, 3
+
+# Segments created by this process, their resource tracker registration belongs to the writer.
+CREATED_SEGMENTS: Set[str] = set()
+
+# Readers retry while the writer holds a seqlock. The first retries only yield, after that they sleep so a writer
+# sharing the core can finish.
+YIELD_RETRIES = 10
+RETRY_SLEEP = 0.0001
+
+
+def wait_for_writer(retries: int, deadline: float, name: str) -> None:
+    if time.monotonic() > deadline:
+        raise TimeoutError(f"The writer held the seqlock of {name} past the timeout")
+
+    time.sleep(0 if retries < YIELD_RETRIES else RETRY_SLEEP)
+
+
+def map_array(buffer: memoryview, shape: Tuple[int, ...], dtype: DTypeLike, offset: int = 0) -> np.ndarray:
+    # np.frombuffer holds an export of the buffer, so the memory cannot be closed under a live array.
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape))
+
+    return np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def create_shared_memory(size: int, name: Optional[str] = None) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    segment.buf[:size] = bytes(size)
+
+    CREATED_SEGMENTS.add(segment.name)
+
+    return segment
+
+
+def close_shared_memory(memory: shared_memory.SharedMemory) -> bool:
+    try:
+        memory.close()
+    except BufferError:
+        # A MarketBook still uses the arrays.
+        return False
+
+    return True
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(name=name)
+
+    # Readers must not unlink segments owned by the writer when they exit, python < 3.13 registers
+    # every attached segment with the resource tracker.
+    if segment.name not in CREATED_SEGMENTS:
+        resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+
+    return segment
+
+
+@attr.s(auto_attribs=True, slots=True)
+class SegmentLayout:
+    offsets: Dict[str, int]
+    shapes: Dict[str, Tuple[int, ...]]
+    dtypes: Dict[str, np.dtype]
+    selection_ids_offset: int
+    definition_offset: int
+    definition_capacity: int
+    size: int
+
+    @classmethod
+    def create(
+        cls, number_of_runners: int, definition_capacity: int, layout: MarketBookLayout = FULL_LAYOUT
+    ) -> SegmentLayout:
+        shapes = layout.create_array_shapes(number_of_runners)
+        dtypes = layout.create_array_dtypes()
+        offsets = {}
+        offset = align(SEGMENT_HEADER_WORDS * 8)
+
+        for name, shape in shapes.items():
+            offsets[name] = offset
+            offset = align(offset + int(np.prod(shape)) * dtypes[name].itemsize)
+
+        selection_ids_offset = offset
+        definition_offset = align(selection_ids_offset + number_of_runners * 8)
+
+        return cls(
+            offsets=offsets,
+            shapes=shapes,
+            dtypes=dtypes,
+            selection_ids_offset=selection_ids_offset,
+            definition_offset=definition_offset,
+            definition_capacity=definition_capacity,
+            size=definition_offset + definition_capacity,
+        )
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MarketSegment:
+    memory: shared_memory.SharedMemory
+    layout: SegmentLayout
+    generation: int
+    header: np.ndarray
+    arrays: Dict[str, np.ndarray]
+    selection_ids: np.ndarray
+    definition: np.ndarray
+
+    @classmethod
+    def map(cls, memory: shared_memory.SharedMemory, layout: SegmentLayout, generation: int) -> MarketSegment:
+        buffer = memory.buf
+
+        return cls(
+            memory=memory,
+            layout=layout,
+            generation=generation,
+            header=map_array(buffer, (SEGMENT_HEADER_WORDS,), "<u8"),
+            arrays={
+                name: map_array(buffer, shape, layout.dtypes[name], layout.offsets[name])
+                for name, shape in layout.shapes.items()
+            },
+            selection_ids=map_array(buffer, (layout.shapes["metadata"][0],), "<i8", layout.selection_ids_offset),
+            definition=map_array(buffer, (layout.definition_capacity,), np.uint8, layout.definition_offset),
+        )
+
+    def close(self) -> bool:
+        # The numpy views hold exports of the buffer, they have to go before the memory can be closed.
+        self.header = self.selection_ids = self.definition = np.empty(0)
+        self.arrays = {}
+
+        return close_shared_memory(self.memory)
+
+
+@attr.s(auto_attribs=True)
+class SharedMarketStore:
+    # One writer process owns the market books and writes them into shared memory, any number of reader
+    # processes attach by name. Every market has its own segment guarded by a seqlock, the directory
+    # segment maps market ids to segment names.
+    directory_memory: shared_memory.SharedMemory
+    owner: bool
+    directory_header: np.ndarray = attr.ib(init=False)
+    directory: np.ndarray = attr.ib(init=False)
+    # Written by the writer into the directory header, readers take it from there.
+    layout: MarketBookLayout = attr.ib(init=False)
+    segments: Dict[str, MarketSegment] = attr.ib(factory=dict)
+    definitions: Dict[str, Tuple[int, int, BetfairMarketDefinition]] = attr.ib(factory=dict)
+    published_definitions: Dict[str, BetfairMarketDefinition] = attr.ib(factory=dict)
+    indices: Dict[str, int] = attr.ib(factory=dict)
+    # Replaced segments still used by market books, closed once those are gone.
+    retired: List[shared_memory.SharedMemory] = attr.ib(factory=list)
+
+    def __attrs_post_init__(self) -> None:
+        buffer = self.directory_memory.buf
+        capacity = (len(buffer) - DIRECTORY_HEADER_WORDS * 8) // DIRECTORY_DTYPE.itemsize
+
+        self.directory_header = map_array(buffer, (DIRECTORY_HEADER_WORDS,), "<u8")
+        self.directory = map_array(buffer, (capacity,), DIRECTORY_DTYPE, DIRECTORY_HEADER_WORDS * 8)
+        self.layout = MarketBookLayout(
+            compact=bool(self.directory_header[DIRECTORY_COMPACT]),
+            size_dtype=np.dtype(f"<f{int(self.directory_header[DIRECTORY_SIZE_BYTES]) or 8}").name,
+        )
+
+    @property
+    def name(self) -> str:
+        return self.directory_memory.name
+
+    @property
+    def capacity(self) -> int:
+        return len(self.directory)
+
+    @classmethod
+    def create(
+        cls, name: Optional[str] = None, capacity: int = 1024, layout: MarketBookLayout = FULL_LAYOUT
+    ) -> SharedMarketStore:
+        size = DIRECTORY_HEADER_WORDS * 8 + capacity * DIRECTORY_DTYPE.itemsize
+        directory_memory = create_shared_memory(size, name)
+
+        directory_header = map_array(directory_memory.buf, (DIRECTORY_HEADER_WORDS,), "<u8")
+        directory_header[DIRECTORY_COMPACT] = layout.compact
+        directory_header[DIRECTORY_SIZE_BYTES] = np.dtype(layout.size_dtype).itemsize
+        del directory_header
+
+        return cls(directory_memory=directory_memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedMarketStore:
+        return cls(directory_memory=attach_shared_memory(name), owner=False)
+
+    # Writer
+
+    @contextmanager
+    def write(self, market_id: str) -> Iterator[MarketSegment]:
+        segment = self.segments[market_id]
+
+        segment.header[SEQUENCE] += 1
+
+        try:
+            yield segment
+        finally:
+            segment.header[SEQUENCE] += 1
+
+    def write_definition(self, segment: MarketSegment, market_book: MarketBook) -> None:
+        if self.published_definitions.get(market_book.market_id) is market_book.market_definition:
+            return
+
+        definition = codec.dumps(market_book.market_definition)
+
+        if len(definition) > segment.layout.definition_capacity:
+            raise ValueError(f"Market definition of {market_book.market_id} does not fit its segment")
+
+        segment.definition[: len(definition)] = np.frombuffer(definition, dtype=np.uint8)
+        segment.header[DEFINITION_LENGTH] = len(definition)
+        segment.header[DEFINITION_VERSION] += 1
+
+        for selection_id, sort_priority in market_book.sort_priority_mapping.items():
+            segment.selection_ids[sort_priority - 1] = selection_id
+
+        self.published_definitions[market_book.market_id] = market_book.market_definition
+
+    def create_segment(self, market_id: str, number_of_runners: int, definition_size: int) -> MarketSegment:
+        layout = SegmentLayout.create(
+            number_of_runners, definition_capacity=max(4096, align(definition_size * 2)), layout=self.layout
+        )
+        memory = create_shared_memory(layout.size)
+
+        index = self.find(market_id)
+
+        if index is None:
+            index = int(self.directory_header[1])
+
+            if index >= self.capacity:
+                memory.close()
+                memory.unlink()
+                raise ValueError(f"Shared market store is full, capacity {self.capacity}")
+
+        entry = self.directory[index]
+        generation = int(entry["generation"]) + 1
+
+        segment = MarketSegment.map(memory, layout, generation)
+        segment.header[NUMBER_OF_RUNNERS] = number_of_runners
+        segment.header[DEFINITION_CAPACITY] = layout.definition_capacity
+
+        # Directory seqlock, readers retry while an entry is being replaced.
+        self.directory_header[0] += 1
+        self.directory[index] = (market_id.encode(), memory.name.encode(), generation)
+        self.directory_header[1] = max(int(self.directory_header[1]), index + 1)
+        self.directory_header[0] += 1
+
+        old = self.segments.pop(market_id, None)
+
+        if old is not None:
+            # Readers that still map the old segment keep it until they see the new generation.
+            old.memory.unlink()
+            self.retire(old)
+
+        self.segments[market_id] = segment
+        self.published_definitions.pop(market_id, None)
+
+        return segment
+
+    def create_market_book(self, market_change: BetfairMarketChange) -> MarketBook:
+        market_id = market_change["id"]
+        market_definition = market_change["marketDefinition"]
+        number_of_runners = len(market_definition["runners"])
+        definition_size = len(codec.dumps(market_definition))
+
+        segment = self.segments.get(market_id)
+
+        if (
+            segment is None
+            or segment.header[NUMBER_OF_RUNNERS] != number_of_runners
+            or definition_size > segment.layout.definition_capacity
+        ):
+            self.create_segment(market_id, number_of_runners, definition_size)
+
+        with self.write(market_id) as segment:
+            for array in segment.arrays.values():
+                array[:] = 0
+
+            market_book = MarketBook.create_new_market_book(market_change, arrays=segment.arrays)
+            self.write_definition(segment, market_book)
+
+        return market_book
+
+    def update_market_book(self, market_book: MarketBook, market_change: BetfairMarketChange) -> MarketBook:
+        market_definition = market_change.get("marketDefinition")
+        segment = self.segments[market_book.market_id]
+
+        if market_definition is not None:
+            definition_size = len(codec.dumps(market_definition))
+
+            if definition_size > segment.layout.definition_capacity:
+                # The market book keeps the old mapping alive until its arrays are moved over.
+                segment = self.create_segment(market_book.market_id, len(market_book.metadata), definition_size)
+
+                for name, array in segment.arrays.items():
+                    array[:] = getattr(market_book, name)
+                    setattr(market_book, name, array)
+
+        with self.write(market_book.market_id) as segment:
+            market_book.update(market_change)
+            self.write_definition(segment, market_book)
+
+        return market_book
+
+    def retire(self, segment: MarketSegment) -> None:
+        if not segment.close():
+            self.retired.append(segment.memory)
+
+        self.retired = [memory for memory in self.retired if not close_shared_memory(memory)]
+
+    def unlink(self) -> None:
+        for segment in self.segments.values():
+            segment.memory.unlink()
+
+        self.close()
+        self.directory_memory.unlink()
+
+    # Reader
+
+    def find(self, market_id: str) -> Optional[int]:
+        # Directory entries never move, only new markets are appended.
+        count = int(self.directory_header[1])
+
+        if market_id not in self.indices and len(self.indices) < count:
+            for i, entry in enumerate(self.directory[len(self.indices) : count].tolist(), len(self.indices)):
+                self.indices[entry[0].decode()] = i
+
+        return self.indices.get(market_id)
+
+    def market_ids(self) -> List[str]:
+        return [entry["market_id"].decode() for entry in self.directory[: int(self.directory_header[1])]]
+
+    def read_directory(self, market_id: str, timeout: float = 1.0) -> Optional[Tuple[str, int]]:
+        deadline = time.monotonic() + timeout
+        retries = 0
+
+        while True:
+            sequence = int(self.directory_header[0])
+
+            if sequence % 2 == 0:
+                index = self.find(market_id)
+                entry = None
+
+                if index is not None:
+                    entry = (self.directory[index]["segment"].decode(), int(self.directory[index]["generation"]))
+
+                if int(self.directory_header[0]) == sequence:
+                    return entry
+
+            wait_for_writer(retries, deadline, "the directory")
+            retries += 1
+
+    def get_segment(self, market_id: str, timeout: float = 1.0) -> Optional[MarketSegment]:
+        segment = self.segments.get(market_id)
+
+        if self.owner:
+            return segment
+
+        entry = self.read_directory(market_id, timeout)
+
+        if entry is None:
+            return None
+
+        segment_name, generation = entry
+
+        if segment is None or segment.generation != generation:
+            if segment is not None:
+                self.retire(segment)
+
+            try:
+                memory = attach_shared_memory(segment_name)
+            except FileNotFoundError:
+                # Replaced between reading the directory and attaching.
+                return None
+
+            header = map_array(memory.buf, (SEGMENT_HEADER_WORDS,), "<u8")
+            layout = SegmentLayout.create(
+                int(header[NUMBER_OF_RUNNERS]), int(header[DEFINITION_CAPACITY]), layout=self.layout
+            )
+            del header
+
+            segment = self.segments[market_id] = MarketSegment.map(memory, layout, generation)
+
+        return segment
+
+    def version(self, market_id: str) -> int:
+        # Even while stable, changes every time the writer updates the market, cheap to poll for changes.
+        segment = self.get_segment(market_id)
+
+        return -1 if segment is None else int(segment.header[SEQUENCE])
+
+    def get_cached_definition(
+        self, market_id: str, segment: MarketSegment, definition_version: int
+    ) -> Optional[BetfairMarketDefinition]:
+        cached = self.definitions.get(market_id)
+
+        # Versions restart in a replaced segment, the generation tells them apart.
+        if cached is None or cached[:2] != (segment.generation, definition_version):
+            return None
+
+        return cached[2]
+
+    def snapshot(self, market_id: str, timeout: float = 1.0) -> Optional[MarketBook]:
+        # Copies the arrays between two reads of the seqlock and retries if the writer was active. A changed
+        # definition is copied as bytes too, and only decoded once the copy is known to be consistent.
+        deadline = time.monotonic() + timeout
+        retries = 0
+
+        while True:
+            segment = self.get_segment(market_id, timeout)
+
+            if segment is None:
+                return None
+
+            sequence = int(segment.header[SEQUENCE])
+
+            if sequence % 2 == 0 and sequence != 0:
+                arrays = {name: array.copy() for name, array in segment.arrays.items()}
+                selection_ids = segment.selection_ids.tolist()
+                definition_version = int(segment.header[DEFINITION_VERSION])
+                market_definition = self.get_cached_definition(market_id, segment, definition_version)
+                definition = b""
+
+                if market_definition is None:
+                    definition = segment.definition[: int(segment.header[DEFINITION_LENGTH])].tobytes()
+
+                if segment.header[SEQUENCE] == sequence and segment.header[DEFINITION_VERSION] == definition_version:
+                    if market_definition is None:
+                        market_definition = codec.loads(definition)
+                        self.definitions[market_id] = (segment.generation, definition_version, market_definition)
+
+                    return MarketBook(
+                        market_id=market_id,
+                        market_definition=market_definition,
+                        sort_priority_mapping={selection_id: i + 1 for i, selection_id in enumerate(selection_ids)},
+                        **arrays,
+                    )
+
+            wait_for_writer(retries, deadline, market_id)
+            retries += 1
+
+    def close(self) -> None:
+        for segment in list(self.segments.values()):
+            self.retire(segment)
+
+        self.segments.clear()
+        self.directory_header = self.directory = np.empty(0)
+        self.directory_memory.close()
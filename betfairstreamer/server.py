@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import select
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import attr
+
+from betfairstreamer import codec
+from betfairstreamer.historical.reader import read_historical_file
+from betfairstreamer.stream.stream_parser import BufferParser
+from betfairstreamer.utils import encode
+
+logger = logging.getLogger("betfairstreamer_server")
+
+# Accept and idle clients wake up this often to check whether the server was stopped.
+POLL_INTERVAL = 0.2
+
+# Frames sent in a row before the client socket is checked for requests again.
+SEND_BATCH = 100
+
+# marketFilter keys matched against fields of the market definition.
+MARKET_FILTER_FIELDS = [
+    ("eventTypeIds", "eventTypeId"),
+    ("eventIds", "eventId"),
+    ("countryCodes", "countryCode"),
+    ("marketTypes", "marketType"),
+    ("venues", "venue"),
+    ("bettingTypes", "bettingType"),
+    ("raceTypes", "raceType"),
+]
+
+
+def market_filter_matches(
+    market_filter: Dict[str, Any], market_id: str, market_definition: Optional[Dict[str, Any]]
+) -> bool:
+    market_ids = market_filter.get("marketIds")
+
+    if market_ids and market_id not in market_ids:
+        return False
+
+    definition = market_definition or {}
+
+    for filter_key, definition_key in MARKET_FILTER_FIELDS:
+        values = market_filter.get(filter_key)
+
+        if values and definition.get(definition_key) not in values:
+            return False
+
+    for filter_key, definition_key in [("bspMarket", "bspMarket"), ("turnInPlayEnabled", "turnInPlayEnabled")]:
+        value = market_filter.get(filter_key)
+
+        if value is not None and definition.get(definition_key) != value:
+            return False
+
+    return True
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+@attr.s(auto_attribs=True)
+class ClientSession:
+    client: socket.socket
+    parser: BufferParser = attr.Factory(BufferParser)
+    pending: List[bytes] = attr.Factory(list)
+
+    def poll_request(self, timeout: float) -> Optional[Dict[str, Any]]:
+        # Waits at most timeout for a request, a request split over several reads is returned once it is complete.
+        if not self.pending:
+            buffered = isinstance(self.client, ssl.SSLSocket) and self.client.pending() > 0
+
+            if buffered or select.select([self.client], [], [], timeout)[0]:
+                part = self.client.recv(8192)
+
+                if part == b"":
+                    raise ClientDisconnected()
+
+                self.pending.extend(self.parser.parse_message(part))
+
+        return codec.loads(self.pending.pop(0)) if self.pending else None
+
+    def read_request(self) -> Dict[str, Any]:
+        while True:
+            request = self.poll_request(POLL_INTERVAL)
+
+            if request is not None:
+                return request
+
+    def send(self, msg: Dict[str, Any]) -> None:
+        self.client.sendall(encode(msg))  # type: ignore
+
+
+@attr.s(auto_attribs=True)
+class Subscription:
+    request: Dict[str, Any]
+    speed: float
+    # Replayed messages of a market subscription, order subscriptions only get heartbeats.
+    messages: Optional[Iterator[Dict[str, Any]]] = None
+    next_message: Optional[Dict[str, Any]] = None
+    due: float = 0.0
+    start: float = attr.Factory(time.monotonic)
+    first_pt: Optional[int] = None
+    last_sent: float = attr.Factory(time.monotonic)
+    sent: int = 0
+
+    def __attrs_post_init__(self) -> None:
+        self.advance()
+
+    @property
+    def heartbeat(self) -> float:
+        return (self.request.get("heartbeatMs") or 5000) / 1000
+
+    def advance(self) -> None:
+        self.next_message = None if self.messages is None else next(self.messages, None)
+
+        if self.next_message is None:
+            return
+
+        pt = self.next_message["pt"]
+
+        if self.first_pt is None:
+            self.first_pt = pt
+
+        self.due = self.start + (pt - self.first_pt) / 1000 / self.speed if self.speed > 0 else 0.0
+
+    def next_event(self) -> float:
+        heartbeat = self.last_sent + self.heartbeat
+
+        return heartbeat if self.next_message is None else min(self.due, heartbeat)
+
+    def send_due(self, session: ClientSession, now: float) -> None:
+        for _ in range(SEND_BATCH):
+            if self.next_message is None or self.due > now:
+                break
+
+            session.send(self.next_message)
+            self.sent += 1
+            self.last_sent = now
+            self.advance()
+
+            if self.next_message is None:
+                logger.info(f"Replayed {self.sent} messages in {time.monotonic() - self.start:.2f} s")
+
+        # Like Betfair, a heartbeat when nothing was sent on the subscription for heartbeatMs.
+        if now - self.last_sent >= self.heartbeat:
+            session.send(create_heartbeat(self.request))
+            self.last_sent = now
+
+
+@attr.s(auto_attribs=True)
+class StreamServer:
+    # Stand-in for stream-api.betfair.com that replays historical files to every market subscription.
+    files: List[str]
+    host: str = "127.0.0.1"
+    port: int = 0
+    speed: float = 1.0
+    certfile: Optional[str] = None
+    keyfile: Optional[str] = None
+    session_token: Optional[str] = None
+    server_socket: Optional[socket.socket] = None
+    ssl_context: Optional[ssl.SSLContext] = None
+    clients: Dict[int, socket.socket] = attr.ib(factory=dict)
+    stopped: threading.Event = attr.ib(factory=threading.Event)
+    connection_count: int = 0
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        assert self.server_socket is not None, "Server is not bound"
+        return self.server_socket.getsockname()[:2]
+
+    def bind(self) -> Tuple[str, int]:
+        if self.certfile is not None:
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ssl_context.load_cert_chain(self.certfile, self.keyfile)
+
+        self.server_socket = socket.create_server((self.host, self.port))
+
+        logger.info(f"Listening on {self.address}, ssl: {self.ssl_context is not None}")
+
+        return self.address
+
+    def serve_forever(self) -> None:
+        if self.server_socket is None:
+            self.bind()
+
+        assert self.server_socket is not None
+
+        # accept times out so a stop from another thread is seen, closing the socket does not wake accept up.
+        self.server_socket.settimeout(POLL_INTERVAL)
+
+        try:
+            while not self.stopped.is_set():
+                try:
+                    client, address = self.server_socket.accept()
+                except socket.timeout:
+                    continue
+
+                client.settimeout(None)
+
+                self.connection_count += 1
+                threading.Thread(
+                    target=self.handle_client, args=(client, self.connection_count), daemon=True
+                ).start()
+        finally:
+            self.server_socket.close()
+
+    def start(self) -> threading.Thread:
+        self.bind()
+
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+
+        return thread
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+        for client in list(self.clients.values()):
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def handle_client(self, client: socket.socket, connection_id: int) -> None:
+        self.clients[connection_id] = client
+
+        try:
+            if self.ssl_context is not None:
+                client = self.ssl_context.wrap_socket(client, server_side=True)
+                self.clients[connection_id] = client
+
+            self.serve_client(ClientSession(client=client), connection_id)
+        except (ClientDisconnected, OSError) as e:
+            logger.info(f"Connection {connection_id} closed, {e!r}")
+        finally:
+            self.clients.pop(connection_id, None)
+            client.close()
+
+    def serve_client(self, session: ClientSession, connection_id: int) -> None:
+        session.send({"op": "connection", "connectionId": f"replay-{connection_id}"})
+
+        authentication = session.read_request()
+
+        if authentication.get("op") != "authentication" or (
+            self.session_token is not None and authentication.get("session") != self.session_token
+        ):
+            session.send(
+                {
+                    "op": "status",
+                    "id": authentication.get("id"),
+                    "statusCode": "FAILURE",
+                    "errorCode": "NO_SESSION",
+                    "connectionClosed": True,
+                }
+            )
+            return
+
+        session.send({"op": "status", "id": authentication.get("id"), "statusCode": "SUCCESS"})
+
+        # Requests are read between the frames and heartbeats of the subscriptions, a new subscription replaces the
+        # previous one of its kind.
+        subscriptions: Dict[str, Subscription] = {}
+
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            next_event = min((s.next_event() for s in subscriptions.values()), default=now + POLL_INTERVAL)
+            request = session.poll_request(min(max(0.0, next_event - now), POLL_INTERVAL))
+
+            if request is not None:
+                self.handle_request(session, request, subscriptions)
+                continue
+
+            now = time.monotonic()
+
+            for subscription in subscriptions.values():
+                subscription.send_due(session, now)
+
+    def handle_request(
+        self, session: ClientSession, request: Dict[str, Any], subscriptions: Dict[str, Subscription]
+    ) -> None:
+        op = request.get("op")
+
+        session.send({"op": "status", "id": request.get("id"), "statusCode": "SUCCESS"})
+
+        if op == "marketSubscription":
+            subscriptions[op] = Subscription(request=request, speed=self.speed, messages=self.replay(request))
+        elif op == "orderSubscription":
+            subscriptions[op] = Subscription(request=request, speed=self.speed)
+
+    def read_messages(self, market_filter: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        # Market changes of the historical files that match the filter, by the definitions seen so far.
+        market_definitions: Dict[str, Dict[str, Any]] = {}
+
+        for path in self.files:
+            for line in read_historical_file(path):
+                message = codec.loads(line)
+
+                if message.get("op") != "mcm" or "pt" not in message:
+                    continue
+
+                mc = []
+
+                for market_change in message.get("mc", []):
+                    market_id = market_change["id"]
+
+                    if "marketDefinition" in market_change:
+                        market_definitions[market_id] = market_change["marketDefinition"]
+
+                    if market_filter_matches(market_filter, market_id, market_definitions.get(market_id)):
+                        mc.append(market_change)
+
+                if mc:
+                    yield {"op": "mcm", "clk": message.get("clk", str(message["pt"])), "pt": message["pt"], "mc": mc}
+
+    def replay(self, subscription: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        # A subscription with clocks resumes after the message with that clk as a RESUB_DELTA, the way Betfair
+        # does after a reconnect. Unknown clocks get images from the start.
+        market_filter: Dict[str, Any] = subscription.get("marketFilter") or {}
+        messages = self.read_messages(market_filter)
+        clk = subscription.get("clk")
+        ct = "SUB_IMAGE"
+
+        if clk is not None:
+            for message in messages:
+                if message["clk"] == clk:
+                    ct = "RESUB_DELTA"
+                    break
+            else:
+                logger.warning(f"clk {clk} is not in the replayed files, replaying from the start")
+                messages = self.read_messages(market_filter)
+
+        for i, message in enumerate(messages):
+            message["id"] = subscription.get("id")
+
+            if i == 0:
+                message["ct"] = ct
+                message["initialClk"] = subscription.get("initialClk") if ct == "RESUB_DELTA" else message["clk"]
+
+            yield message
+
+
+def create_heartbeat(subscription: Dict[str, Any]) -> Dict[str, Any]:
+    return {"op": "mcm", "id": subscription.get("id"), "ct": "HEARTBEAT", "pt": int(time.time() * 1000)}
+
+
+def start() -> None:
+    parser = argparse.ArgumentParser(description="Replay historical Betfair stream files as a local stream server.")
+    parser.add_argument("files", nargs="+", help="historical files, plain, bz2, gz or zst")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier, 0 replays at max speed")
+    parser.add_argument("--certfile", help="certificate for TLS, plain TCP if omitted")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--session-token", help="reject authentication with any other session token")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = StreamServer(
+        files=args.files,
+        host=args.host,
+        port=args.port,
+        speed=args.speed,
+        certfile=args.certfile,
+        keyfile=args.keyfile,
+        session_token=args.session_token,
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    start()
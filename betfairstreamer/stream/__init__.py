@@ -1,3 +1,4 @@
 from betfairstreamer.api_client import BetfairAPIClient
 from betfairstreamer.helpers.stream_helpers import create_market_subscription, create_order_subscription
+from betfairstreamer.stream.betfair_async_connection_pool import AsyncBetfairConnectionPool
 from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
@@ -1,68 +1,127 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import ssl
 from asyncio import StreamReader, StreamWriter
-from typing import Any, Dict, List, Tuple, Union
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 import attr
 
-from betfairstreamer.models.betfair_api import (
-    OP,
-    BetfairAuthenticationMessage,
-    BetfairMarketSubscriptionMessage,
-    BetfairOrderSubscriptionMessage,
-)
+from betfairstreamer.models.betfair_api import OP, BetfairAuthenticationMessage
 from betfairstreamer.models.betfair_api_extensions import BetfairMessage
-from betfairstreamer.stream.stream_parser import Parser
-from betfairstreamer.utils import encode
+from betfairstreamer.stream.betfair_connection import STREAM_HOSTNAME, STREAM_PORT
+from betfairstreamer.stream.protocols import MessageParser
+from betfairstreamer.stream.receive_buffer import ReceiveBuffer, ReceiveStatistics
+from betfairstreamer.stream.stream_parser import BufferParser
+from betfairstreamer.utils import decode, encode
 
+logger = logging.getLogger("betfair_async_connection")
 
-async def create_async_socket() -> Tuple[StreamReader, StreamWriter]:
-    hostname = "stream-api.betfair.com"
-    port = 443
 
-    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-    ssl_context.check_hostname = False
+async def create_async_socket(
+    hostname: str = STREAM_HOSTNAME,
+    port: int = STREAM_PORT,
+    use_ssl: bool = True,
+    ssl_context: Optional[ssl.SSLContext] = None,
+) -> Tuple[StreamReader, StreamWriter]:
+    if not use_ssl:
+        return await asyncio.open_connection(hostname, port)
 
-    return await asyncio.open_connection(*(hostname, port), ssl=ssl_context)
+    return await asyncio.open_connection(hostname, port, ssl=ssl_context or ssl.create_default_context())
 
 
 @attr.s(auto_attribs=True, slots=True)
 class BetfairAsyncConnection:
     reader: StreamReader
     writer: StreamWriter
-    parser: Parser = attr.Factory(Parser)
+    parser: MessageParser = attr.Factory(BufferParser)
+    receive_buffer: ReceiveBuffer = attr.Factory(ReceiveBuffer)
+    subscription_message: Optional[BetfairMessage] = None
+    pending: Deque[bytes] = attr.Factory(deque)
+
+    @property
+    def receive_statistics(self) -> ReceiveStatistics:
+        return self.receive_buffer.statistics
 
     async def read(self) -> List[bytes]:
-        part = await self.reader.read(8192)
+        if self.pending:
+            messages = list(self.pending)
+            self.pending.clear()
+            return messages
+
+        # StreamReader has no recv_into, but read(n) returns everything already buffered up to n,
+        # so the adaptive size still lets a burst be drained in one call.
+        part = await self.reader.read(self.receive_buffer.size)
 
         if part == b"":
             raise ConnectionError("Betfair closed connection.")
 
+        self.receive_buffer.record(len(part))
+        self.receive_buffer.statistics.reads += 1
+
         return self.parser.parse_message(part)
 
+    async def read_response(self) -> Dict[str, Any]:
+        messages: List[bytes] = []
+
+        while not messages:
+            messages = await self.read()
+
+        # Anything that arrived together with the response, e.g. the first image, is kept for the next read.
+        self.pending.extend(messages[1:])
+
+        return decode(messages[0])
+
     async def send(self, msg: BetfairMessage) -> None:
         self.writer.write(encode(msg))
         await self.writer.drain()
 
+    async def close(self) -> None:
+        self.writer.close()
+
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, ssl.SSLError):
+            pass
+
     @classmethod
     async def create_connection(
-        cls, subscription_message: BetfairMessage, session_token: str, app_key: str
+        cls,
+        subscription_message: BetfairMessage,
+        session_token: str,
+        app_key: str,
+        hostname: str = STREAM_HOSTNAME,
+        port: int = STREAM_PORT,
+        use_ssl: bool = True,
+        ssl_context: Optional[ssl.SSLContext] = None,
     ) -> BetfairAsyncConnection:
-        reader, writer = await create_async_socket()
-        connection = cls(reader=reader, writer=writer)
+        reader, writer = await create_async_socket(hostname, port, use_ssl, ssl_context)
+        connection = cls(reader=reader, writer=writer, subscription_message=subscription_message)
 
-        print(await connection.read())
+        logger.info(await connection.read_response())
 
         auth_message = BetfairAuthenticationMessage(
             op=OP.authentication.value, id=subscription_message["id"], session=session_token, appKey=app_key,
         )
 
         await connection.send(auth_message)
-        print(await connection.read())
+        auth_response = await connection.read_response()
+
+        logger.info(auth_response)
+
+        if auth_response["statusCode"] == "FAILURE":
+            await connection.close()
+            raise ConnectionError(auth_response["errorCode"])
 
         await connection.send(subscription_message)
-        print(await reader.readuntil(b"\r\n"))
+        subscription_response = await connection.read_response()
+
+        logger.info(f"Subscription, {subscription_response['statusCode']}")
+
+        if subscription_response["statusCode"] == "FAILURE":
+            await connection.close()
+            raise ConnectionError(subscription_response["errorCode"])
 
         return connection
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import ssl
+from typing import AsyncGenerator, List, Optional, Tuple, Union
+
+import attr
+
+from betfairstreamer.models.betfair_api import BetfairMarketSubscriptionMessage, BetfairOrderSubscriptionMessage
+from betfairstreamer.stream.betfair_async_connection import BetfairAsyncConnection
+from betfairstreamer.stream.betfair_connection import STREAM_HOSTNAME, STREAM_PORT
+
+logger = logging.getLogger("betfair_async_connection_pool")
+
+QueueItem = Tuple[BetfairAsyncConnection, Union[List[bytes], BaseException]]
+
+
+def install_uvloop() -> bool:
+    try:
+        import uvloop
+    except ImportError:
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    return True
+
+
+@attr.s(auto_attribs=True)
+class AsyncBetfairConnectionPool:
+    max_queue_size: int = 1000
+    connections: List[BetfairAsyncConnection] = attr.ib(factory=list)
+    tasks: List["asyncio.Task[None]"] = attr.ib(factory=list)
+    queue: Optional["asyncio.Queue[QueueItem]"] = None
+
+    def get_queue(self) -> "asyncio.Queue[QueueItem]":
+        # Created lazily so the queue binds to the running event loop.
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        return self.queue
+
+    async def read_connection(self, connection: BetfairAsyncConnection) -> None:
+        queue = self.get_queue()
+
+        try:
+            while True:
+                frames = await connection.read()
+
+                if frames:
+                    # Waits while the consumer is behind, so the socket is not read and TCP pushes back.
+                    await queue.put((connection, frames))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((connection, e))
+
+    def add_connection(self, connection: BetfairAsyncConnection) -> None:
+        self.connections.append(connection)
+        self.tasks.append(asyncio.get_running_loop().create_task(self.read_connection(connection)))
+
+    async def remove_connection(self, connection: BetfairAsyncConnection) -> None:
+        index = self.connections.index(connection)
+
+        self.connections.pop(index)
+        task = self.tasks.pop(index)
+        task.cancel()
+
+        await asyncio.gather(task, return_exceptions=True)
+        await connection.close()
+
+    async def read_with_connection(self) -> AsyncGenerator[Tuple[BetfairAsyncConnection, List[bytes]], None]:
+        queue = self.get_queue()
+
+        while True:
+            connection, frames = await queue.get()
+
+            if isinstance(frames, BaseException):
+                raise frames
+
+            yield connection, frames
+
+    async def read(self) -> AsyncGenerator[bytes, None]:
+        async for _, frames in self.read_with_connection():
+            for m in frames:
+                yield m
+
+    def __aiter__(self) -> AsyncGenerator[bytes, None]:
+        return self.read()
+
+    async def close(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await asyncio.gather(*[c.close() for c in self.connections], return_exceptions=True)
+
+        self.tasks.clear()
+        self.connections.clear()
+
+    @classmethod
+    async def create_connection_pool(
+        cls,
+        subscription_messages: List[Union[BetfairMarketSubscriptionMessage, BetfairOrderSubscriptionMessage]],
+        session_token: str,
+        app_key: str,
+        max_queue_size: int = 1000,
+        hostname: str = STREAM_HOSTNAME,
+        port: int = STREAM_PORT,
+        use_ssl: bool = True,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> AsyncBetfairConnectionPool:
+        connection_pool = cls(max_queue_size=max_queue_size)
+
+        results = await asyncio.gather(
+            *[
+                BetfairAsyncConnection.create_connection(
+                    subscription_message, session_token, app_key, hostname, port, use_ssl, ssl_context
+                )
+                for subscription_message in subscription_messages
+            ],
+            return_exceptions=True,
+        )
+
+        connections = [r for r in results if isinstance(r, BetfairAsyncConnection)]
+        errors = [r for r in results if isinstance(r, BaseException)]
+
+        if errors:
+            await asyncio.gather(*[c.close() for c in connections], return_exceptions=True)
+            raise errors[0]
+
+        for connection in connections:
+            connection_pool.add_connection(connection)
+
+        return connection_pool
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
-import json
 import logging
 import socket
 import ssl
-from typing import List, Optional
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 
 import attr
 
+from betfairstreamer.helpers.stream_helpers import create_resubscription_message
+from betfairstreamer.historical.recorder import StreamId, StreamRecorder
 from betfairstreamer.models.betfair_api import OP, BetfairAuthenticationMessage
 from betfairstreamer.models.betfair_api_extensions import BetfairMessage
-from betfairstreamer.stream.protocols import Connection
-from betfairstreamer.stream.stream_parser import Parser
+from betfairstreamer.stream.frame_classifier import FrameClassifier, StreamState, classify_frame
+from betfairstreamer.stream.protocols import Connection, MessageParser
+from betfairstreamer.stream.receive_buffer import ReceiveBuffer, ReceiveStatistics
+from betfairstreamer.stream.stream_parser import BufferParser
 from betfairstreamer.utils import decode, encode
 
 logger = logging.getLogger("betfair_connection")
@@ -25,36 +30,141 @@ def create_auth_message(auth_id: int, session_token: str, app_key: str) -> Betfa
     return auth_message
 
 
-def create_betfair_socket() -> socket.socket:
-    hostname = "stream-api.betfair.com"
-    port = 443
+STREAM_HOSTNAME = "stream-api.betfair.com"
+STREAM_PORT = 443
 
-    ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
 
+def create_betfair_socket(
+    hostname: str = STREAM_HOSTNAME,
+    port: int = STREAM_PORT,
+    use_ssl: bool = True,
+    ssl_context: Optional[ssl.SSLContext] = None,
+    timeout: Optional[float] = None,
+) -> socket.socket:
     betfair_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    betfair_ssl_socket = ssl_context.wrap_socket(betfair_socket)
+    # Bounds the connect and TLS handshake, the socket keeps it until the caller resets it.
+    betfair_socket.settimeout(timeout)
 
-    betfair_ssl_socket.connect((hostname, port))
+    if use_ssl:
+        # A Purpose.CLIENT_AUTH context is server side on python >= 3.10 and cannot connect.
+        ssl_context = ssl_context or ssl.create_default_context()
+        betfair_socket = ssl_context.wrap_socket(betfair_socket, server_hostname=hostname)
 
-    return betfair_ssl_socket
+    betfair_socket.connect((hostname, port))
+
+    return betfair_socket
 
 
 @attr.s(auto_attribs=True, slots=True)
 class BetfairConnection(Connection):
     app_key: str
+    hostname: str = STREAM_HOSTNAME
+    port: int = STREAM_PORT
+    use_ssl: bool = True
+    ssl_context: Optional[ssl.SSLContext] = None
     buffer_size: int = 8192
-    parser: Parser = attr.Factory(Parser)
+    max_buffer_size: int = 1024 * 1024
+    parser: MessageParser = attr.Factory(BufferParser)
     connection: Optional[socket.socket] = None
     subscription_message: Optional[BetfairMessage] = None
+    frame_classifier: Optional[FrameClassifier] = None
+    recorder: Optional[StreamRecorder] = None
+    recording_id: Optional[StreamId] = None
+    handshake: bool = False
+    # Set on every (re)subscribe, frames are classified until the first one with an initialClk.
+    awaiting_initial_clk: bool = True
+    stream_state: StreamState = attr.Factory(StreamState)
+    pending: Deque[bytes] = attr.Factory(deque)
+    receive_buffer: ReceiveBuffer = attr.ib(init=False)
+
+    @receive_buffer.default
+    def _create_receive_buffer(self) -> ReceiveBuffer:
+        return ReceiveBuffer(min_size=self.buffer_size, max_size=self.max_buffer_size)
+
+    @property
+    def receive_statistics(self) -> ReceiveStatistics:
+        return self.receive_buffer.statistics
 
     def read(self) -> List[bytes]:
+        if self.pending:
+            messages = list(self.pending)
+            self.pending.clear()
+            return messages
+
+        messages = self.parser.parse_message(self.receive_buffer.recv_into(self.connection))
+
+        # Drain records already decrypted by the SSL layer, the poller will not report them as readable.
+        if isinstance(self.connection, ssl.SSLSocket):
+            while self.connection.pending() > 0:
+                messages.extend(self.parser.parse_message(self.receive_buffer.recv_into(self.connection)))
+
+        self.receive_buffer.statistics.reads += 1
+        self.stream_state.last_received = time.monotonic()
+
+        if self.recorder is not None:
+            # Every frame as received, before the frame classifier can skip any.
+            self.record(messages, self.recorder)
+
+        if self.frame_classifier is not None:
+            return self.frame_classifier.classify(messages, self.stream_state)
+
+        self.track_clocks(messages)
+
+        return messages
+
+    def track_clocks(self, messages: List[bytes]) -> None:
+        # Without a frame classifier only the clocks for resubscribing are needed. The initialClk comes with the first
+        # message after subscribing, an image or a RESUB_DELTA, and the latest clk is in the last frame carrying one,
+        # so most reads classify a single frame.
+        if self.awaiting_initial_clk:
+            for m in messages:
+                header = classify_frame(m)
+                self.stream_state.update(header)
+
+                if header.initial_clk is not None:
+                    self.awaiting_initial_clk = False
+
+            return
+
+        for m in reversed(messages):
+            header = classify_frame(m)
+
+            if header.clk is not None:
+                self.stream_state.update(header)
+                return
+
+    def record(self, messages: List[bytes], recorder: StreamRecorder) -> None:
+        if self.recording_id is None:
+            self.recording_id = recorder.register(self.get_recording_name())
+
+        if self.handshake:
+            # The connection and status responses are not stream data.
+            messages = [m for m in messages if decode(m).get("op") not in ("connection", "status")]
+
+        recorder.record(messages, self.recording_id)
+
+    def read_response(self) -> Dict[str, Any]:
+        messages: List[bytes] = []
 
-        part = self.connection.recv(self.buffer_size)
+        while not messages:
+            messages = self.read()
 
-        if part == b"":
-            raise ConnectionError("Betfair closed connection.")
+        # Frames that arrived together with the response, e.g. the first image, are kept for the next read.
+        self.pending.extend(messages[1:])
 
-        return self.parser.parse_message(part)
+        return decode(messages[0])
+
+    def get_stream_id(self) -> int:
+        return 0 if self.subscription_message is None else int(self.subscription_message["id"])
+
+    def get_recording_name(self) -> str:
+        # Market and order subscriptions both default to id 1, the kind of subscription keeps them apart.
+        if self.subscription_message is None:
+            return "stream"
+
+        kind = str(self.subscription_message.get("op", "stream")).replace("Subscription", "")
+
+        return f"{kind}_{self.get_stream_id()}"
 
     def get_socket(self) -> socket.socket:
         return self.connection
@@ -65,35 +175,78 @@ class BetfairConnection(Connection):
 
     def close(self) -> None:
         if self.connection is not None and self.connection.fileno() != -1:
-            self.connection.shutdown(socket.SHUT_RDWR)
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
             self.connection.close()
         else:
             self.connection = None
 
-    def connect(self, session_token: str, subscription_message: BetfairMessage) -> None:
-        self.close()
-        self.connection = create_betfair_socket()
+    def create_resubscription_message(self) -> BetfairMessage:
+        assert self.subscription_message is not None, "Subscription message cannot be None"
+
+        return create_resubscription_message(
+            self.subscription_message, self.stream_state.initial_clk, self.stream_state.clk
+        )
 
+    def connect(
+        self, session_token: str, subscription_message: BetfairMessage, timeout: Optional[float] = None
+    ) -> None:
         self.subscription_message = subscription_message
+        self.stream_state = StreamState()
+
+        self.subscribe(session_token, subscription_message, timeout)
 
+    def reconnect(self, session_token: str, timeout: Optional[float] = None) -> None:
+        # Resubscribing with the latest clocks makes Betfair send a RESUB_DELTA instead of full images.
+        self.subscribe(session_token, self.create_resubscription_message(), timeout)
+
+    def subscribe(
+        self, session_token: str, subscription_message: BetfairMessage, timeout: Optional[float] = None
+    ) -> None:
+        # The timeout applies to the connect and to each read and send of the handshake.
+        self.close()
+        self.connection = create_betfair_socket(self.hostname, self.port, self.use_ssl, self.ssl_context, timeout)
+        # A partial frame from the previous socket would prefix the first frame of the new one.
+        self.parser.reset()
+        self.pending.clear()
+
+        self.handshake = True
+        self.awaiting_initial_clk = True
+
+        try:
+            self.authenticate(session_token, subscription_message)
+            self.connection.settimeout(None)
+        finally:
+            self.handshake = False
+
+    def authenticate(self, session_token: str, subscription_message: BetfairMessage) -> None:
         auth_message = create_auth_message(
             subscription_message["id"], session_token=session_token, app_key=self.app_key
         )
 
-        connected_response = decode(self.read()[0])
+        connected_response = self.read_response()
 
         logger.info(connected_response)
 
         self.send(auth_message)
 
-        auth_response = decode(self.read()[0])
+        auth_response = self.read_response()
 
         logger.info(auth_response)
 
         if auth_response["statusCode"] == "FAILURE":
             raise ConnectionError(auth_response["errorCode"])
 
-        logger.debug(json.dumps(subscription_message))
+        logger.debug(subscription_message)
 
         self.send(subscription_message)
-        logger.info(f"Subscription, {decode(self.read()[0])['statusCode']}")
+
+        subscription_response = self.read_response()
+
+        logger.info(f"Subscription, {subscription_response['statusCode']}")
+
+        if subscription_response["statusCode"] == "FAILURE":
+            raise ConnectionError(subscription_response["errorCode"])
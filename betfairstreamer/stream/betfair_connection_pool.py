@@ -2,25 +2,60 @@ from __future__ import annotations
 
 import logging
 import socket
-from typing import Dict, Generator, List, Optional, Union
+import ssl
+import time
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
 
 import attr
 import zmq
 
+from betfairstreamer import codec
+from betfairstreamer.historical.recorder import StreamRecorder
 from betfairstreamer.models.betfair_api import BetfairMarketSubscriptionMessage, BetfairOrderSubscriptionMessage
-from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.order_book import Order
+from betfairstreamer.models.order_cache import OrderCache
+from betfairstreamer.stream.betfair_connection import STREAM_HOSTNAME, STREAM_PORT, BetfairConnection
+from betfairstreamer.stream.connection_supervisor import ConnectionEventType, ConnectionSupervisor
+from betfairstreamer.stream.frame_classifier import FrameClassifier
+from betfairstreamer.stream.latency import LatencyRecorder, LatencyStage
 from betfairstreamer.stream.protocols import Connection
 
 logger = logging.getLogger("betfair_connection_pool")
 
+ConnectionKey = Union[int, zmq.Socket]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class StreamBatch:
+    messages: Dict[ConnectionKey, List[Dict[str, Any]]] = attr.Factory(dict)
+    market_books: List[MarketBook] = attr.Factory(list)
+    orders: List[Order] = attr.Factory(list)
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self.messages.values())
+
 
 @attr.s(auto_attribs=True)
 class BetfairConnectionPool:
     timeout: Optional[int] = None
     poller: zmq.Poller = attr.ib(factory=zmq.Poller)
-    connections: Dict[Union[int, zmq.Socket], Connection] = attr.ib(factory=dict)
+    connections: Dict[ConnectionKey, Connection] = attr.ib(factory=dict)
+    frame_classifier: Optional[FrameClassifier] = None
+    supervisor: Optional[ConnectionSupervisor] = None
+    latency_recorder: Optional[LatencyRecorder] = None
+    recorder: Optional[StreamRecorder] = None
+    # Time of the last read per connection in ms since the epoch, kept while a latency recorder is set.
+    received_ms: Dict[ConnectionKey, float] = attr.ib(factory=dict)
 
     def add_connection(self, connection: Connection) -> None:
+        if self.frame_classifier is not None and isinstance(connection, BetfairConnection):
+            connection.frame_classifier = self.frame_classifier
+
+        if self.recorder is not None and isinstance(connection, BetfairConnection):
+            connection.recorder = self.recorder
+
         self.poller.register(connection.get_socket(), zmq.POLLIN)
 
         if isinstance(connection.get_socket(), socket.socket):
@@ -30,23 +65,129 @@ class BetfairConnectionPool:
             self.connections[connection.get_socket()] = connection
 
     def remove_connection(self, connection: Connection) -> None:
+        for key, c in list(self.connections.items()):
+            if c is connection:
+                del self.connections[key]
+
+        self.poller.unregister(connection.get_socket())
         connection.close()
-        fd = connection.get_socket()
-        self.poller.unregister(fd)
 
-    def read(self) -> Generator[Union[bytes, Connection], None, None]:
+    def poll(self) -> List[Tuple[ConnectionKey, List[bytes]]]:
+        # Frames received together with a handshake response are already buffered and will not wake the poller.
+        pending = [
+            fd for fd, c in self.connections.items() if isinstance(c, BetfairConnection) and c.pending
+        ]
 
-        while True:
-            events = self.poller.poll(self.timeout)
+        timeout = self.timeout
+
+        if self.supervisor is not None:
+            self.supervisor.supervise(self)
+            timeout = min(timeout or self.supervisor.check_interval_ms, self.supervisor.check_interval_ms)
+
+        events = self.poller.poll(0 if pending else timeout)
 
-            if not events:
+        if not events and not pending:
+            if self.supervisor is None:
                 raise TimeoutError
 
-            for fd, e in events:
-                for m in self.connections[fd].read():
+            return []
+
+        ready = pending + [fd for fd, e in events if fd not in pending]
+
+        if self.supervisor is None:
+            return [(fd, self.read_connection(fd)) for fd in ready]
+
+        result = []
+
+        for fd in ready:
+            connection = self.connections[fd]
+
+            try:
+                result.append((fd, self.read_connection(fd)))
+            except OSError as e:
+                if not isinstance(connection, BetfairConnection):
+                    raise
+
+                # Only this connection is reconnected, the others keep streaming.
+                self.supervisor.connection_lost(self, connection, ConnectionEventType.DISCONNECTED, e)
+
+        return result
+
+    def read_connection(self, fd: ConnectionKey) -> List[bytes]:
+        frames = self.connections[fd].read()
+
+        if self.latency_recorder is not None:
+            # Stamped right after each read, reading the other ready sockets does not count as receive latency.
+            self.received_ms[fd] = time.time() * 1000
+
+        return frames
+
+    def read(self) -> Generator[Union[bytes, Connection], None, None]:
+
+        while True:
+            for fd, frames in self.poll():
+                for m in frames:
                     yield m
 
+    def read_batches(
+        self, market_cache: Optional[MarketCache] = None, order_cache: Optional[OrderCache] = None
+    ) -> Generator[StreamBatch, None, None]:
+
+        loads = codec.get_codec().loads
+
+        while True:
+            batch = StreamBatch()
+
+            market_books: Dict[str, MarketBook] = {}
+            orders: Dict[str, Order] = {}
+
+            polled = self.poll()
+
+            latency_recorder = self.latency_recorder
+
+            for fd, frames in polled:
+                if not frames:
+                    # Only part of a frame arrived, or the frame classifier skipped every frame.
+                    continue
+
+                messages = [loads(frame) for frame in frames]
+                batch.messages[fd] = messages
+
+                if latency_recorder is not None:
+                    decoded = time.time() * 1000
+                    latency_recorder.record_all(LatencyStage.RECEIVE, messages, self.received_ms[fd], fd)
+                    latency_recorder.record_all(LatencyStage.DECODE, messages, decoded, fd)
+
+                if market_cache is None and order_cache is None:
+                    continue
+
+                for message in messages:
+                    op = message.get("op")
+
+                    if op == "mcm" and market_cache is not None:
+                        for market_book in market_cache.update(message):
+                            market_books[market_book.market_id] = market_book
+                    elif op == "ocm" and order_cache is not None:
+                        for order in order_cache.update(message):
+                            orders[order.bet_id] = order
+                    else:
+                        continue
+
+                    if latency_recorder is not None:
+                        latency_recorder.record(LatencyStage.CACHE_UPDATE, message, time.time() * 1000, fd)
+
+            if not batch.messages:
+                continue
+
+            batch.market_books = list(market_books.values())
+            batch.orders = list(orders.values())
+
+            yield batch
+
     def close(self) -> None:
+        if self.supervisor is not None:
+            self.supervisor.stop()
+
         for k, c in self.connections.items():
             c.close()
 
@@ -57,11 +198,28 @@ class BetfairConnectionPool:
         session_token: str,
         app_key: str,
         timeout: Optional[int] = None,
+        frame_classifier: Optional[FrameClassifier] = None,
+        supervise: bool = False,
+        hostname: str = STREAM_HOSTNAME,
+        port: int = STREAM_PORT,
+        use_ssl: bool = True,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        recorder: Optional[StreamRecorder] = None,
     ) -> BetfairConnectionPool:
-        connection_pool = cls(timeout=timeout)
+        supervisor = ConnectionSupervisor(session_token=session_token) if supervise else None
+        connection_pool = cls(
+            timeout=timeout, frame_classifier=frame_classifier, supervisor=supervisor, recorder=recorder
+        )
 
         for subscription_message in subscription_messages:
-            connection = BetfairConnection(app_key=app_key)
+            connection = BetfairConnection(
+                app_key=app_key,
+                hostname=hostname,
+                port=port,
+                use_ssl=use_ssl,
+                ssl_context=ssl_context,
+                recorder=recorder,
+            )
             connection.connect(session_token, subscription_message)
 
             connection_pool.add_connection(connection)
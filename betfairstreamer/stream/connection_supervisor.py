@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional
+
+import attr
+
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+
+if TYPE_CHECKING:
+    from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+
+logger = logging.getLogger("connection_supervisor")
+
+
+class ConnectionEventType(Enum):
+    DISCONNECTED = "DISCONNECTED"
+    SILENT = "SILENT"
+    RECONNECTING = "RECONNECTING"
+    RECONNECT_FAILED = "RECONNECT_FAILED"
+    RECONNECTED = "RECONNECTED"
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class ConnectionEvent:
+    event_type: ConnectionEventType
+    stream_id: Optional[int]
+    time: float = attr.Factory(time.time)
+    attempt: int = 0
+    error: Optional[str] = None
+
+
+ConnectionEventHandler = Callable[[ConnectionEvent], None]
+
+
+@attr.s(auto_attribs=True)
+class ConnectionSupervisor:
+    session_token: str
+    heartbeat_multiplier: float = 3.0
+    default_heartbeat_ms: int = 5000
+    check_interval_ms: int = 1000
+    initial_backoff: float = 0.5
+    max_backoff: float = 30.0
+    # Bounds the connect and every handshake read of a reconnect, so stop() is not held up by an unresponsive host.
+    connect_timeout: float = 10.0
+    event_handlers: List[ConnectionEventHandler] = attr.ib(factory=list)
+    events: Deque[ConnectionEvent] = attr.ib(factory=lambda: deque(maxlen=1000))
+    reconnecting: Dict[int, threading.Thread] = attr.ib(factory=dict)
+    reconnected: "queue.Queue[BetfairConnection]" = attr.ib(factory=queue.Queue)
+    pending_events: "queue.Queue[ConnectionEvent]" = attr.ib(factory=queue.Queue)
+    stopped: threading.Event = attr.ib(factory=threading.Event)
+
+    def add_event_handler(self, handler: ConnectionEventHandler) -> None:
+        self.event_handlers.append(handler)
+
+    def emit(self, event: ConnectionEvent) -> None:
+        # Called from reconnect threads as well, handlers are run by supervise on the reading thread.
+        self.pending_events.put(event)
+
+    def dispatch_events(self) -> None:
+        while not self.pending_events.empty():
+            event = self.pending_events.get_nowait()
+            self.events.append(event)
+
+            logger.info(event)
+
+            for handler in self.event_handlers:
+                handler(event)
+
+    def get_stream_id(self, connection: BetfairConnection) -> Optional[int]:
+        if connection.subscription_message is None:
+            return None
+
+        return connection.subscription_message["id"]
+
+    def get_silence_timeout(self, connection: BetfairConnection) -> float:
+        heartbeat_ms = self.default_heartbeat_ms
+
+        if connection.subscription_message is not None:
+            heartbeat_ms = connection.subscription_message.get("heartbeatMs") or heartbeat_ms  # type: ignore
+
+        return heartbeat_ms * self.heartbeat_multiplier / 1000
+
+    def supervise(self, connection_pool: BetfairConnectionPool) -> None:
+        while not self.reconnected.empty():
+            connection = self.reconnected.get_nowait()
+            self.reconnecting.pop(id(connection), None)
+
+            connection_pool.add_connection(connection)
+
+            self.emit(ConnectionEvent(ConnectionEventType.RECONNECTED, self.get_stream_id(connection)))
+
+        now = time.monotonic()
+
+        for c in list(connection_pool.connections.values()):
+            if not isinstance(c, BetfairConnection):
+                continue
+
+            if c.stream_state.last_received == 0:
+                c.stream_state.last_received = now
+
+            if now - c.stream_state.last_received > self.get_silence_timeout(c):
+                self.connection_lost(connection_pool, c, ConnectionEventType.SILENT)
+
+        self.dispatch_events()
+
+    def connection_lost(
+        self,
+        connection_pool: BetfairConnectionPool,
+        connection: BetfairConnection,
+        event_type: ConnectionEventType,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        connection_pool.remove_connection(connection)
+
+        self.emit(
+            ConnectionEvent(event_type, self.get_stream_id(connection), error=repr(error) if error else None)
+        )
+
+        thread = threading.Thread(target=self.reconnect, args=(connection,), daemon=True)
+        self.reconnecting[id(connection)] = thread
+        thread.start()
+
+    def reconnect(self, connection: BetfairConnection) -> None:
+        stream_id = self.get_stream_id(connection)
+        backoff = self.initial_backoff
+        attempt = 0
+
+        while not self.stopped.is_set():
+            attempt += 1
+
+            self.emit(ConnectionEvent(ConnectionEventType.RECONNECTING, stream_id, attempt=attempt))
+
+            try:
+                connection.reconnect(self.session_token, self.connect_timeout)
+                connection.stream_state.last_received = time.monotonic()
+                self.reconnected.put(connection)
+                return
+            except Exception as e:
+                self.emit(
+                    ConnectionEvent(ConnectionEventType.RECONNECT_FAILED, stream_id, attempt=attempt, error=repr(e))
+                )
+
+            self.stopped.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self.stopped.set()
+        deadline = time.monotonic() + timeout
+
+        for thread in list(self.reconnecting.values()):
+            thread.join(max(deadline - time.monotonic(), 0))
+
+            if thread.is_alive():
+                logger.warning(f"Reconnect thread {thread.name} did not stop within {timeout} s")
+
+        while not self.reconnected.empty():
+            self.reconnected.get_nowait().close()
+
+        self.dispatch_events()
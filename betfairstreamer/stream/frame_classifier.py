@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Set
+
+import attr
+
+from betfairstreamer.stream.stream_parser import BytesLike
+
+# Betfair writes the message header (op, id, clocks, pt, ct, ...) before the mc/oc change list, so
+# these fields can be read from the frame prefix without decoding the changes.
+CHANGE_LIST_PATTERN = re.compile(rb'"(?:mc|oc)":\s*\[')
+HEADER_FIELD_PATTERN = re.compile(rb'"(op|id|ct|clk|initialClk|pt|segmentType|status)":\s*(?:"([^"]*)"|(-?\d+))')
+MARKET_ID_PATTERN = re.compile(rb'"id":\s*"(\d+\.\d+)"')
+
+
+@attr.s(auto_attribs=True, slots=True)
+class FrameHeader:
+    op: Optional[str] = None
+    id: Optional[int] = None
+    ct: Optional[str] = None
+    clk: Optional[str] = None
+    initial_clk: Optional[str] = None
+    pt: Optional[int] = None
+    segment_type: Optional[str] = None
+    status: Optional[int] = None
+    changes_offset: int = -1
+
+    @property
+    def is_heartbeat(self) -> bool:
+        return self.ct == "HEARTBEAT"
+
+
+def classify_frame(frame: BytesLike) -> FrameHeader:
+    header = FrameHeader()
+
+    changes = CHANGE_LIST_PATTERN.search(frame)
+    end = len(frame)
+
+    if changes is not None:
+        end = changes.start()
+        header.changes_offset = changes.end()
+
+    for field, text, number in HEADER_FIELD_PATTERN.findall(frame, 0, end):
+        if field == b"op":
+            header.op = text.decode()
+        elif field == b"id":
+            header.id = int(number) if number else None
+        elif field == b"ct":
+            header.ct = text.decode()
+        elif field == b"clk":
+            header.clk = text.decode()
+        elif field == b"initialClk":
+            header.initial_clk = text.decode()
+        elif field == b"pt":
+            header.pt = int(number)
+        elif field == b"segmentType":
+            header.segment_type = text.decode()
+        elif field == b"status":
+            header.status = int(number) if number else None
+
+    return header
+
+
+def extract_market_ids(frame: BytesLike, header: FrameHeader) -> List[str]:
+    if header.changes_offset < 0:
+        return []
+
+    return [m.decode() for m in MARKET_ID_PATTERN.findall(frame, header.changes_offset)]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class StreamState:
+    initial_clk: Optional[str] = None
+    clk: Optional[str] = None
+    publish_time: int = 0
+    last_received: float = 0.0
+    heartbeats: int = 0
+
+    def update(self, header: FrameHeader) -> None:
+        if header.initial_clk is not None:
+            self.initial_clk = header.initial_clk
+
+        if header.clk is not None:
+            self.clk = header.clk
+
+        if header.pt is not None:
+            self.publish_time = header.pt
+
+        if header.is_heartbeat:
+            self.heartbeats += 1
+
+
+@attr.s(auto_attribs=True, slots=True)
+class FrameClassifier:
+    skip_heartbeats: bool = True
+    denied_market_ids: Set[str] = attr.Factory(set)
+
+    heartbeats_skipped: int = 0
+    denied_frames_skipped: int = 0
+    frames_passed: int = 0
+
+    @property
+    def frames_skipped(self) -> int:
+        return self.heartbeats_skipped + self.denied_frames_skipped
+
+    def skip(self, frame: BytesLike, header: FrameHeader) -> bool:
+        if self.skip_heartbeats and header.is_heartbeat:
+            self.heartbeats_skipped += 1
+            return True
+
+        if self.denied_market_ids and header.op == "mcm":
+            market_ids = extract_market_ids(frame, header)
+
+            if market_ids and self.denied_market_ids.issuperset(market_ids):
+                self.denied_frames_skipped += 1
+                return True
+
+        self.frames_passed += 1
+
+        return False
+
+    def classify(self, frames: List[bytes], stream_state: StreamState) -> List[bytes]:
+        passed = []
+
+        for frame in frames:
+            header = classify_frame(frame)
+            stream_state.update(header)
+
+            if not self.skip(frame, header):
+                passed.append(frame)
+
+        return passed
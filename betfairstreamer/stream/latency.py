@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from enum import Enum
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import attr
+
+# Upper bucket bounds in milliseconds, the last bucket counts everything above the largest bound.
+DEFAULT_BUCKET_BOUNDS_MS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class LatencyStage(Enum):
+    RECEIVE = "receive"
+    DECODE = "decode"
+    CACHE_UPDATE = "cache_update"
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class HistogramSnapshot:
+    bounds: Tuple[float, ...]
+    counts: Tuple[int, ...]
+    count: int
+    total: float
+    maximum: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        # Upper bound of the bucket holding the p-th percentile, the maximum for the overflow bucket.
+        if not self.count:
+            return 0.0
+
+        rank = p / 100 * self.count
+        cumulative = 0
+
+        for i, c in enumerate(self.counts):
+            cumulative += c
+
+            if cumulative >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else self.maximum
+
+        return self.maximum
+
+
+@attr.s(auto_attribs=True, slots=True)
+class LatencyHistogram:
+    bounds: Tuple[float, ...] = DEFAULT_BUCKET_BOUNDS_MS
+    counts: List[int] = attr.ib(init=False)
+    count: int = 0
+    total: float = 0.0
+    maximum: float = 0.0
+
+    @counts.default
+    def _create_counts(self) -> List[int]:
+        return [0] * (len(self.bounds) + 1)
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+        if value > self.maximum:
+            self.maximum = value
+
+    def snapshot(self) -> HistogramSnapshot:
+        return HistogramSnapshot(
+            bounds=self.bounds, counts=tuple(self.counts), count=self.count, total=self.total, maximum=self.maximum,
+        )
+
+
+@attr.s(auto_attribs=True, slots=True, frozen=True)
+class LatencySnapshot:
+    connections: Dict[Tuple[Hashable, LatencyStage], HistogramSnapshot]
+    markets: Dict[Tuple[str, LatencyStage], HistogramSnapshot]
+
+
+@attr.s(auto_attribs=True, slots=True)
+class LatencyRecorder:
+    per_market: bool = True
+    bounds: Tuple[float, ...] = DEFAULT_BUCKET_BOUNDS_MS
+    connections: Dict[Tuple[Hashable, LatencyStage], LatencyHistogram] = attr.Factory(dict)
+    markets: Dict[Tuple[str, LatencyStage], LatencyHistogram] = attr.Factory(dict)
+
+    def get_histogram(self, histograms: Dict[Any, LatencyHistogram], key: Any) -> LatencyHistogram:
+        histogram = histograms.get(key)
+
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram(bounds=self.bounds)
+
+        return histogram
+
+    def record(
+        self,
+        stage: LatencyStage,
+        message: Dict[str, Any],
+        now_ms: float,
+        connection: Optional[Hashable] = None,
+    ) -> None:
+        # Histograms are per connection, e.g. the connection key of the pool. Without one the subscription id of the
+        # message is used, market and order subscriptions both default to id 1.
+        pt = message.get("pt")
+
+        if pt is None:
+            return
+
+        latency = now_ms - pt
+        key = message.get("id") if connection is None else connection
+
+        self.get_histogram(self.connections, (key, stage)).record(latency)
+
+        if self.per_market:
+            for change in message.get("mc") or message.get("oc") or []:
+                self.get_histogram(self.markets, (change["id"], stage)).record(latency)
+
+    def record_all(
+        self,
+        stage: LatencyStage,
+        messages: List[Dict[str, Any]],
+        now_ms: float,
+        connection: Optional[Hashable] = None,
+    ) -> None:
+        for message in messages:
+            self.record(stage, message, now_ms, connection)
+
+    def snapshot(self) -> LatencySnapshot:
+        return LatencySnapshot(
+            connections={k: h.snapshot() for k, h in self.connections.items()},
+            markets={k: h.snapshot() for k, h in self.markets.items()},
+        )
+
+    def reset(self) -> None:
+        self.connections.clear()
+        self.markets.clear()
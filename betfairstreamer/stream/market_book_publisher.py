@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import attr
+import numpy as np
+import zmq
+
+from betfairstreamer import codec
+from betfairstreamer.models.betfair_api import BetfairMarketDefinition
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.utils import MARKET_BOOK_ARRAYS
+
+
+def market_book_topic(market_id: str) -> bytes:
+    # Null terminated, so a subscription to 1.1 does not prefix match 1.12.
+    return market_id.encode() + b"\0"
+
+
+@attr.s(auto_attribs=True, slots=True)
+class PublishedMarket:
+    sort_priority_mapping: Dict[int, int]
+    market_definition: BetfairMarketDefinition
+    version: int = 0
+    published: int = 0
+
+
+@attr.s(auto_attribs=True, slots=True)
+class MarketBookMessage:
+    publish_time: int
+    version: int
+    market_book: MarketBook
+
+
+@attr.s(auto_attribs=True)
+class MarketBookPublisher:
+    connection: zmq.Socket[bytes]
+    # The market definition is sent when the sort priority mapping or definition changes and every
+    # definition_interval messages after that, so late subscribers pick it up.
+    definition_interval: int = 100
+    # zmq sends large frames without copying from the io thread, the arrays are copied so later
+    # updates to the MarketBook cannot change a message that is still queued.
+    copy: bool = True
+    markets: Dict[str, PublishedMarket] = attr.ib(factory=dict)
+
+    def create_header(self, market_book: MarketBook, publish_time: int, arrays: List[np.ndarray]) -> Dict[str, Any]:
+        published = self.markets.get(market_book.market_id)
+        send_definition = False
+
+        if published is None:
+            published = self.markets[market_book.market_id] = PublishedMarket(
+                sort_priority_mapping=market_book.sort_priority_mapping,
+                market_definition=market_book.market_definition,
+            )
+            send_definition = True
+        elif (
+            published.sort_priority_mapping is not market_book.sort_priority_mapping
+            or published.market_definition is not market_book.market_definition
+        ):
+            published.sort_priority_mapping = market_book.sort_priority_mapping
+            published.market_definition = market_book.market_definition
+            published.version += 1
+            send_definition = True
+
+        if published.published % self.definition_interval == 0:
+            send_definition = True
+
+        published.published += 1
+
+        header: Dict[str, Any] = {
+            "id": market_book.market_id,
+            "pt": publish_time,
+            "version": published.version,
+            "sortPriorityMapping": list(market_book.sort_priority_mapping.items()),
+            "arrays": [[a.dtype.str, a.shape] for a in arrays],
+        }
+
+        if send_definition:
+            header["marketDefinition"] = market_book.market_definition
+
+        return header
+
+    def publish(self, market_book: MarketBook, publish_time: int) -> None:
+        arrays = [np.ascontiguousarray(getattr(market_book, name)) for name in MARKET_BOOK_ARRAYS]
+        header = codec.dumps(self.create_header(market_book, publish_time, arrays))
+
+        self.connection.send_multipart(
+            [market_book_topic(market_book.market_id), header] + [a.data for a in arrays], copy=self.copy
+        )
+
+    def publish_all(self, market_books: Iterable[MarketBook], publish_time: int) -> None:
+        for market_book in market_books:
+            self.publish(market_book, publish_time)
+
+    def close(self) -> None:
+        self.connection.close(linger=0)
+
+    @classmethod
+    def create_publisher(
+        cls, context: zmq.Context[zmq.Socket[bytes]], url: str, bind: bool = True
+    ) -> MarketBookPublisher:
+        s = context.socket(zmq.PUB)
+
+        if bind:
+            s.bind(url)
+        else:
+            s.connect(url)
+
+        return cls(connection=s)
+
+
+@attr.s(auto_attribs=True)
+class MarketBookSubscriber:
+    connection: zmq.Socket[bytes]
+    market_definitions: Dict[str, BetfairMarketDefinition] = attr.ib(factory=dict)
+    definition_versions: Dict[str, int] = attr.ib(factory=dict)
+    missing_definitions: int = 0
+
+    def subscribe(self, market_id: Optional[str] = None) -> None:
+        self.connection.setsockopt(zmq.SUBSCRIBE, b"" if market_id is None else market_book_topic(market_id))
+
+    def unsubscribe(self, market_id: Optional[str] = None) -> None:
+        self.connection.setsockopt(zmq.UNSUBSCRIBE, b"" if market_id is None else market_book_topic(market_id))
+
+    def poll(self, timeout: Optional[int] = None) -> bool:
+        return bool(self.connection.poll(timeout))
+
+    def receive(self, flags: int = 0) -> Optional[MarketBookMessage]:
+        # The arrays are views on the received zmq frames, nothing is copied.
+        frames = self.connection.recv_multipart(flags=flags, copy=False)
+        header = codec.loads(frames[1].buffer)
+
+        market_id = header["id"]
+
+        if "marketDefinition" in header:
+            self.market_definitions[market_id] = header["marketDefinition"]
+            self.definition_versions[market_id] = header["version"]
+
+        market_definition = self.market_definitions.get(market_id)
+
+        if market_definition is None or self.definition_versions[market_id] != header["version"]:
+            # Subscribed between definition messages, or the message with a changed definition was dropped. Skipped
+            # until the next definition arrives.
+            self.missing_definitions += 1
+            return None
+
+        arrays = {
+            name: np.frombuffer(frame.buffer, dtype=np.dtype(dtype)).reshape(shape)
+            for name, (dtype, shape), frame in zip(MARKET_BOOK_ARRAYS, header["arrays"], frames[2:])
+        }
+
+        market_book = MarketBook(
+            market_id=market_id,
+            market_definition=market_definition,
+            sort_priority_mapping=dict(header["sortPriorityMapping"]),
+            **arrays,
+        )
+
+        return MarketBookMessage(publish_time=header["pt"], version=header["version"], market_book=market_book)
+
+    def read(self) -> Iterable[MarketBookMessage]:
+        while True:
+            message = self.receive()
+
+            if message is not None:
+                yield message
+
+    def close(self) -> None:
+        self.connection.close(linger=0)
+
+    @classmethod
+    def create_subscriber(
+        cls,
+        context: zmq.Context[zmq.Socket[bytes]],
+        url: str,
+        market_ids: Optional[List[str]] = None,
+        bind: bool = False,
+    ) -> MarketBookSubscriber:
+        s = context.socket(zmq.SUB)
+
+        if bind:
+            s.bind(url)
+        else:
+            s.connect(url)
+
+        subscriber = cls(connection=s)
+
+        if market_ids is None:
+            subscriber.subscribe()
+
+        for market_id in market_ids or []:
+            subscriber.subscribe(market_id)
+
+        return subscriber
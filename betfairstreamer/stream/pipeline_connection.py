@@ -19,9 +19,16 @@ class PipelineConnection(Connection):
     def get_socket(self) -> zmq.Socket:
         return self.connection
 
+    def close(self) -> None:
+        self.connection.close(linger=0)
+
     @classmethod
-    def create_pull_connection(cls, context: zmq.Context, url: str) -> PipelineConnection:
+    def create_pull_connection(cls, context: zmq.Context, url: str, bind: bool = True) -> PipelineConnection:
         s = context.socket(zmq.PULL)
-        s.bind(url)
+
+        if bind:
+            s.bind(url)
+        else:
+            s.connect(url)
 
         return cls(connection=s)
@@ -3,6 +3,8 @@ from typing import List, Protocol, Union
 
 import zmq
 
+from betfairstreamer.stream.stream_parser import BytesLike
+
 
 class Connection(Protocol):
     def read(self) -> List[bytes]:
@@ -13,3 +15,11 @@ class Connection(Protocol):
 
     def close(self) -> None:
         ...
+
+
+class MessageParser(Protocol):
+    def parse_message(self, part: BytesLike) -> List[bytes]:
+        ...
+
+    def reset(self) -> None:
+        ...
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import socket
+import time
+
+import attr
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ReceiveStatistics:
+    reads: int = 0
+    recv_calls: int = 0
+    bytes_received: int = 0
+    buffer_grows: int = 0
+    buffer_shrinks: int = 0
+    started: float = attr.Factory(time.monotonic)
+
+    @property
+    def throughput(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.bytes_received / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def recv_calls_per_read(self) -> float:
+        return self.recv_calls / self.reads if self.reads else 0.0
+
+    @property
+    def bytes_per_recv_call(self) -> float:
+        return self.bytes_received / self.recv_calls if self.recv_calls else 0.0
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ReceiveBuffer:
+    min_size: int = 8192
+    max_size: int = 1024 * 1024
+    shrink_after: int = 64
+    statistics: ReceiveStatistics = attr.Factory(ReceiveStatistics)
+    size: int = attr.ib(init=False)
+    small_reads: int = attr.ib(init=False, default=0)
+    view: memoryview = attr.ib(init=False, default=memoryview(b""))
+
+    def __attrs_post_init__(self) -> None:
+        self.max_size = max(self.max_size, self.min_size)
+        self.size = self.min_size
+
+    def resize(self, size: int) -> None:
+        self.size = size
+        self.small_reads = 0
+
+    def record(self, received: int) -> None:
+        statistics = self.statistics
+        statistics.recv_calls += 1
+        statistics.bytes_received += received
+
+        size = self.size
+
+        if received == size and size < self.max_size:
+            self.resize(min(size * 2, self.max_size))
+            statistics.buffer_grows += 1
+        elif received < size // 4 and size > self.min_size:
+            self.small_reads += 1
+
+            if self.small_reads >= self.shrink_after:
+                self.resize(max(size // 2, self.min_size))
+                statistics.buffer_shrinks += 1
+        else:
+            self.small_reads = 0
+
+    def recv_into(self, connection: socket.socket) -> memoryview:
+        if len(self.view) != self.size:
+            # Allocate a new bytearray so views handed out from the old one stay valid.
+            self.view = memoryview(bytearray(self.size))
+
+        view = self.view
+        received = connection.recv_into(view)
+
+        if received == 0:
+            raise ConnectionError("Betfair closed connection.")
+
+        self.record(received)
+
+        return view[:received]
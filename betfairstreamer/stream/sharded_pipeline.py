@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import attr
+import zmq
+
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+from betfairstreamer.stream.frame_classifier import classify_frame, extract_market_ids
+from betfairstreamer.stream.pipeline_connection import PipelineConnection
+from betfairstreamer.stream.stream_parser import BytesLike
+
+logger = logging.getLogger("sharded_pipeline")
+
+MarketBookHandler = Callable[[List[MarketBook]], Any]
+
+STOP = b""
+
+
+def shard_for_market(market_id: str, shards: int) -> int:
+    # Stable across processes, unlike hash(). CRC32 spreads sequential market ids poorly over few shards.
+    return int.from_bytes(hashlib.blake2b(market_id.encode(), digest_size=8).digest(), "little") % shards
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ShardStatistics:
+    shard: int
+    messages: int = 0
+    market_book_updates: int = 0
+    seconds: float = 0.0
+
+
+def run_shard_worker(
+    shard: int, url: str, handler: MarketBookHandler, statistics_queue: "multiprocessing.Queue[ShardStatistics]"
+) -> None:
+    context = zmq.Context()
+    connection = PipelineConnection.create_pull_connection(context, url, bind=False)
+
+    market_cache = MarketCache()
+    statistics = ShardStatistics(shard=shard)
+    loads = codec.get_codec().loads
+
+    start: Optional[float] = None
+
+    try:
+        while True:
+            frame = connection.read()[0]
+
+            if frame == STOP:
+                break
+
+            if start is None:
+                start = time.perf_counter()
+
+            market_books = market_cache.update(loads(frame))
+
+            statistics.messages += 1
+            statistics.market_book_updates += len(market_books)
+
+            if market_books:
+                handler(market_books)
+    finally:
+        statistics.seconds = time.perf_counter() - start if start is not None else 0.0
+        statistics_queue.put(statistics)
+
+        connection.close()
+        context.term()
+
+
+@attr.s(auto_attribs=True, slots=True)
+class ShardRouter:
+    sockets: List[zmq.Socket[bytes]]
+    frames_forwarded: int = 0
+    frames_split: int = 0
+    frames_ignored: int = 0
+
+    def route(self, frame: BytesLike) -> None:
+        header = classify_frame(frame)
+
+        if header.op != "mcm":
+            self.frames_ignored += 1
+            return
+
+        shards = len(self.sockets)
+        market_ids = extract_market_ids(frame, header)
+        targets = {shard_for_market(market_id, shards) for market_id in market_ids}
+
+        if not targets:
+            self.frames_ignored += 1
+            return
+
+        if len(targets) == 1:
+            # Most deltas touch one market, those are forwarded without being decoded.
+            self.sockets[targets.pop()].send(frame, copy=False)
+            self.frames_forwarded += 1
+            return
+
+        message = codec.loads(frame)
+        market_changes: Dict[int, List[Any]] = defaultdict(list)
+
+        for market_change in message["mc"]:
+            market_changes[shard_for_market(market_change["id"], shards)].append(market_change)
+
+        for shard, mc in market_changes.items():
+            self.sockets[shard].send(codec.dumps({**message, "mc": mc}))
+
+        self.frames_split += 1
+
+
+@attr.s(auto_attribs=True)
+class ShardedMarketProcessor:
+    shards: int
+    handler: MarketBookHandler
+    url_template: str = attr.Factory(
+        lambda: "ipc:///tmp/betfairstreamer-" + str(os.getpid()) + "-" + uuid.uuid4().hex + "-{}"
+    )
+    context: zmq.Context[zmq.Socket[bytes]] = attr.Factory(zmq.Context)
+    processes: List[multiprocessing.Process] = attr.ib(factory=list)
+    urls: List[str] = attr.ib(factory=list)
+    router: Optional[ShardRouter] = None
+    statistics_queue: "multiprocessing.Queue[ShardStatistics]" = attr.Factory(multiprocessing.Queue)
+
+    def start(self) -> None:
+        sockets = []
+
+        for shard in range(self.shards):
+            url = self.url_template.format(shard)
+
+            s = self.context.socket(zmq.PUSH)
+            s.bind(url)
+            sockets.append(s)
+            self.urls.append(url)
+
+            process = multiprocessing.Process(
+                target=run_shard_worker, args=(shard, url, self.handler, self.statistics_queue), daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        self.router = ShardRouter(sockets=sockets)
+
+    def route(self, frame: BytesLike) -> None:
+        self.router.route(frame)
+
+    def run(self, connection_pool: BetfairConnectionPool) -> None:
+        route = self.router.route
+
+        while True:
+            for fd, frames in connection_pool.poll():
+                for frame in frames:
+                    route(frame)
+
+    def send_stop(self, s: zmq.Socket[bytes], process: multiprocessing.Process, deadline: float) -> None:
+        # A PUSH socket blocks while its shard has a full queue or has exited.
+        while True:
+            try:
+                s.send(STOP, flags=zmq.NOBLOCK)
+                return
+            except zmq.Again:
+                if not process.is_alive():
+                    return
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{process.name} did not accept the stop message in time")
+
+                time.sleep(0.01)
+
+    def stop(self, timeout: float = 30.0) -> List[ShardStatistics]:
+        deadline = time.monotonic() + timeout
+        statistics: Dict[int, ShardStatistics] = {}
+
+        try:
+            for s, process in zip(self.router.sockets, self.processes):
+                self.send_stop(s, process, deadline)
+
+            while len(statistics) < len(self.processes):
+                # Checked before reading, a shard puts its statistics before it exits.
+                exited = [i for i, p in enumerate(self.processes) if i not in statistics and not p.is_alive()]
+
+                try:
+                    shard_statistics = self.statistics_queue.get(timeout=0.1)
+                    statistics[shard_statistics.shard] = shard_statistics
+                    continue
+                except queue.Empty:
+                    pass
+
+                if exited:
+                    raise RuntimeError(f"Shards {exited} exited without statistics")
+
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Shards did not stop within {timeout} s")
+
+            for process in self.processes:
+                process.join(max(deadline - time.monotonic(), 0))
+        finally:
+            for process in self.processes:
+                if process.is_alive():
+                    process.terminate()
+
+            for s in self.router.sockets:
+                s.close(linger=0)
+
+            for url in self.urls:
+                if url.startswith("ipc://"):
+                    try:
+                        os.unlink(url[len("ipc://") :])
+                    except FileNotFoundError:
+                        pass
+
+            self.processes.clear()
+            self.urls.clear()
+
+        return sorted(statistics.values(), key=lambda s: s.shard)
@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Union
+
+BytesLike = Union[bytes, bytearray, memoryview]
 
 
 class Parser:
@@ -6,7 +8,8 @@ class Parser:
         self.buffer = b""
         self.crlf = b"\r\n"
 
-    def parse_message(self, part: bytes) -> List[bytes]:
+    def parse_message(self, part: BytesLike) -> List[bytes]:
+        part = bytes(part)
         messages = []
 
         if part[:1] == b"\n" and self.buffer[-1:] == b"\r":
@@ -26,3 +29,67 @@ class Parser:
         self.buffer = before
 
         return messages
+
+    def reset(self) -> None:
+        self.buffer = b""
+
+
+# Appends parts into one growable bytearray and resumes the delimiter scan where the last one stopped,
+# so a frame spanning many reads is copied once. Frames are handed out as memoryview slices, the
+# buffer is only compacted into a new bytearray so outstanding views stay valid.
+class BufferParser:
+    def __init__(self, delimiter: bytes = b"\r\n") -> None:
+        self.buffer = bytearray()
+        self.delimiter = delimiter
+        self.frame_start = 0
+        self.scan_position = 0
+
+    def feed(self, part: BytesLike) -> None:
+        if self.frame_start:
+            # Views may still reference the consumed frames, so move the partial frame into a new
+            # buffer instead of resizing the old one in place.
+            self.buffer = self.buffer[self.frame_start :]
+            self.scan_position -= self.frame_start
+            self.frame_start = 0
+
+        self.buffer += part
+
+    def frames(self) -> List[memoryview]:
+        frames = []
+        buffer = self.buffer
+        view = memoryview(buffer)
+        delimiter = self.delimiter
+        delimiter_length = len(delimiter)
+
+        start = self.frame_start
+        end = buffer.find(delimiter, self.scan_position)
+
+        while end != -1:
+            frames.append(view[start:end])
+            start = end + delimiter_length
+            end = buffer.find(delimiter, start)
+
+        self.frame_start = start
+        self.scan_position = max(start, len(buffer) - delimiter_length + 1)
+
+        return frames
+
+    def parse_frames(self, part: BytesLike) -> List[memoryview]:
+        self.feed(part)
+        return self.frames()
+
+    def parse_message(self, part: BytesLike) -> List[bytes]:
+        self.feed(part)
+        return [bytes(frame) for frame in self.frames()]
+
+    def flush(self) -> bytes:
+        remainder = bytes(self.buffer[self.frame_start :])
+
+        self.buffer = bytearray()
+        self.frame_start = 0
+        self.scan_position = 0
+
+        return remainder
+
+    def reset(self) -> None:
+        self.flush()
@@ -1,13 +1,27 @@
-import json
 import logging
+import os
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, overload
+from typing import Any, Dict, Optional, Union, overload
 
 import ciso8601
 import pytz
 
+from betfairstreamer import codec
+from betfairstreamer.codec import JSONInput
 from betfairstreamer.models.betfair_api_extensions import BetfairMessage
 
+PathLike = Union[str, "os.PathLike[str]"]
+
+# The MarketBook arrays in the order checkpoints, shared memory segments and published messages store them.
+MARKET_BOOK_ARRAYS = ("metadata", "best_display", "best_offers", "full_price_ladder", "trd")
+
+# Arrays laid out in one buffer start on a cache line.
+ALIGNMENT = 64
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
 
 @overload
 def parse_betfair_date(betfair_date: None) -> None:
@@ -69,8 +83,8 @@ def localize_betfair_date(betfair_datetime: Optional[datetime]) -> Optional[date
 
 
 def encode(msg: BetfairMessage) -> bytes:
-    return json.dumps(msg).encode("utf-8") + b"\r\n"
+    return codec.dumps(msg) + b"\r\n"
 
 
-def decode(msg: bytes) -> Dict[Any, Any]:
-    return json.loads(msg)
+def decode(msg: JSONInput) -> Dict[Any, Any]:
+    return codec.loads(msg)
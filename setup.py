@@ -13,7 +13,13 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/almenjonatan/betfairstreamer.git",
-    packages=["betfairstreamer", "betfairstreamer.models", "betfairstreamer.stream", "betfairstreamer.helpers"],
+    packages=[
+        "betfairstreamer",
+        "betfairstreamer.models",
+        "betfairstreamer.stream",
+        "betfairstreamer.helpers",
+        "betfairstreamer.historical",
+    ],
     package_data={"betfairstreamer": ["py.typed"]},
     install_requires=[
         "numpy",
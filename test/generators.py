@@ -120,6 +120,37 @@ def generate_runners(draw):
 
     return runners
 
+
+@composite
+def generate_runner_definitions(draw, number_of_runners):
+    selection_ids = draw(
+        st.lists(
+            st.integers(min_value=1, max_value=1000000),
+            min_size=number_of_runners,
+            max_size=number_of_runners,
+            unique=True,
+        )
+    )
+
+    return [
+        draw(generate_runner(sort_priority, selection_id))
+        for sort_priority, selection_id in zip(range(1, number_of_runners + 1), selection_ids)
+    ]
+
+
+@composite
+def market_definition_generator(draw):
+    number_of_runners = draw(st.integers(min_value=2, max_value=20))
+
+    market_definition = st.fixed_dictionaries({
+        "eventId": st.integers(min_value=10000, max_value=10000000).map(str),
+        "status": st.sampled_from(["INACTIVE", "OPEN", "SUSPENDED", "CLOSED"]),
+        "runners": generate_runner_definitions(number_of_runners),
+    })
+
+    return draw(market_definition)
+
+
 @composite
 def generate_market_definition(draw):
 
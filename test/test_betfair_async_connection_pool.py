@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from betfairstreamer.stream.betfair_async_connection import BetfairAsyncConnection
+from betfairstreamer.stream.betfair_async_connection_pool import AsyncBetfairConnectionPool
+
+
+async def create_connection(peers):
+    connected = asyncio.Event()
+
+    async def handle(reader, writer):
+        peers.append(writer)
+        connected.set()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+    await connected.wait()
+
+    return server, BetfairAsyncConnection(reader=reader, writer=writer)
+
+
+def test_async_pool_multiplexes_connections():
+    async def run():
+        peers = []
+        pool = AsyncBetfairConnectionPool(max_queue_size=1)
+
+        servers = []
+
+        for _ in range(2):
+            server, connection = await create_connection(peers)
+            servers.append(server)
+            pool.add_connection(connection)
+
+        peers[0].write(b"a1\r\na2\r\n")
+        peers[1].write(b"b1\r\n")
+
+        received = []
+
+        async for m in pool:
+            received.append(m)
+
+            if len(received) == 3:
+                break
+
+        assert sorted(received) == [b"a1", b"a2", b"b1"]
+        assert received.index(b"a1") < received.index(b"a2")
+
+        peers[1].close()
+
+        with pytest.raises(ConnectionError):
+            async for _ in pool:
+                pass
+
+        await pool.close()
+
+        for server in servers:
+            server.close()
+
+    asyncio.run(run())
@@ -1,5 +1,6 @@
 import json
 import socket
+import threading
 from test.generators import generate_message
 
 import hypothesis.strategies as st
@@ -7,7 +8,9 @@ import pytest
 from hypothesis import assume, given, note
 
 from betfairstreamer.helpers.stream_helpers import create_order_subscription
+from betfairstreamer.stream import betfair_connection
 from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.frame_classifier import classify_frame
 
 
 def test_closed_connection():
@@ -61,3 +64,102 @@ def test_receive(buffer_size, msg):
     note(str_msg)
     assert messages == byte_msg.split(b"\r\n")[:-1]
     assert msg_count == count
+
+
+def test_receive_buffer_grows_on_burst():
+    s1, s2 = socket.socketpair()
+
+    connection = BetfairConnection(connection=s1, buffer_size=16, max_buffer_size=64, app_key="")
+
+    s2.sendall(b"a" * 1000 + b"\r\n")
+
+    messages = []
+
+    while not messages:
+        messages = connection.read()
+
+    assert messages == [b"a" * 1000]
+    assert connection.receive_buffer.size == 64
+    assert connection.receive_statistics.bytes_received == 1002
+    assert connection.receive_statistics.buffer_grows == 2
+
+
+def fake_betfair(peer, subscriptions, frames):
+    peer.sendall(b'{"op":"connection","connectionId":"1"}\r\n')
+    peer.recv(8000)
+    peer.sendall(b'{"op":"status","id":1,"statusCode":"SUCCESS"}\r\n')
+
+    subscriptions.append(json.loads(peer.recv(8000)))
+    peer.sendall(b'{"op":"status","id":1,"statusCode":"SUCCESS"}\r\n' + b"".join(f + b"\r\n" for f in frames))
+
+
+def test_reconnect_resubscribes_with_clocks(monkeypatch):
+    subscriptions = []
+    peers = []
+
+    def create_socket(*args):
+        s1, s2 = socket.socketpair()
+        peers.append(s2)
+        threading.Thread(target=fake_betfair, args=(s2, subscriptions, frames)).start()
+        return s1
+
+    monkeypatch.setattr(betfair_connection, "create_betfair_socket", create_socket)
+
+    frames = [
+        b'{"op":"mcm","id":1,"initialClk":"INITIAL","clk":"CLK1","pt":1,"ct":"SUB_IMAGE","mc":[]}',
+        b'{"op":"mcm","id":1,"clk":"CLK2","pt":2,"mc":[]}',
+    ]
+
+    connection = BetfairConnection(app_key="")
+    connection.connect("token", create_order_subscription())
+
+    assert connection.read() == frames
+    assert (connection.stream_state.initial_clk, connection.stream_state.clk) == ("INITIAL", "CLK2")
+
+    # The new initialClk is followed by another frame with a clk in the same read.
+    frames = [
+        b'{"op":"mcm","id":1,"initialClk":"INITIAL2","clk":"CLK3","pt":3,"ct":"RESUB_DELTA","mc":[]}',
+        b'{"op":"mcm","id":1,"clk":"CLK4","pt":4,"mc":[]}',
+    ]
+    connection.reconnect("token")
+
+    assert "clk" not in subscriptions[0]
+    assert subscriptions[1]["initialClk"] == "INITIAL"
+    assert subscriptions[1]["clk"] == "CLK2"
+    assert connection.read() == frames
+    assert (connection.stream_state.initial_clk, connection.stream_state.clk) == ("INITIAL2", "CLK4")
+
+    connection.close()
+
+    for peer in peers:
+        peer.close()
+
+
+def test_clocks_classify_only_the_last_frame_with_a_clock(monkeypatch):
+    s1, s2 = socket.socketpair()
+    headers = []
+
+    def classify(frame):
+        header = classify_frame(frame)
+        headers.append(header)
+        return header
+
+    monkeypatch.setattr(betfair_connection, "classify_frame", classify)
+
+    connection = BetfairConnection(connection=s1, app_key="")
+
+    s2.sendall(b'{"op":"mcm","id":1,"initialClk":"INITIAL","clk":"CLK1","pt":1,"ct":"SUB_IMAGE","mc":[]}\r\n')
+    connection.read()
+
+    s2.sendall(
+        b'{"op":"mcm","id":1,"clk":"CLK2","pt":2,"mc":[]}\r\n'
+        b'{"op":"mcm","id":1,"clk":"CLK3","pt":3,"mc":[]}\r\n'
+        b'{"op":"mcm","id":1,"pt":4,"segmentType":"SEG_START","mc":[]}\r\n'
+    )
+
+    assert len(connection.read()) == 3
+    assert len(headers) == 3
+    assert (connection.stream_state.initial_clk, connection.stream_state.clk) == ("INITIAL", "CLK3")
+
+    s1.close()
+    s2.close()
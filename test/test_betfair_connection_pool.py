@@ -0,0 +1,182 @@
+import json
+import socket
+import threading
+
+from betfairstreamer.helpers.stream_helpers import create_market_subscription
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.order_cache import OrderCache
+from betfairstreamer.stream import betfair_connection
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+from betfairstreamer.stream.connection_supervisor import ConnectionEventType, ConnectionSupervisor
+from betfairstreamer.stream.frame_classifier import FrameClassifier
+from betfairstreamer.stream.latency import LatencyRecorder, LatencyStage
+
+
+def market_change_message(market_id, pt, img=False, ltp=1.5):
+    market_change = {"id": market_id, "rc": [{"id": 1, "ltp": ltp}]}
+
+    if img:
+        market_change["img"] = True
+        market_change["marketDefinition"] = {"runners": [{"id": 1, "sortPriority": 1}]}
+
+    return json.dumps({"op": "mcm", "id": 1, "clk": str(pt), "pt": pt, "mc": [market_change]}).encode() + b"\r\n"
+
+
+def create_pool():
+    pool = BetfairConnectionPool(timeout=1000)
+    peers = []
+
+    for _ in range(2):
+        s1, s2 = socket.socketpair()
+        pool.add_connection(BetfairConnection(connection=s1, app_key=""))
+        peers.append((s1.fileno(), s2))
+
+    return pool, peers
+
+
+def test_read_batches_groups_by_connection():
+    pool, peers = create_pool()
+
+    (fd1, s1), (fd2, s2) = peers
+
+    s1.sendall(market_change_message("1.1", 1, img=True) + market_change_message("1.1", 2, ltp=2))
+    s2.sendall(market_change_message("1.2", 3, img=True))
+
+    market_cache = MarketCache()
+    received = {}
+
+    for batch in pool.read_batches(market_cache=market_cache, order_cache=OrderCache()):
+        for fd, messages in batch.messages.items():
+            received.setdefault(fd, []).extend(messages)
+
+        assert len({mb.market_id for mb in batch.market_books}) == len(batch.market_books)
+
+        if sum(len(m) for m in received.values()) == 3:
+            break
+
+    assert [m["pt"] for m in received[fd1]] == [1, 2]
+    assert [m["pt"] for m in received[fd2]] == [3]
+    assert market_cache.market_books["1.1"].metadata[0, 0] == 2
+    assert market_cache.market_books["1.2"].metadata[0, 0] == 1.5
+
+
+def test_read_batches_skips_reads_without_messages():
+    pool = BetfairConnectionPool(timeout=1000, frame_classifier=FrameClassifier())
+    s1, s2 = socket.socketpair()
+    pool.add_connection(BetfairConnection(connection=s1, app_key=""))
+
+    frame = market_change_message("1.1", 1, img=True)
+
+    # A skipped heartbeat and a partial frame, then the rest of the frame.
+    s2.sendall(b'{"op":"mcm","id":1,"clk":"A","pt":1,"ct":"HEARTBEAT"}\r\n' + frame[:10])
+    threading.Timer(0.1, s2.sendall, args=(frame[10:],)).start()
+
+    for batch in pool.read_batches():
+        break
+
+    assert len(batch) == 1
+    assert batch.messages[s1.fileno()][0]["pt"] == 1
+
+    pool.close()
+    s2.close()
+
+
+def test_read_batches_records_latency():
+    pool, peers = create_pool()
+    pool.latency_recorder = LatencyRecorder()
+
+    (fd1, s1), (fd2, s2) = peers
+    s1.sendall(market_change_message("1.1", 1, img=True))
+    s2.sendall(market_change_message("1.2", 1, img=True))
+
+    received = 0
+
+    for batch in pool.read_batches(market_cache=MarketCache()):
+        received += len(batch)
+
+        if received == 2:
+            break
+
+    snapshot = pool.latency_recorder.snapshot()
+
+    # Both subscriptions have id 1, the histograms are per connection.
+    for stage in LatencyStage:
+        assert snapshot.connections[(fd1, stage)].count == 1
+        assert snapshot.connections[(fd2, stage)].count == 1
+        assert snapshot.markets[("1.1", stage)].count == 1
+
+
+def test_supervisor_reconnects_dead_connection(monkeypatch):
+    def create_socket(*args):
+        s1, s2 = socket.socketpair()
+        s2.sendall(b'{"op":"connection","connectionId":"1"}\r\n')
+        s2.sendall(b'{"op":"status","id":1,"statusCode":"SUCCESS"}\r\n' * 2)
+        s2.sendall(market_change_message("1.3", 10, img=True))
+        peers.append(s2)
+        return s1
+
+    monkeypatch.setattr(betfair_connection, "create_betfair_socket", create_socket)
+
+    peers = []
+    events = []
+
+    pool, initial_peers = create_pool()
+    pool.supervisor = ConnectionSupervisor(session_token="token", initial_backoff=0.01, check_interval_ms=10)
+    pool.supervisor.add_event_handler(events.append)
+
+    for connection in pool.connections.values():
+        connection.subscription_message = create_market_subscription(heartbeat_ms=60000)
+
+    (_, s1), (_, s2) = initial_peers
+    s1.close()
+    s2.sendall(market_change_message("1.2", 3, img=True))
+
+    market_cache = MarketCache()
+
+    for batch in pool.read_batches(market_cache=market_cache):
+        if "1.3" in market_cache.market_books:
+            break
+
+    assert "1.2" in market_cache.market_books
+    assert [e.event_type for e in events] == [
+        ConnectionEventType.DISCONNECTED,
+        ConnectionEventType.RECONNECTING,
+        ConnectionEventType.RECONNECTED,
+    ]
+    assert len(pool.connections) == 2
+
+    pool.close()
+
+
+def test_supervisor_reconnect_times_out_on_a_silent_host():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+
+    s1, s2 = socket.socketpair()
+    pool = BetfairConnectionPool()
+    connection = BetfairConnection(
+        connection=s1, app_key="", hostname="127.0.0.1", port=listener.getsockname()[1], use_ssl=False
+    )
+    connection.subscription_message = create_market_subscription()
+    pool.add_connection(connection)
+
+    # The listener accepts the connection but never answers the handshake.
+    supervisor = ConnectionSupervisor(session_token="token", initial_backoff=0.01, connect_timeout=0.05)
+    supervisor.connection_lost(pool, connection, ConnectionEventType.DISCONNECTED)
+
+    event = supervisor.pending_events.get(timeout=5)
+
+    while event.event_type != ConnectionEventType.RECONNECT_FAILED:
+        event = supervisor.pending_events.get(timeout=5)
+
+    assert "timed out" in event.error
+
+    supervisor.stop(timeout=5)
+
+    assert not any(thread.is_alive() for thread in supervisor.reconnecting.values())
+
+    connection.close()
+    listener.close()
+    s2.close()
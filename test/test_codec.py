@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import BETFAIR_TICKS, FULL_PRICE_LADDER_INDEX
+from betfairstreamer.models.market_cache import MarketCache
+
+STREAM_MESSAGES = [
+    b'{"op":"connection","connectionId":"002-051134157842-432409"}',
+    b'{"op":"status","id":1,"statusCode":"SUCCESS","connectionClosed":false,"connectionsAvailable":9}',
+    b'{"op":"mcm","id":1,"clk":"AAAAAAAA","pt":1474370390000,"ct":"HEARTBEAT"}',
+    b'{"op":"mcm","id":1,"initialClk":"G1FZ0Y2IEQ==","clk":"AAAAAAAA","conflateMs":0,"heartbeatMs":5000,'
+    b'"pt":1583578555932,"ct":"SUB_IMAGE","mc":[{"id":"1.169206538","img":true,"marketDefinition":'
+    b'{"eventId":"29735121","status":"OPEN","inPlay":false,"version":3207633585,"runners":['
+    b'{"status":"ACTIVE","sortPriority":1,"id":1221385},{"status":"ACTIVE","sortPriority":2,"id":58805},'
+    b'{"status":"ACTIVE","sortPriority":3,"id":1221386}]},"rc":[{"id":1221385,"atb":[[1.01,2000],[1.5,12.2]],'
+    b'"atl":[[1000,2.5],[2,10.01]],"trd":[[1.01,5.05]],"batb":[[0,1.5,12.2]],"bdatb":[[0,1.5,12.2]],'
+    b'"ltp":1.5,"tv":5.05},{"id":58805,"atb":[[3.05,10]],"atl":[[3.1,7.5]]}]}]}',
+    b'{"op":"mcm","id":1,"clk":"AAAAAAAB","pt":1583578556932,"mc":[{"id":"1.169206538","rc":'
+    b'[{"id":1221385,"atb":[[1.01,0]],"atl":[[1.02,5.55]],"trd":[[1.02,1.1]],"ltp":1.02,"tv":6.15}]}]}',
+]
+
+
+@pytest.mark.parametrize("name", codec.available_codecs())
+@pytest.mark.parametrize("message", STREAM_MESSAGES)
+def test_codec_conformance(name, message):
+    c = codec.CODECS[name]
+
+    assert c.loads(message) == json.loads(message)
+    assert c.loads(memoryview(message)) == json.loads(message)
+    assert json.loads(c.dumps(json.loads(message))) == json.loads(message)
+
+
+@pytest.mark.parametrize("name", codec.available_codecs())
+def test_codec_prices_hit_ladder_index(name):
+    c = codec.CODECS[name]
+
+    prices = c.loads(json.dumps(BETFAIR_TICKS).encode())
+
+    assert [FULL_PRICE_LADDER_INDEX[p] for p in prices] == list(range(len(BETFAIR_TICKS)))
+
+
+@pytest.mark.parametrize("name", codec.available_codecs())
+def test_codec_market_cache(name):
+    c = codec.CODECS[name]
+
+    expected_cache = MarketCache()
+    cache = MarketCache()
+
+    for message in STREAM_MESSAGES[2:]:
+        expected_cache(json.loads(message))
+        cache(c.loads(message))
+
+    market_book = cache.market_books["1.169206538"]
+    expected_market_book = expected_cache.market_books["1.169206538"]
+
+    assert (market_book.full_price_ladder == expected_market_book.full_price_ladder).all()
+    assert (market_book.trd == expected_market_book.trd).all()
+    serialised = market_book.serialise()
+
+    assert json.loads(c.dumps(serialised)) == json.loads(codec.CODECS["json"].dumps(serialised))
+
+
+def test_set_codec():
+    default = codec.get_codec()
+
+    try:
+        assert codec.set_codec("json").name == "json"
+        assert codec.loads(b"[1.01]") == [1.01]
+
+        with pytest.raises(ValueError):
+            codec.set_codec("unknown")
+    finally:
+        codec.set_codec(default.name)
@@ -0,0 +1,130 @@
+import socket
+import threading
+import time
+from test.test_betfair_connection_pool import market_change_message
+
+import pytest
+
+from betfairstreamer.codec import loads
+from betfairstreamer.models.conflated_market_cache import ConflatedMarketCache
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+
+
+def test_changed_markets_are_delivered_once():
+    cache = ConflatedMarketCache()
+
+    cache(loads(market_change_message("1.1", 1, img=True)))
+    cache(loads(market_change_message("1.2", 2, img=True)))
+
+    for pt in range(3, 8):
+        cache(loads(market_change_message("1.1", pt, ltp=pt)))
+
+    market_books = cache.take()
+
+    assert [mb.market_id for mb in market_books] == ["1.1", "1.2"]
+    assert market_books[0].metadata[0, 0] == 7
+    assert market_books[0] is not cache.market_cache.market_books["1.1"]
+    assert (cache.updates, cache.deltas_coalesced, cache.deliveries) == (7, 5, 1)
+    assert cache.coalesced == {"1.1": 5}
+
+    assert cache.take() == []
+
+    cache(loads(market_change_message("1.1", 8, ltp=8)))
+
+    assert cache.market_cache.market_books["1.1"].metadata[0, 0] == 8
+    assert market_books[0].metadata[0, 0] == 7
+
+
+def test_wait_delivers_at_most_once_per_window():
+    cache = ConflatedMarketCache(window_ms=60000)
+
+    assert cache.wait(timeout=0) == []
+
+    cache(loads(market_change_message("1.1", 1, img=True)))
+
+    assert len(cache.wait(timeout=1)) == 1
+
+    cache(loads(market_change_message("1.1", 2, ltp=2)))
+
+    assert cache.wait(timeout=0.01) == []
+
+    # The window of the previous delivery is over.
+    cache.last_delivery -= 60
+
+    assert cache.wait(timeout=0)[0].metadata[0, 0] == 2
+
+
+def test_wait_wakes_on_update():
+    cache = ConflatedMarketCache()
+    waiting = threading.Event()
+    delivered = []
+
+    def consume():
+        waiting.set()
+        delivered.extend(cache.wait(timeout=5))
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    waiting.wait(5)
+
+    cache(loads(market_change_message("1.1", 1, img=True)))
+    consumer.join(5)
+
+    assert [mb.market_id for mb in delivered] == ["1.1"]
+
+
+def test_copies_do_not_block_the_reader(monkeypatch):
+    cache = ConflatedMarketCache()
+    cache(loads(market_change_message("1.1", 1, img=True)))
+
+    copy = MarketBook.copy
+    updated = []
+
+    def update_while_copying(market_book):
+        # The reader applies a delta in the middle of the copy, it would deadlock if the lock were held.
+        if not updated:
+            reader = threading.Thread(target=cache, args=(loads(market_change_message("1.1", 2, ltp=5)),))
+            reader.start()
+            reader.join(5)
+            updated.append(not reader.is_alive())
+
+        return copy(market_book)
+
+    monkeypatch.setattr(MarketBook, "copy", update_while_copying)
+
+    market_books = cache.take()
+
+    assert updated == [True]
+    assert market_books[0].metadata[0, 0] == 5
+    assert cache.take() == []
+
+
+def test_reader_thread_applies_pool_messages():
+    s1, s2 = socket.socketpair()
+    pool = BetfairConnectionPool(timeout=1000)
+    pool.add_connection(BetfairConnection(connection=s1, app_key=""))
+
+    cache = ConflatedMarketCache()
+    cache.start(pool)
+
+    s2.sendall(market_change_message("1.1", 1, img=True) + market_change_message("1.1", 2, ltp=3))
+
+    market_books = []
+    deadline = time.monotonic() + 5
+
+    while time.monotonic() < deadline and cache.market_cache.publish_time < 2:
+        market_books.extend(cache.wait(timeout=0.1))
+
+    market_books.extend(cache.take())
+
+    assert {mb.market_id for mb in market_books} == {"1.1"}
+    assert market_books[-1].metadata[0, 0] == 3
+
+    s2.close()
+
+    with pytest.raises(ConnectionError):
+        cache.wait(timeout=5)
+
+    pool.close()
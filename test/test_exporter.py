@@ -0,0 +1,116 @@
+import bz2
+import json
+import os
+
+import numpy as np
+import pytest
+
+from betfairstreamer.historical.exporter import export_market_series, load_market_series
+from betfairstreamer.models.market_cache import MarketCache
+
+RUNNERS = [{"id": 10, "sortPriority": 1}, {"id": 20, "sortPriority": 2}]
+
+
+def create_messages():
+    open_definition = {"status": "OPEN", "runners": RUNNERS}
+    messages = [
+        {
+            "op": "mcm",
+            "pt": 1,
+            "mc": [
+                {"id": "1.1", "img": True, "marketDefinition": open_definition, "rc": [{"id": 10, "atb": [[2, 5]]}]},
+                {"id": "1.2", "img": True, "marketDefinition": open_definition, "rc": [{"id": 20, "ltp": 3}]},
+            ],
+        },
+        {"op": "mcm", "pt": 2, "mc": [{"id": "1.1", "rc": [{"id": 20, "ltp": 2.5, "tv": 10, "trd": [[2.5, 10]]}]}]},
+        {
+            "op": "mcm",
+            "pt": 3,
+            "mc": [{"id": "1.1", "rc": [{"id": 10, "atb": [[2, 0], [1.5, 4]], "batb": [[0, 1.5, 4]]}]}],
+        },
+        {"op": "mcm", "pt": 4, "mc": [{"id": "1.2", "rc": [{"id": 20, "atl": [[4, 8]]}]}]},
+        {"op": "mcm", "pt": 5, "mc": [{"id": "1.1", "marketDefinition": {"status": "CLOSED", "runners": RUNNERS}}]},
+    ]
+
+    return messages
+
+
+def expected_market_books(messages, market_id):
+    market_cache = MarketCache()
+    market_books = []
+
+    for message in messages:
+        for market_book in market_cache.update(message):
+            if market_book.market_id == market_id:
+                market_books.append((message["pt"], market_book.copy()))
+
+    return market_books
+
+
+@pytest.mark.parametrize("fmt", ["npz", "npy"])
+def test_export_and_load(tmp_path, fmt):
+    path = str(tmp_path / "historical.bz2")
+
+    with bz2.open(path, "wt") as f:
+        f.write("\n".join(json.dumps(m) for m in create_messages()))
+
+    written = export_market_series([path], str(tmp_path / "series"), fmt=fmt, full_price_ladder=True, trd=True)
+
+    assert sorted(written) == ["1.1", "1.2"]
+
+    series = load_market_series(written["1.1"])
+    expected = expected_market_books(create_messages(), "1.1")
+
+    assert series.market_id == "1.1"
+    assert series.market_definition["status"] == "CLOSED"
+    assert series.pt.tolist() == [pt for pt, _ in expected] == [1, 2, 3, 5]
+    assert series.selection_ids.tolist() == [[10, 20]] * 4
+
+    if fmt == "npy":
+        assert isinstance(series.metadata, np.memmap)
+
+    for step, (_, market_book) in enumerate(expected):
+        assert np.array_equal(series.metadata[step], market_book.metadata)
+        assert np.array_equal(series.best_offers[step], market_book.best_offers)
+        assert np.array_equal(series.best_display[step], market_book.best_display)
+        assert np.array_equal(series.full_price_ladder_at(step), market_book.full_price_ladder)
+        assert np.array_equal(series.trd_at(step), market_book.trd)
+
+    # Only changed levels are stored, the removed 2.0 level as size 0.
+    assert len(series.full_price_ladder_index) == 3
+    assert len(series.trd_index) == 1
+
+
+def test_export_selected_markets_without_ladders(tmp_path):
+    path = str(tmp_path / "historical")
+
+    with open(path, "w") as f:
+        f.write("\n".join(json.dumps(m) for m in create_messages()))
+
+    written = export_market_series([path], str(tmp_path), market_ids=["1.2"])
+
+    assert list(written) == ["1.2"]
+    assert os.path.basename(written["1.2"]) == "1.2.npz"
+
+    series = load_market_series(written["1.2"])
+
+    assert len(series) == 2
+    assert series.full_price_ladder_index is None
+
+    with pytest.raises(ValueError):
+        series.full_price_ladder_at(0)
+
+
+def test_frames_after_closed_do_not_overwrite(tmp_path):
+    path = str(tmp_path / "historical")
+    settled = {"status": "CLOSED", "settledTime": "2020-01-01T00:00:00Z", "runners": RUNNERS}
+    messages = create_messages() + [{"op": "mcm", "pt": 6, "mc": [{"id": "1.1", "marketDefinition": settled}]}]
+
+    with open(path, "w") as f:
+        f.write("\n".join(json.dumps(m) for m in messages))
+
+    written = export_market_series([path], str(tmp_path / "series"))
+    series = load_market_series(written["1.1"])
+
+    assert len(series) == len(expected_market_books(create_messages(), "1.1"))
+    assert series.pt[-1] == 5
@@ -0,0 +1,56 @@
+import socket
+
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.frame_classifier import FrameClassifier, StreamState, classify_frame
+
+HEARTBEAT = b'{"op":"mcm","id":2,"clk":"AHMAcArtjjje","pt":1474370390000,"ct":"HEARTBEAT"}'
+IMAGE = (
+    b'{"op":"mcm","id":2,"initialClk":"G1FZ0Y2IEQ==","clk":"AHMAcArtjjjf","conflateMs":0,"heartbeatMs":5000,'
+    b'"pt":1474370391000,"ct":"SUB_IMAGE","mc":[{"id":"1.102151754","img":true,"marketDefinition":'
+    b'{"eventId":"28009878","runners":[{"id":1,"sortPriority":1}]},"rc":[{"id":1,"atb":[[1.5,2]]}]}]}'
+)
+DELTA = b'{"op":"mcm","id":2,"clk":"AHMAcArtjjjg","pt":1474370392000,"mc":[{"id":"1.102151755","rc":[{"id":1}]}]}'
+
+
+def test_classify_frame_header():
+    header = classify_frame(IMAGE)
+
+    assert header.op == "mcm"
+    assert header.id == 2
+    assert header.ct == "SUB_IMAGE"
+    assert header.initial_clk == "G1FZ0Y2IEQ=="
+    assert header.clk == "AHMAcArtjjjf"
+    assert header.pt == 1474370391000
+    assert header.changes_offset > 0
+
+    assert classify_frame(HEARTBEAT).is_heartbeat
+    assert classify_frame(b'{"op":"status","id":1,"statusCode":"SUCCESS"}').op == "status"
+
+
+def test_frame_classifier_skips_heartbeats_and_denied_markets():
+    classifier = FrameClassifier(denied_market_ids={"1.102151755"})
+    stream_state = StreamState()
+
+    frames = classifier.classify([HEARTBEAT, IMAGE, DELTA], stream_state)
+
+    assert frames == [IMAGE]
+    assert classifier.heartbeats_skipped == 1
+    assert classifier.denied_frames_skipped == 1
+    assert classifier.frames_passed == 1
+
+    assert stream_state.heartbeats == 1
+    assert stream_state.initial_clk == "G1FZ0Y2IEQ=="
+    assert stream_state.clk == "AHMAcArtjjjg"
+    assert stream_state.publish_time == 1474370392000
+
+
+def test_connection_read_classifies_frames():
+    s1, s2 = socket.socketpair()
+
+    connection = BetfairConnection(connection=s1, app_key="", frame_classifier=FrameClassifier())
+
+    s2.sendall(HEARTBEAT + b"\r\n" + DELTA + b"\r\n")
+
+    assert connection.read() == [DELTA]
+    assert connection.stream_state.clk == "AHMAcArtjjjg"
+    assert connection.stream_state.last_received > 0
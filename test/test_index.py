@@ -0,0 +1,136 @@
+import bz2
+import json
+
+import pytest
+
+from betfairstreamer.historical.index import HistoricalIndex
+from betfairstreamer.historical.reader import read_historical_messages
+from betfairstreamer.models.market_cache import MarketCache
+
+
+def create_definition(event_type_id, country_code):
+    return {
+        "eventTypeId": event_type_id,
+        "marketType": "WIN" if event_type_id == "7" else "MATCH_ODDS",
+        "countryCode": country_code,
+        "runners": [{"id": 1, "sortPriority": 1}],
+    }
+
+
+DEFINITIONS = {
+    "1.1": create_definition("7", "GB"),
+    "1.2": create_definition("1", "DE"),
+    "1.3": create_definition("7", "IE"),
+}
+
+
+def create_messages(market_ids, first_pt, updates):
+    messages = []
+
+    for i in range(updates):
+        pt = first_pt + i
+        mc = []
+
+        for market_id in market_ids:
+            market_change = {"id": market_id, "rc": [{"id": 1, "ltp": pt, "trd": [[2, i + 1]]}]}
+
+            if i == 0:
+                market_change["img"] = True
+                market_change["marketDefinition"] = DEFINITIONS[market_id]
+
+            if i == 0 or i % len(market_ids) == market_ids.index(market_id):
+                mc.append(market_change)
+
+        messages.append({"op": "mcm", "clk": str(pt), "pt": pt, "mc": mc})
+
+    return messages
+
+
+def write_file(path, messages, compress):
+    data = "\n".join(json.dumps(m) for m in messages) + "\n"
+
+    if compress:
+        with bz2.open(path, "wt") as f:
+            f.write(data)
+    else:
+        with open(path, "w") as f:
+            f.write(data)
+
+    return str(path)
+
+
+@pytest.fixture
+def files(tmp_path):
+    return [
+        write_file(tmp_path / "a.bz2", create_messages(["1.1", "1.2"], 1000, 400), compress=True),
+        write_file(tmp_path / "b", create_messages(["1.3"], 5000, 400), compress=False),
+    ]
+
+
+def filtered(files, market_ids, start_pt=None, end_pt=None):
+    messages = []
+
+    for path in files:
+        for message in read_historical_messages(path):
+            mc = [m for m in message["mc"] if m["id"] in market_ids]
+
+            if mc and (start_pt is None or message["pt"] >= start_pt) and (end_pt is None or message["pt"] <= end_pt):
+                messages.append(dict(message, mc=mc))
+
+    return messages
+
+
+def test_index_summary(files):
+    index = HistoricalIndex.build(files, block_size=2048)
+
+    assert sorted(index.markets) == ["1.1", "1.2", "1.3"]
+    assert index.markets["1.1"].first_pt == 1000
+    assert index.markets["1.1"].last_pt == 1398
+    assert index.markets["1.2"].messages == 201
+    assert index.markets["1.3"].summary == {"eventTypeId": "7", "marketType": "WIN", "countryCode": "IE"}
+    assert {i for i, _ in index.markets["1.3"].blocks} == {1}
+
+    assert index.find(event_type_ids=["7"]) == ["1.1", "1.3"]
+    assert index.find(event_type_ids=["7"], country_codes=["GB"]) == ["1.1"]
+    assert index.find(start_pt=4000) == ["1.3"]
+    assert index.find(end_pt=999) == []
+
+
+@pytest.mark.parametrize("market_ids", [["1.2"], ["1.3"], ["1.1", "1.3"]])
+def test_replay_markets(tmp_path, files, market_ids):
+    index = HistoricalIndex.build(files, block_size=2048)
+    index.save(tmp_path / "index.json")
+    index = HistoricalIndex.load(tmp_path / "index.json")
+
+    assert list(index.replay(market_ids)) == filtered(files, market_ids)
+
+    market_cache = MarketCache()
+
+    for message in index.replay(market_ids):
+        market_cache(message)
+
+    assert sorted(market_cache.market_books) == market_ids
+
+
+def test_replay_time_window(files):
+    index = HistoricalIndex.build(files, block_size=2048)
+
+    assert list(index.replay(["1.1"], start_pt=1200, end_pt=1250)) == filtered(files, ["1.1"], 1200, 1250)
+    assert list(index.replay(start_pt=5390)) == filtered(files, ["1.1", "1.2", "1.3"], 5390)
+
+    # Only the blocks overlapping the window are read.
+    selected = index.select_blocks(["1.1"], 1200, 1250)
+
+    assert list(selected) == [0]
+    assert len(selected[0]) < len(index.files[0].blocks) / 4
+
+
+def test_stale_files(tmp_path, files):
+    index = HistoricalIndex.build(files)
+
+    assert index.stale_files() == []
+
+    with open(files[1], "a") as f:
+        f.write("\n")
+
+    assert index.stale_files() == [files[1]]
@@ -0,0 +1,59 @@
+from betfairstreamer.stream.latency import LatencyHistogram, LatencyRecorder, LatencyStage
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram(bounds=(1, 10, 100))
+
+    for value in [0.5, 1, 5, 5, 50, 500]:
+        histogram.record(value)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot.counts == (2, 2, 1, 1)
+    assert snapshot.count == 6
+    assert snapshot.maximum == 500
+    assert snapshot.mean == sum([0.5, 1, 5, 5, 50, 500]) / 6
+
+    assert snapshot.percentile(25) == 1
+    assert snapshot.percentile(50) == 10
+    assert snapshot.percentile(80) == 100
+    assert snapshot.percentile(100) == 500
+
+
+def test_empty_histogram():
+    snapshot = LatencyHistogram().snapshot()
+
+    assert snapshot.mean == 0
+    assert snapshot.percentile(99) == 0
+
+
+def test_recorder_per_connection_and_market():
+    recorder = LatencyRecorder()
+
+    message = {"op": "mcm", "id": 1, "pt": 1000, "mc": [{"id": "1.1"}, {"id": "1.2"}]}
+
+    recorder.record(LatencyStage.RECEIVE, message, 1003)
+    recorder.record(LatencyStage.DECODE, message, 1004)
+    recorder.record_all(LatencyStage.RECEIVE, [{"op": "connection"}, {"op": "mcm", "id": 1, "pt": 1000}], 1010)
+
+    snapshot = recorder.snapshot()
+
+    assert snapshot.connections[(1, LatencyStage.RECEIVE)].count == 2
+    assert snapshot.connections[(1, LatencyStage.RECEIVE)].maximum == 10
+    assert snapshot.connections[(1, LatencyStage.DECODE)].count == 1
+    assert snapshot.markets[("1.1", LatencyStage.RECEIVE)].count == 1
+    assert snapshot.markets[("1.2", LatencyStage.DECODE)].total == 4
+
+    recorder.reset()
+
+    assert not recorder.snapshot().connections
+
+
+def test_recorder_without_markets():
+    recorder = LatencyRecorder(per_market=False)
+    recorder.record(LatencyStage.CACHE_UPDATE, {"op": "ocm", "id": 2, "pt": 0, "oc": [{"id": "1.1"}]}, 5)
+
+    snapshot = recorder.snapshot()
+
+    assert snapshot.connections[(2, LatencyStage.CACHE_UPDATE)].count == 1
+    assert not snapshot.markets
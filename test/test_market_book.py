@@ -0,0 +1,232 @@
+from test.generators import price_size
+
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+from hypothesis import given, settings
+
+from betfairstreamer import codec
+from betfairstreamer.models.market_book import (
+    BETFAIR_TICKS,
+    COMPACT_LAYOUT,
+    FULL_PRICE_LADDER_INDEX,
+    VECTORIZE_MIN_LEVELS,
+    MarketBook,
+    MarketBookLayout,
+    price_to_tick,
+    update_ladder,
+)
+from betfairstreamer.models.market_cache import MarketCache
+
+ARRAYS = ("metadata", "best_display", "best_offers", "full_price_ladder", "trd")
+
+
+def generate_levels(max_size):
+    return st.lists(price_size(1.01, 1000), max_size=max_size, unique_by=lambda ps: ps[0])
+
+
+def add_index(levels):
+    return [[i] + level for i, level in enumerate(levels)]
+
+
+@st.composite
+def generate_image(draw, market_id="1.1"):
+    selection_ids = draw(st.lists(st.integers(1, 1000000), min_size=2, max_size=8, unique=True))
+    sort_priorities = draw(st.permutations(range(1, len(selection_ids) + 1)))
+    market_definition = {
+        "status": "OPEN",
+        "runners": [{"id": i, "sortPriority": sp} for i, sp in zip(selection_ids, sort_priorities)],
+    }
+    rc = []
+
+    for runner in market_definition["runners"]:
+        trd = draw(generate_levels(10))
+
+        rc.append(
+            {
+                "id": runner["id"],
+                "atb": draw(generate_levels(10)),
+                "atl": draw(generate_levels(10)),
+                "bdatb": add_index(draw(generate_levels(3))),
+                "bdatl": add_index(draw(generate_levels(3))),
+                "batb": add_index(draw(generate_levels(10))),
+                "batl": add_index(draw(generate_levels(3))),
+                "trd": trd,
+                "ltp": draw(st.floats(1.01, 1000)),
+                "tv": sum(size for _, size in trd),
+            }
+        )
+
+    return {"id": market_id, "img": True, "marketDefinition": market_definition, "rc": rc}
+
+
+def update_ladder_per_level(ladder, levels, remove_empty):
+    for price, size in levels:
+        ladder[FULL_PRICE_LADDER_INDEX[price]] = 0 if remove_empty and size == 0 else (price, size)
+
+
+@st.composite
+def generate_ladder_update(draw):
+    levels = draw(
+        st.lists(price_size(1.01, 1000), min_size=VECTORIZE_MIN_LEVELS // 2, max_size=100, unique_by=lambda ps: ps[0])
+    )
+    removed = draw(st.lists(st.booleans(), min_size=len(levels), max_size=len(levels)))
+
+    return [[price, 0 if remove else size] for (price, size), remove in zip(levels, removed)]
+
+
+def assert_market_books_equal(market_book, expected):
+    assert market_book.market_id == expected.market_id
+    assert market_book.sort_priority_mapping == expected.sort_priority_mapping
+    assert market_book.market_definition == expected.market_definition
+
+    for name in ARRAYS:
+        assert np.array_equal(getattr(market_book, name), getattr(expected, name)), name
+
+
+@settings(max_examples=30, deadline=None)
+@given(generate_image())
+def test_serialise_round_trip(image):
+    market_book = MarketBook.create_new_market_book(image)
+    serialised = market_book.serialise()
+
+    assert [r["id"] for r in serialised["rc"]] == list(market_book.sort_priority_mapping)
+    assert all(isinstance(level[0], int) for r in serialised["rc"] for level in r["bdatb"])
+
+    assert_market_books_equal(MarketBook.create_new_market_book(serialised), market_book)
+    assert_market_books_equal(MarketBook.create_new_market_book(codec.loads(codec.dumps(serialised))), market_book)
+
+
+@pytest.mark.parametrize("name", codec.available_codecs())
+@settings(max_examples=10, deadline=None)
+@given(images=st.lists(generate_image(), min_size=1, max_size=3))
+def test_serialise_bytes_round_trip(name, images):
+    market_cache = MarketCache()
+    market_cache({"op": "mcm", "pt": 1, "mc": [dict(image, id=f"1.{i}") for i, image in enumerate(images)]})
+
+    previous = codec.get_codec()
+
+    try:
+        codec.set_codec(name)
+
+        for market_book in market_cache.market_books.values():
+            assert_market_books_equal(
+                MarketBook.create_new_market_book(codec.loads(market_book.serialise_bytes())), market_book
+            )
+
+        restored = MarketCache()
+        restored(codec.loads(market_cache.serialise_bytes()))
+    finally:
+        codec.set_codec(previous.name)
+
+    assert restored.publish_time == 1
+    assert list(restored.market_books) == list(market_cache.market_books)
+
+    for market_id, market_book in market_cache.market_books.items():
+        assert_market_books_equal(restored.market_books[market_id], market_book)
+
+
+def test_price_to_tick():
+    ticks = np.array(BETFAIR_TICKS)
+
+    assert price_to_tick(ticks).tolist() == list(range(len(BETFAIR_TICKS)))
+    assert price_to_tick(ticks + 1e-9).tolist() == list(range(len(BETFAIR_TICKS)))
+    assert price_to_tick(ticks - 1e-9).tolist() == list(range(len(BETFAIR_TICKS)))
+
+    for price in [1.015, 0.5, 1001, 2.03]:
+        with pytest.raises(KeyError):
+            price_to_tick(np.array([price]))
+
+
+@settings(max_examples=50, deadline=None)
+@given(image=generate_ladder_update(), delta=generate_ladder_update(), remove_empty=st.booleans())
+def test_update_ladder(image, delta, remove_empty):
+    ladder = np.zeros((len(BETFAIR_TICKS), 2))
+    expected = ladder.copy()
+
+    for levels in [image, delta]:
+        update_ladder(ladder, levels, remove_empty)
+        update_ladder_per_level(expected, levels, remove_empty)
+
+        assert np.array_equal(ladder, expected)
+
+
+@pytest.mark.parametrize("levels", [2, VECTORIZE_MIN_LEVELS, 350])
+def test_update_runners_removes_empty_levels(levels):
+    prices = BETFAIR_TICKS[:levels]
+    market_definition = {"status": "OPEN", "runners": [{"id": 1, "sortPriority": 1}]}
+    market_book = MarketBook.create_new_market_book(
+        {
+            "id": "1.1",
+            "img": True,
+            "marketDefinition": market_definition,
+            "rc": [
+                {
+                    "id": 1,
+                    "atb": [[p, 2] for p in prices],
+                    "atl": [[p, 3] for p in prices],
+                    "trd": [[p, 5] for p in prices],
+                }
+            ],
+        }
+    )
+
+    market_book.update(
+        {
+            "id": "1.1",
+            "rc": [
+                {
+                    "id": 1,
+                    "atb": [[p, 0] for p in prices[::2]],
+                    "atl": [[p + 1e-9, 4] for p in prices],
+                    "trd": [[prices[0], 0]],
+                }
+            ],
+        }
+    )
+
+    assert market_book.full_price_ladder[0, 0, :levels:2].sum() == 0
+    assert market_book.full_price_ladder[0, 0, 1 : levels : 2, 1].tolist() == [2] * (levels // 2)
+    assert market_book.full_price_ladder[0, 1, :levels, 1].tolist() == [4] * levels
+    assert market_book.trd[0, 0].tolist() == [prices[0], 0]
+
+
+@settings(max_examples=30, deadline=None)
+@given(image=generate_image(), delta=generate_image())
+def test_compact_layout(image, delta):
+    delta = {"id": image["id"], "rc": [dict(rc, id=r["id"]) for rc, r in zip(delta["rc"], image["rc"])]}
+    market_book = MarketBook.create_new_market_book(image)
+    compact = MarketBook.create_new_market_book(image, layout=MarketBookLayout(compact=True))
+
+    for m in [market_book, compact]:
+        m.update(delta)
+
+    assert compact.compact and not market_book.compact
+    assert compact.full_price_ladder.shape == market_book.full_price_ladder.shape[:-1]
+    assert np.array_equal(compact.get_full_price_ladder(), market_book.get_full_price_ladder())
+    assert np.array_equal(compact.get_trd(), market_book.get_trd())
+    assert np.array_equal(compact.get_full_price_ladder_sizes(), market_book.get_full_price_ladder_sizes())
+    assert np.shares_memory(compact.get_trd_sizes(), compact.trd)
+    assert np.shares_memory(market_book.get_trd_sizes(), market_book.trd)
+    assert compact.serialise() == market_book.serialise()
+    assert codec.loads(compact.serialise_bytes()) == codec.loads(market_book.serialise_bytes())
+
+
+@settings(max_examples=10, deadline=None)
+@given(generate_image())
+def test_compact_float32_sizes(image):
+    market_book = MarketBook.create_new_market_book(image)
+    compact = MarketBook.create_new_market_book(image, layout=COMPACT_LAYOUT)
+
+    assert compact.trd.dtype == np.float32
+    assert compact.full_price_ladder.nbytes * 4 == market_book.full_price_ladder.nbytes
+    assert np.allclose(compact.get_full_price_ladder(), market_book.full_price_ladder, rtol=1e-6)
+    assert np.allclose(compact.get_trd(), market_book.trd, rtol=1e-6)
+
+    restored = MarketBook.create_new_market_book(compact.serialise())
+    assert np.allclose(restored.full_price_ladder, market_book.full_price_ladder, rtol=1e-6)
+
+
+def test_layout_validation():
+    with pytest.raises(ValueError):
+        MarketBookLayout(size_dtype="float32")
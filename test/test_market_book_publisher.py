@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+import zmq
+
+from betfairstreamer.models.market_book import MarketBook
+from betfairstreamer.stream.market_book_publisher import MarketBookPublisher, MarketBookSubscriber
+
+
+def create_market_book(market_id, ltp=1.5):
+    return MarketBook.create_new_market_book(
+        {
+            "id": market_id,
+            "img": True,
+            "marketDefinition": {"runners": [{"id": 10, "sortPriority": 1}, {"id": 20, "sortPriority": 2}]},
+            "rc": [{"id": 10, "ltp": ltp, "atb": [[1.5, 10]], "bdatb": [[0, 1.5, 10]], "trd": [[1.5, 3]]}],
+        }
+    )
+
+
+@pytest.fixture
+def context():
+    context = zmq.Context()
+    yield context
+    context.destroy(linger=0)
+
+
+def connect(context, market_ids=None, definition_interval=100):
+    publisher = MarketBookPublisher.create_publisher(context, "inproc://market-books")
+    publisher.definition_interval = definition_interval
+    subscriber = MarketBookSubscriber.create_subscriber(context, "inproc://market-books", market_ids=market_ids)
+
+    # PUB drops messages until the subscription has propagated.
+    probe = create_market_book("0.0")
+
+    while True:
+        publisher.publish(probe, 0)
+
+        if subscriber.poll(10):
+            subscriber.receive()
+            break
+
+    while subscriber.poll(10):
+        subscriber.receive()
+
+    return publisher, subscriber
+
+
+def test_publish_and_receive_market_books(context):
+    publisher, subscriber = connect(context)
+
+    market_book = create_market_book("1.1")
+    publisher.publish(market_book, 123)
+
+    message = subscriber.receive()
+    received = message.market_book
+
+    assert message.publish_time == 123
+    assert received.market_id == "1.1"
+    assert received.sort_priority_mapping == {10: 1, 20: 2}
+    assert received.market_definition == market_book.market_definition
+
+    for name in ["metadata", "best_display", "best_offers", "full_price_ladder", "trd"]:
+        assert np.array_equal(getattr(received, name), getattr(market_book, name))
+
+    market_book.update({"id": "1.1", "rc": [{"id": 10, "ltp": 2.0}]})
+    publisher.publish(market_book, 124)
+
+    assert subscriber.receive().market_book.metadata[0, 0] == 2.0
+    assert received.metadata[0, 0] == 1.5
+
+
+def test_subscriber_filters_by_market_id(context):
+    publisher, subscriber = connect(context, market_ids=["0.0", "1.1"])
+
+    for market_id in ["1.12", "1.1", "1.2"]:
+        publisher.publish(create_market_book(market_id), 1)
+
+    assert subscriber.receive().market_book.market_id == "1.1"
+    assert not subscriber.poll(50)
+
+
+def test_definition_version_and_interval(context):
+    publisher, subscriber = connect(context, definition_interval=2)
+
+    market_book = create_market_book("1.1")
+
+    headers = [publisher.create_header(market_book, i, []) for i in range(3)]
+
+    assert ["marketDefinition" in h for h in headers] == [True, False, True]
+    assert [h["version"] for h in headers] == [0, 0, 0]
+
+    runners = [{"id": 20, "sortPriority": 1}, {"id": 10, "sortPriority": 2}]
+    market_book.update({"id": "1.1", "marketDefinition": {"runners": runners}})
+
+    header = publisher.create_header(market_book, 4, [])
+
+    assert header["version"] == 1
+    assert "marketDefinition" in header
+
+    # A subscriber that missed the definition skips messages until it is sent again.
+    publisher.create_header(market_book, 5, [])
+    subscriber.market_definitions.clear()
+    publisher.publish(market_book, 5)
+    publisher.publish(market_book, 6)
+
+    assert subscriber.receive() is None
+    assert subscriber.receive().market_book.sort_priority_mapping == {20: 1, 10: 2}
+    assert subscriber.missing_definitions == 1
+
+
+def test_subscriber_waits_for_a_changed_definition(context):
+    publisher, subscriber = connect(context, definition_interval=3)
+
+    market_book = create_market_book("1.1")
+    publisher.publish(market_book, 1)
+
+    assert subscriber.receive().version == 0
+
+    # The message with the changed definition is dropped, the next ones carry version 1 without a definition.
+    runners = [{"id": 20, "sortPriority": 1}, {"id": 10, "sortPriority": 2}]
+    market_book.update({"id": "1.1", "marketDefinition": {"runners": runners}})
+    publisher.create_header(market_book, 2, [])
+
+    publisher.publish(market_book, 3)
+    publisher.publish(market_book, 4)
+
+    assert subscriber.receive() is None
+    assert subscriber.missing_definitions == 1
+
+    message = subscriber.receive()
+
+    assert message.version == 1
+    assert message.market_book.market_definition["runners"] == runners
@@ -3,6 +3,7 @@ from test.generators import generate_runner_definitions, market_definition_gener
 
 import hypothesis.strategies as st
 import numpy as np
+import pytest
 from hypothesis import given
 
 from betfairstreamer.models.betfair_api import (
@@ -10,6 +11,7 @@ from betfairstreamer.models.betfair_api import (
     BetfairMarketChangeMessage,
     BetfairMarketDefinition,
     BetfairRunnerChange,
+    SegmentMode,
 )
 from betfairstreamer.models.market_cache import MarketCache
 
@@ -94,3 +96,124 @@ def test_runner_selection_id_change(data):
 
     assert np.all(market_books[0].best_display[0, 0, 0, :] == np.array([1.4, 30]))
     assert np.all(market_books[0].best_display[1, 0, 0, :] == np.array([1.2, 24]))
+
+
+def test_resub_delta_updates_cached_market_books():
+    mdf = BetfairMarketDefinition(runners=[{"id": 1, "sortPriority": 1}, {"id": 2, "sortPriority": 2}])
+
+    market_cache = MarketCache()
+    market_cache(
+        BetfairMarketChangeMessage(
+            op="mcm",
+            ct="SUB_IMAGE",
+            pt=1,
+            mc=[BetfairMarketChange(id="1.1", marketDefinition=mdf, img=True, rc=[{"id": 1, "ltp": 1.5}])],
+        )
+    )
+    market_book = market_cache.market_books["1.1"]
+
+    market_books = market_cache(
+        BetfairMarketChangeMessage(
+            op="mcm",
+            ct="RESUB_DELTA",
+            pt=2,
+            mc=[
+                BetfairMarketChange(id="1.1", rc=[{"id": 2, "ltp": 3.5}]),
+                BetfairMarketChange(id="1.2", rc=[{"id": 2, "ltp": 3.5}]),
+                BetfairMarketChange(id="1.3", marketDefinition=mdf, rc=[{"id": 2, "ltp": 4}]),
+            ],
+        )
+    )
+
+    assert [mb.market_id for mb in market_books] == ["1.1", "1.3"]
+    assert market_books[0] is market_book
+    assert market_book.metadata[:, 0].tolist() == [1.5, 3.5]
+    assert market_books[1].metadata[:, 0].tolist() == [0, 4]
+
+
+def segmented_image(market_ids, segment_size):
+    mdf = BetfairMarketDefinition(runners=[{"id": 1, "sortPriority": 1}])
+    chunks = [market_ids[i : i + segment_size] for i in range(0, len(market_ids), segment_size)]
+    segment_types = ["SEG_START"] + ["SEG"] * (len(chunks) - 2) + ["SEG_END"]
+
+    return [
+        BetfairMarketChangeMessage(
+            op="mcm",
+            ct="SUB_IMAGE",
+            pt=i + 1,
+            segmentType=segment_type,
+            mc=[
+                BetfairMarketChange(id=market_id, img=True, marketDefinition=mdf, rc=[{"id": 1, "ltp": 2.0}])
+                for market_id in chunk
+            ],
+        )
+        for i, (segment_type, chunk) in enumerate(zip(segment_types, chunks))
+    ]
+
+
+@given(st.sampled_from(list(SegmentMode)), st.integers(1, 5))
+def test_segmented_messages_are_published_at_seg_end(segment_mode, segment_size):
+    market_ids = ["1." + str(i) for i in range(12)]
+    segments = segmented_image(market_ids, segment_size)
+
+    if len(segments) < 2:
+        return
+
+    market_cache = MarketCache(segment_mode=segment_mode)
+
+    for segment in segments[:-1]:
+        assert market_cache(segment) == []
+
+    if segment_mode == SegmentMode.BUFFER:
+        assert not market_cache.market_books
+    else:
+        assert len(market_cache.market_books) == len(market_ids) - len(segments[-1]["mc"])
+
+    market_books = market_cache(segments[-1])
+
+    assert [mb.market_id for mb in market_books] == market_ids
+    assert market_cache.publish_time == len(segments)
+    assert not market_cache.segments and not market_cache.segment_market_books
+
+
+def test_segmented_message_publishes_market_once():
+    segments = segmented_image(["1.1", "1.2"], 1)
+    segments.insert(
+        1,
+        BetfairMarketChangeMessage(
+            op="mcm", pt=2, segmentType="SEG", mc=[BetfairMarketChange(id="1.1", rc=[{"id": 1, "ltp": 3.0}])]
+        ),
+    )
+
+    market_cache = MarketCache()
+    market_books = [mb for segment in segments for mb in market_cache(segment)]
+
+    assert [mb.market_id for mb in market_books] == ["1.1", "1.2"]
+    assert market_books[0].metadata[0, 0] == 3.0
+
+
+def test_incomplete_segmented_message_is_dropped():
+    market_cache = MarketCache()
+
+    market_cache(segmented_image(["1.1", "1.2"], 1)[0])
+    market_books = [mb for segment in segmented_image(["1.3", "1.4"], 1) for mb in market_cache(segment)]
+
+    assert [mb.market_id for mb in market_books] == ["1.3", "1.4"]
+    assert "1.1" not in market_cache.market_books
+
+
+def test_incomplete_segmented_message_is_not_published_eagerly():
+    market_cache = MarketCache(segment_mode=SegmentMode.EAGER)
+
+    market_cache(segmented_image(["1.1", "1.2"], 1)[0])
+    market_books = [mb for segment in segmented_image(["1.3", "1.4"], 1) for mb in market_cache(segment)]
+
+    assert [mb.market_id for mb in market_books] == ["1.3", "1.4"]
+    assert "1.1" in market_cache.market_books
+
+
+def test_delta_for_uncached_market_raises():
+    market_cache = MarketCache()
+
+    with pytest.raises(KeyError):
+        market_cache(BetfairMarketChangeMessage(op="mcm", pt=1, mc=[BetfairMarketChange(id="1.1", rc=[])]))
@@ -0,0 +1,95 @@
+from test.generators import market_definition_generator
+
+import hypothesis.strategies as st
+import numpy as np
+import pytest
+from hypothesis import given, settings
+
+from betfairstreamer.helpers.stream_helpers import create_market_subscription, create_resubscription_message
+from betfairstreamer.models.market_book import COMPACT_LAYOUT, FULL_LAYOUT
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.market_cache_checkpoint import load_checkpoint, save_checkpoint
+from betfairstreamer.utils import MARKET_BOOK_ARRAYS
+
+
+def create_runner_change(selection_id, ltp):
+    return {"id": selection_id, "ltp": ltp, "tv": ltp * 10, "atb": [[ltp, 5]], "batb": [[0, ltp, 5]], "trd": [[ltp, 2]]}
+
+
+def assert_market_caches_equal(restored, market_cache):
+    assert restored.publish_time == market_cache.publish_time
+    assert restored.initial_clk == market_cache.initial_clk
+    assert restored.clk == market_cache.clk
+    assert list(restored.market_books) == list(market_cache.market_books)
+
+    for market_id, market_book in market_cache.market_books.items():
+        restored_market_book = restored.market_books[market_id]
+
+        assert restored_market_book.market_definition == market_book.market_definition
+        assert restored_market_book.sort_priority_mapping == market_book.sort_priority_mapping
+
+        for name in MARKET_BOOK_ARRAYS:
+            assert getattr(restored_market_book, name).dtype == getattr(market_book, name).dtype
+            assert np.array_equal(getattr(restored_market_book, name), getattr(market_book, name))
+
+
+@settings(max_examples=20, deadline=None)
+@given(st.data(), st.integers(0, 5), st.booleans(), st.sampled_from([FULL_LAYOUT, COMPACT_LAYOUT]))
+def test_checkpoint_round_trip(tmp_path_factory, data, number_of_markets, use_mmap, layout):
+    path = tmp_path_factory.mktemp("checkpoint") / "market_cache.bin"
+    market_cache = MarketCache(layout=layout)
+    mc = []
+
+    for i in range(number_of_markets):
+        market_definition = data.draw(market_definition_generator())
+        selection_id = market_definition["runners"][0]["id"]
+        mc.append({"id": f"1.{i}", "img": True, "marketDefinition": market_definition})
+        mc[-1]["rc"] = [create_runner_change(selection_id, 2.0 + i)]
+
+    market_cache({"op": "mcm", "initialClk": "ab", "clk": "cd", "pt": 1, "mc": mc})
+
+    save_checkpoint(market_cache, path)
+    restored = load_checkpoint(path, use_mmap=use_mmap)
+
+    assert_market_caches_equal(restored, market_cache)
+
+    for market_id, market_book in market_cache.market_books.items():
+        selection_id = next(iter(market_book.sort_priority_mapping))
+        market_change = {"id": market_id, "rc": [create_runner_change(selection_id, 3)]}
+        delta = {"op": "mcm", "clk": "ef", "pt": 2, "mc": [market_change]}
+
+        market_cache(delta)
+        restored(delta)
+
+    assert_market_caches_equal(restored, market_cache)
+
+    # Updates to a restored cache do not write through to the checkpoint.
+    if number_of_markets:
+        assert load_checkpoint(path).clk == "cd"
+        assert load_checkpoint(path).market_books["1.0"].metadata.max() == 2.0 * 10
+
+
+def test_resubscription_from_checkpoint(tmp_path):
+    market_cache = MarketCache()
+    subscription_message = create_market_subscription(market_ids=["1.1"])
+
+    assert create_resubscription_message(subscription_message, market_cache.initial_clk, None) is subscription_message
+
+    market_cache({"op": "mcm", "initialClk": "ab", "clk": "cd", "pt": 1, "mc": []})
+    market_cache({"op": "mcm", "clk": "ef", "pt": 2, "ct": "HEARTBEAT"})
+
+    save_checkpoint(market_cache, tmp_path / "market_cache.bin")
+    restored = load_checkpoint(tmp_path / "market_cache.bin")
+    resubscription_message = create_resubscription_message(subscription_message, restored.initial_clk, restored.clk)
+
+    assert resubscription_message["initialClk"] == "ab"
+    assert resubscription_message["clk"] == "ef"
+    assert "clk" not in subscription_message
+
+
+def test_not_a_checkpoint(tmp_path):
+    path = tmp_path / "market_cache.bin"
+    path.write_bytes(b"{}" * 20)
+
+    with pytest.raises(ValueError):
+        load_checkpoint(path)
@@ -1,6 +1,8 @@
 import json
 
-from betfairstreamer.models.betfair_api import Side
+import pytest
+
+from betfairstreamer.models.betfair_api import SegmentMode, Side
 from betfairstreamer.models.order_cache import OrderCache
 
 
@@ -525,3 +527,42 @@ def test_out_of_band_order():
     order_cache(o)
 
     assert order_cache.orders["197366684443"].size_remaining == 40
+
+
+def order_segment(segment_type, bet_id, sm, sr):
+    unmatched_order = {"id": bet_id, "p": 10, "s": 30, "side": "B", "status": "E", "pt": "L", "ot": "L"}
+    unmatched_order.update({"pd": 1583502407000, "sm": sm, "sr": sr, "sl": 0, "sc": 0, "sv": 0, "rac": ""})
+    unmatched_order.update({"rc": "REG_SWE", "rfo": "", "rfs": ""})
+
+    return {
+        "op": "ocm",
+        "pt": 1583502407146,
+        "segmentType": segment_type,
+        "oc": [{"id": "1.169205465", "orc": [{"id": 1221385, "uo": [unmatched_order]}]}],
+    }
+
+
+@pytest.mark.parametrize("segment_mode", list(SegmentMode))
+def test_segmented_order_changes(segment_mode):
+    order_cache = OrderCache(segment_mode=segment_mode)
+
+    assert order_cache(order_segment("SEG_START", "1", 0, 30)) == []
+    assert order_cache(order_segment("SEG", "2", 0, 30)) == []
+    assert len(order_cache.orders) == (2 if segment_mode == SegmentMode.EAGER else 0)
+
+    orders = order_cache(order_segment("SEG_END", "1", 10, 20))
+
+    assert [o.bet_id for o in orders] == ["1", "2"]
+    assert order_cache.orders["1"].size_matched == 10
+    assert order_cache.get_size_matched("1.169205465", 1221385, Side.BACK) == 10
+
+
+def test_incomplete_segmented_order_changes_are_not_published_eagerly():
+    order_cache = OrderCache(segment_mode=SegmentMode.EAGER)
+
+    order_cache(order_segment("SEG_START", "1", 0, 30))
+    order_cache(order_segment("SEG_START", "2", 0, 30))
+    orders = order_cache(order_segment("SEG_END", "3", 0, 30))
+
+    assert [o.bet_id for o in orders] == ["2", "3"]
+    assert "1" in order_cache.orders
@@ -0,0 +1,74 @@
+import bz2
+import gzip
+import json
+
+import pytest
+import zstandard
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from betfairstreamer.historical.reader import (
+    read_historical_batches,
+    read_historical_chunks,
+    read_historical_file,
+    read_historical_messages,
+)
+
+WRITERS = {
+    ".bz2": lambda path, data: bz2.open(path, "wb").write(data),
+    ".gz": lambda path, data: gzip.open(path, "wb").write(data),
+    ".zst": lambda path, data: open(path, "wb").write(zstandard.ZstdCompressor().compress(data)),
+    ".json": lambda path, data: open(path, "wb").write(data),
+}
+
+
+def create_messages(count):
+    return [
+        {"op": "mcm", "pt": pt, "clk": str(pt), "mc": [{"id": "1.1", "rc": [{"id": 1, "ltp": pt}]}]}
+        for pt in range(count)
+    ]
+
+
+def write_file(tmp_path, extension, messages, line_ending=b"\n", trailing=True):
+    path = str(tmp_path / f"historical{extension}")
+    data = line_ending.join(json.dumps(m).encode() for m in messages) + (line_ending if trailing else b"")
+
+    WRITERS[extension](path, data)
+
+    return path
+
+
+@pytest.mark.parametrize("extension", list(WRITERS))
+def test_read_compressed_files(tmp_path, extension):
+    messages = create_messages(100)
+    path = write_file(tmp_path, extension, messages)
+
+    assert list(read_historical_messages(path, chunk_size=100)) == messages
+    assert [json.loads(line) for line in read_historical_file(path, chunk_size=100)] == messages
+
+
+@settings(max_examples=50, deadline=None)
+@given(
+    count=st.integers(min_value=0, max_value=30),
+    chunk_size=st.integers(min_value=1, max_value=500),
+    line_ending=st.sampled_from([b"\n", b"\r\n"]),
+    trailing=st.booleans(),
+)
+def test_chunk_boundaries(tmp_path_factory, count, chunk_size, line_ending, trailing):
+    messages = create_messages(count)
+    path = write_file(tmp_path_factory.mktemp("historical"), ".json", messages, line_ending, trailing)
+
+    batches = list(read_historical_batches(path, chunk_size=chunk_size))
+
+    assert [m for batch in batches for m in batch] == messages
+    assert all(batches)
+    assert list(read_historical_file(path, chunk_size=chunk_size)) == [json.dumps(m).encode() for m in messages]
+
+
+def test_chunks_are_bounded(tmp_path):
+    path = write_file(tmp_path, ".bz2", create_messages(1000))
+    line_length = len(json.dumps(create_messages(1000)[-1])) + 1
+
+    for lines in read_historical_chunks(path, chunk_size=4096):
+        assert len(lines) <= 4096 // (line_length - 10) + 1
+        assert len(lines[0].obj) <= 4096 + line_length
@@ -0,0 +1,179 @@
+import json
+import os
+import socket
+import threading
+from test.test_betfair_connection import fake_betfair
+
+import pytest
+
+from betfairstreamer import codec
+from betfairstreamer.helpers.stream_helpers import create_market_subscription, create_order_subscription
+from betfairstreamer.historical.reader import read_historical_file
+from betfairstreamer.historical.recorder import StreamRecorder, available_compressions
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.stream import betfair_connection
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.stream.betfair_connection_pool import BetfairConnectionPool
+
+
+def create_frame(market_id, pt, ltp=1.5):
+    market_change = {"id": market_id, "rc": [{"id": 1, "ltp": ltp}]}
+
+    if pt == 1:
+        market_change["img"] = True
+        market_change["marketDefinition"] = {"runners": [{"id": 1, "sortPriority": 1}]}
+
+    return json.dumps({"op": "mcm", "id": 1, "clk": str(pt), "pt": pt, "mc": [market_change]}).encode()
+
+
+def read_recording(paths):
+    return [line for path in sorted(paths) for line in read_historical_file(path)]
+
+
+@pytest.mark.parametrize("compression", available_compressions())
+def test_recordings_read_back_as_historical_files(tmp_path, compression):
+    frames = [create_frame("1.1", pt, ltp=pt) for pt in range(1, 100)]
+
+    recorder = StreamRecorder(directory=str(tmp_path), compression=compression).start()
+
+    for i in range(0, len(frames), 10):
+        assert recorder.record(frames[i : i + 10])
+
+    recorder.close()
+
+    assert len(os.listdir(tmp_path)) == 1
+    assert read_recording(recorder.closed_files) == frames
+    assert recorder.recorded == len(frames)
+
+    market_cache = MarketCache()
+
+    for line in read_historical_file(recorder.closed_files[0]):
+        market_cache(codec.loads(line))
+
+    assert market_cache.market_books["1.1"].metadata[0, 0] == 99
+
+
+def test_rotation_per_stream_id(tmp_path):
+    frames = [create_frame("1.1", pt) for pt in range(1, 50)]
+
+    recorder = StreamRecorder(directory=str(tmp_path), compression="none", max_bytes=1000)
+
+    for frame in frames:
+        recorder.record([frame], stream_id=1)
+        recorder.record([frame], stream_id=2)
+
+    recorder.close()
+
+    for stream_id in (1, 2):
+        paths = [p for p in recorder.closed_files if os.path.basename(p).startswith(f"stream-{stream_id}-")]
+
+        assert len(paths) > 1
+        assert read_recording(paths) == frames
+        assert all(os.path.getsize(p) < 1000 + len(frames[0]) + 1 for p in paths)
+
+
+def test_full_queue_drops_frames(tmp_path):
+    recorder = StreamRecorder(directory=str(tmp_path), queue_size=1)
+
+    assert recorder.record([b"1", b"2"])
+    assert not recorder.record([b"3"])
+    assert recorder.dropped == 1
+
+    recorder.close()
+
+    assert read_recording(recorder.closed_files) == [b"1", b"2"]
+
+
+def test_pool_records_raw_frames(tmp_path):
+    recorder = StreamRecorder(directory=str(tmp_path), compression="gzip").start()
+    pool = BetfairConnectionPool(timeout=1000, recorder=recorder)
+    peers = []
+
+    for subscription_id in (1, 2):
+        s1, s2 = socket.socketpair()
+        pool.add_connection(BetfairConnection(connection=s1, app_key="", subscription_message={"id": subscription_id}))
+        peers.append(s2)
+
+    heartbeat = b'{"op":"mcm","id":1,"ct":"HEARTBEAT","clk":"2","pt":2}'
+
+    peers[0].sendall(create_frame("1.1", 1) + b"\r\n" + heartbeat + b"\r\n")
+    peers[1].sendall(create_frame("1.2", 1) + b"\r\n")
+
+    received = 0
+
+    for batch in pool.read_batches(market_cache=MarketCache()):
+        received += len(batch)
+
+        if received == 3:
+            break
+
+    recorder.close()
+
+    recordings = {os.path.basename(p).split("-")[1]: read_recording([p]) for p in recorder.closed_files}
+
+    assert recordings == {"stream_1": [create_frame("1.1", 1), heartbeat], "stream_2": [create_frame("1.2", 1)]}
+
+
+def test_recordings_per_connection_without_handshake(tmp_path, monkeypatch):
+    peers = []
+
+    def create_socket(*args):
+        s1, s2 = socket.socketpair()
+        peers.append(s2)
+        threading.Thread(target=fake_betfair, args=(s2, [], [create_frame("1.1", 1)])).start()
+        return s1
+
+    monkeypatch.setattr(betfair_connection, "create_betfair_socket", create_socket)
+
+    recorder = StreamRecorder(directory=str(tmp_path), compression="none").start()
+
+    # Both subscriptions have id 1.
+    for subscription_message in [create_market_subscription(), create_order_subscription()]:
+        connection = BetfairConnection(app_key="", recorder=recorder)
+        connection.connect("token", subscription_message)
+        connection.read()
+        connection.close()
+
+    recorder.close()
+
+    for peer in peers:
+        peer.close()
+
+    recordings = {os.path.basename(p).split("-")[1]: read_recording([p]) for p in recorder.closed_files}
+
+    assert recordings == {"market_1": [create_frame("1.1", 1)], "order_1": [create_frame("1.1", 1)]}
+    assert recorder.register("market_1") == "market_1_2"
+
+
+def test_record_raises_when_the_writer_fails(tmp_path):
+    recorder = StreamRecorder(directory=str(tmp_path), compression="none", queue_size=1, block=True)
+
+    def fail(stream_id, frames):
+        raise OSError("disk full")
+
+    recorder.write = fail
+    recorder.start()
+    recorder.thread.join(0)
+    recorder.record([b"1"])
+    recorder.thread.join(5)
+
+    with pytest.raises(RuntimeError):
+        for _ in range(3):
+            recorder.record([b"2"])
+
+    with pytest.raises(OSError):
+        recorder.close()
+
+
+def test_close_times_out(tmp_path):
+    recorder = StreamRecorder(directory=str(tmp_path), compression="none")
+    release = threading.Event()
+    recorder.write = lambda stream_id, frames: release.wait()
+    recorder.start()
+    recorder.record([b"1"])
+
+    with pytest.raises(TimeoutError):
+        recorder.close(timeout=0.1)
+
+    release.set()
+    recorder.close()
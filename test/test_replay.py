@@ -0,0 +1,81 @@
+import bz2
+import json
+
+from betfairstreamer.historical.replay import ReplayProgress, replay_files
+
+
+def create_historical_file(path, market_id, updates):
+    lines = []
+
+    for pt in range(1, updates + 1):
+        market_change = {"id": market_id, "rc": [{"id": 1, "ltp": pt}]}
+
+        if pt == 1:
+            market_change["img"] = True
+            market_change["marketDefinition"] = {"runners": [{"id": 1, "sortPriority": 1}]}
+
+        lines.append(json.dumps({"op": "mcm", "clk": str(pt), "pt": pt, "mc": [market_change]}))
+
+    with bz2.open(path, "wt") as f:
+        f.write("\n".join(lines) + "\n")
+
+    return str(path)
+
+
+def last_traded_price(market_book):
+    return market_book.market_id, float(market_book.metadata[0, 0])
+
+
+def even_prices(market_book):
+    ltp = market_book.metadata[0, 0]
+
+    if ltp == 3:
+        raise ValueError("Broken market")
+
+    return ltp if ltp % 2 == 0 else None
+
+
+def test_ordered_replay(tmp_path):
+    files = [create_historical_file(tmp_path / f"1.{i}.bz2", f"1.{i}", 5 + i) for i in range(6)]
+
+    results = list(replay_files(files, last_traded_price, processes=2))
+
+    assert [r.path for r in results] == files
+    assert all(r.ok for r in results)
+
+    for i, result in enumerate(results):
+        assert result.messages == result.market_books == 5 + i
+        assert result.results == [(f"1.{i}", float(pt)) for pt in range(1, 6 + i)]
+
+
+def test_unordered_replay_reports_progress_and_errors(tmp_path):
+    files = [create_historical_file(tmp_path / f"1.{i}.bz2", f"1.{i}", 4) for i in range(4)]
+    files.insert(2, str(tmp_path / "missing.bz2"))
+
+    progress = []
+
+    def report(replay_progress: ReplayProgress, result):
+        progress.append((replay_progress.completed, replay_progress.failed, result.path))
+
+    results = list(replay_files(files, even_prices, processes=2, ordered=False, progress=report))
+
+    assert sorted(r.path for r in results) == sorted(files)
+    assert [c for c, _, _ in progress] == [1, 2, 3, 4, 5]
+    assert progress[-1][1] == 5
+
+    for result in results:
+        assert not result.ok
+
+        if result.path.endswith("missing.bz2"):
+            assert "FileNotFoundError" in result.error
+        else:
+            assert "Broken market" in result.error
+            assert result.results == [2.0]
+
+
+def test_replay_in_process(tmp_path):
+    files = [create_historical_file(tmp_path / "1.1.bz2", "1.1", 3)]
+
+    results = list(replay_files(files, last_traded_price, processes=0))
+
+    assert results[0].results == [("1.1", 1.0), ("1.1", 2.0), ("1.1", 3.0)]
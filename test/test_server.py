@@ -0,0 +1,199 @@
+import bz2
+import json
+import shutil
+import ssl
+import subprocess
+import time
+
+import pytest
+
+from betfairstreamer.helpers.stream_helpers import create_market_subscription
+from betfairstreamer.historical.reader import read_historical_file
+from betfairstreamer.server import StreamServer, market_filter_matches
+from betfairstreamer.stream.betfair_connection import BetfairConnection
+from betfairstreamer.utils import decode
+
+
+def historical_message(pt, market_id, event_type_id=None):
+    market_change = {"id": market_id, "rc": [{"id": 1, "ltp": 2.0}]}
+
+    if event_type_id is not None:
+        market_change["img"] = True
+        market_change["marketDefinition"] = {"eventTypeId": event_type_id, "runners": [{"id": 1, "sortPriority": 1}]}
+
+    return {"op": "mcm", "clk": str(pt), "pt": pt, "mc": [market_change]}
+
+
+@pytest.fixture
+def historical_file(tmp_path):
+    path = tmp_path / "1.1.bz2"
+    messages = [
+        historical_message(1000, "1.1", "7"),
+        historical_message(1010, "1.2", "1"),
+        historical_message(1100, "1.1"),
+        historical_message(1200, "1.2"),
+        historical_message(1300, "1.1"),
+    ]
+
+    with bz2.open(path, "wb") as f:
+        f.write(b"\n".join(json.dumps(m).encode() for m in messages) + b"\n")
+
+    return str(path)
+
+
+def read_messages(connection, count):
+    messages = []
+
+    while len(messages) < count:
+        messages.extend(decode(m) for m in connection.read())
+
+    return messages
+
+
+def test_read_historical_file(historical_file):
+    assert [json.loads(line)["pt"] for line in read_historical_file(historical_file)] == [1000, 1010, 1100, 1200, 1300]
+
+
+def test_market_filter_matches():
+    assert market_filter_matches({}, "1.1", None)
+    assert market_filter_matches({"marketIds": ["1.1"]}, "1.1", None)
+    assert not market_filter_matches({"marketIds": ["1.2"]}, "1.1", None)
+    assert market_filter_matches({"eventTypeIds": ["7"]}, "1.1", {"eventTypeId": "7"})
+    assert not market_filter_matches({"eventTypeIds": ["7"]}, "1.1", {"eventTypeId": "1"})
+    assert not market_filter_matches({"eventTypeIds": ["7"]}, "1.1", None)
+
+
+def test_replay_filters_by_market_filter(historical_file):
+    server = StreamServer(files=[historical_file], speed=0)
+    server.start()
+    host, port = server.address
+
+    connection = BetfairConnection(app_key="", hostname=host, port=port, use_ssl=False)
+    connection.connect("token", create_market_subscription(event_type_ids=["7"], stream_id=3))
+
+    messages = read_messages(connection, 3)
+
+    assert [m["pt"] for m in messages] == [1000, 1100, 1300]
+    assert {mc["id"] for m in messages for mc in m["mc"]} == {"1.1"}
+    assert messages[0]["ct"] == "SUB_IMAGE"
+    assert {m["id"] for m in messages} == {3}
+    assert connection.stream_state.clk == "1300"
+
+    connection.close()
+    server.stop()
+
+
+def test_replay_at_real_time_speed(historical_file):
+    server = StreamServer(files=[historical_file], speed=2)
+    server.start()
+    host, port = server.address
+
+    connection = BetfairConnection(app_key="", hostname=host, port=port, use_ssl=False)
+
+    start = time.monotonic()
+    connection.connect("token", create_market_subscription(heartbeat_ms=500))
+
+    assert len(read_messages(connection, 5)) == 5
+    assert time.monotonic() - start >= 0.15
+
+    connection.close()
+    server.stop()
+
+
+def test_authentication_failure(historical_file):
+    server = StreamServer(files=[historical_file], speed=0, session_token="secret")
+    server.start()
+    host, port = server.address
+
+    connection = BetfairConnection(app_key="", hostname=host, port=port, use_ssl=False)
+
+    with pytest.raises(ConnectionError):
+        connection.connect("token", create_market_subscription())
+
+    connection.close()
+    server.stop()
+
+
+@pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl is needed for a self-signed certificate")
+def test_replay_over_tls(historical_file, tmp_path):
+    certfile, keyfile = str(tmp_path / "cert.pem"), str(tmp_path / "key.pem")
+
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost"]
+        + ["-addext", "subjectAltName=IP:127.0.0.1", "-keyout", keyfile, "-out", certfile],
+        check=True,
+        capture_output=True,
+    )
+
+    server = StreamServer(files=[historical_file], speed=0, certfile=certfile, keyfile=keyfile)
+    server.start()
+    host, port = server.address
+
+    ssl_context = ssl.create_default_context(cafile=certfile)
+    connection = BetfairConnection(app_key="", hostname=host, port=port, ssl_context=ssl_context)
+    connection.connect("token", create_market_subscription())
+
+    assert [m["pt"] for m in read_messages(connection, 5)] == [1000, 1010, 1100, 1200, 1300]
+
+    connection.close()
+    server.stop()
+
+
+def test_requests_after_replay(historical_file):
+    server = StreamServer(files=[historical_file], speed=0)
+    server.start()
+    host, port = server.address
+
+    connection = BetfairConnection(app_key="", hostname=host, port=port, use_ssl=False)
+    connection.connect("token", create_market_subscription(stream_id=3))
+
+    assert len(read_messages(connection, 5)) == 5
+
+    connection.send({"op": "heartbeat", "id": 9})
+
+    assert read_messages(connection, 1) == [{"op": "status", "id": 9, "statusCode": "SUCCESS"}]
+
+    connection.send(create_market_subscription(market_ids=["1.2"], stream_id=4))
+    messages = read_messages(connection, 3)
+
+    assert messages[0] == {"op": "status", "id": 4, "statusCode": "SUCCESS"}
+    assert [m["pt"] for m in messages[1:]] == [1010, 1200]
+    assert {m["id"] for m in messages[1:]} == {4}
+
+    connection.close()
+    server.stop()
+
+
+def test_resubscription_resumes_after_clk(historical_file):
+    server = StreamServer(files=[historical_file], speed=0)
+    server.start()
+    host, port = server.address
+
+    subscription = create_market_subscription()
+    subscription.update({"initialClk": "1000", "clk": "1100"})
+
+    connection = BetfairConnection(app_key="", hostname=host, port=port, use_ssl=False)
+    connection.connect("token", subscription)
+
+    messages = read_messages(connection, 2)
+
+    assert [m["pt"] for m in messages] == [1200, 1300]
+    assert messages[0]["ct"] == "RESUB_DELTA"
+    assert messages[0]["initialClk"] == "1000"
+
+    subscription.update({"clk": "unknown"})
+    connection.connect("token", subscription)
+
+    assert read_messages(connection, 1)[0]["ct"] == "SUB_IMAGE"
+
+    connection.close()
+    server.stop()
+
+
+def test_stop_unblocks_accept(historical_file):
+    server = StreamServer(files=[historical_file])
+    thread = server.start()
+    server.stop()
+    thread.join(5)
+
+    assert not thread.is_alive()
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+import zmq
+
+from betfairstreamer.stream.sharded_pipeline import ShardedMarketProcessor, ShardRouter, shard_for_market
+
+
+def noop(market_books):
+    pass
+
+
+def ipc_paths(processor):
+    return [url[len("ipc://") :] for url in processor.urls]
+
+
+def test_router_forwards_and_splits_by_market():
+    context = zmq.Context()
+    pull_sockets = []
+    push_sockets = []
+
+    for shard in range(2):
+        pull = context.socket(zmq.PULL)
+        pull.bind(f"inproc://shard-{shard}")
+        push = context.socket(zmq.PUSH)
+        push.connect(f"inproc://shard-{shard}")
+        pull_sockets.append(pull)
+        push_sockets.append(push)
+
+    market_ids = ["1.100", "1.101", "1.102", "1.103"]
+    shards = [shard_for_market(m, 2) for m in market_ids]
+
+    assert shards == [shard_for_market(m, 2) for m in market_ids]
+    assert set(shards) == {0, 1}
+
+    router = ShardRouter(sockets=push_sockets)
+
+    single = json.dumps({"op": "mcm", "pt": 1, "mc": [{"id": "1.100", "rc": []}]}).encode()
+    multiple = json.dumps({"op": "mcm", "pt": 2, "mc": [{"id": m, "rc": []} for m in market_ids]}).encode()
+
+    router.route(b'{"op":"mcm","id":1,"clk":"A","pt":1,"ct":"HEARTBEAT"}')
+    router.route(single)
+    router.route(multiple)
+
+    assert pull_sockets[shards[0]].recv() == single
+
+    for shard, pull in enumerate(pull_sockets):
+        message = json.loads(pull.recv())
+        assert message["pt"] == 2
+        assert [mc["id"] for mc in message["mc"]] == [m for m, s in zip(market_ids, shards) if s == shard]
+
+    assert (router.frames_forwarded, router.frames_split, router.frames_ignored) == (1, 1, 1)
+
+    for s in pull_sockets + push_sockets:
+        s.close(linger=0)
+
+    context.term()
+
+
+def test_processor_stops_and_removes_ipc_files():
+    processor = ShardedMarketProcessor(shards=2, handler=noop)
+    processor.start()
+
+    paths = ipc_paths(processor)
+
+    assert all(os.path.exists(path) for path in paths)
+    assert ShardedMarketProcessor(shards=2, handler=noop).url_template != processor.url_template
+
+    market_definition = {"runners": [{"id": 1, "sortPriority": 1}]}
+
+    for i in range(4):
+        market_change = {"id": "1.10" + str(i), "img": True, "marketDefinition": market_definition}
+        processor.route(json.dumps({"op": "mcm", "pt": 1, "mc": [market_change]}).encode())
+
+    statistics = processor.stop()
+
+    assert [s.shard for s in statistics] == [0, 1]
+    assert sum(s.messages for s in statistics) == 4
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_processor_stop_raises_for_a_dead_shard():
+    processor = ShardedMarketProcessor(shards=2, handler=noop)
+    processor.start()
+
+    paths = ipc_paths(processor)
+
+    processor.processes[1].kill()
+    processor.processes[1].join()
+
+    with pytest.raises(RuntimeError):
+        processor.stop(timeout=5)
+
+    assert not processor.processes
+    assert not any(os.path.exists(path) for path in paths)
@@ -0,0 +1,259 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from betfairstreamer import codec
+from betfairstreamer.models import shared_market_store
+from betfairstreamer.models.market_book import COMPACT_LAYOUT, FULL_PRICE_LADDER_INDEX
+from betfairstreamer.models.market_cache import MarketCache
+from betfairstreamer.models.shared_market_store import (
+    DEFINITION_LENGTH,
+    DEFINITION_VERSION,
+    SEQUENCE,
+    SharedMarketStore,
+)
+
+MARKET_DEFINITION = {"runners": [{"id": 10, "sortPriority": 1}, {"id": 20, "sortPriority": 2}]}
+
+
+def image(market_id, ltp, market_definition=MARKET_DEFINITION):
+    market_change = {"id": market_id, "img": True, "marketDefinition": market_definition}
+    market_change["rc"] = [{"id": 10, "ltp": ltp, "atb": [[1.5, 10]], "bdatb": [[0, 1.5, 10]], "trd": [[1.5, 3]]}]
+
+    return {"op": "mcm", "pt": 1, "mc": [market_change]}
+
+
+def delta(market_id, ltp, pt=2):
+    return {"op": "mcm", "pt": pt, "mc": [{"id": market_id, "rc": [{"id": 20, "ltp": ltp}]}]}
+
+
+@pytest.fixture
+def store():
+    store = SharedMarketStore.create(capacity=4)
+    yield store
+    store.unlink()
+
+
+def test_market_cache_writes_into_shared_memory(store):
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5))
+    market_cache(delta("1.1", 3.0))
+
+    reader = SharedMarketStore.attach(store.name)
+
+    assert reader.market_ids() == ["1.1"]
+
+    market_book = market_cache.market_books["1.1"]
+    snapshot = reader.snapshot("1.1")
+
+    assert snapshot.market_definition == MARKET_DEFINITION
+    assert snapshot.sort_priority_mapping == {10: 1, 20: 2}
+
+    for name in ["metadata", "best_display", "best_offers", "full_price_ladder", "trd"]:
+        assert np.array_equal(getattr(snapshot, name), getattr(market_book, name))
+
+    version = reader.version("1.1")
+    market_cache(delta("1.1", 4.0))
+
+    assert reader.version("1.1") == version + 2
+    assert reader.snapshot("1.1").metadata[1, 0] == 4.0
+    assert snapshot.metadata[1, 0] == 3.0
+    assert reader.snapshot("1.2") is None
+
+    reader.close()
+
+
+def test_readers_time_out_on_a_held_seqlock(store):
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5))
+
+    reader = SharedMarketStore.attach(store.name)
+    segment = reader.get_segment("1.1")
+
+    # A writer that died while holding the seqlock leaves the sequence odd.
+    segment.header[SEQUENCE] += 1
+
+    with pytest.raises(TimeoutError):
+        reader.snapshot("1.1", timeout=0.05)
+
+    segment.header[SEQUENCE] += 1
+    store.directory_header[0] += 1
+
+    with pytest.raises(TimeoutError):
+        reader.read_directory("1.2", timeout=0.05)
+
+    store.directory_header[0] += 1
+
+    assert reader.snapshot("1.1").metadata[0, 0] == 1.5
+
+    del segment
+    reader.close()
+
+
+@pytest.fixture
+def compact_store():
+    store = SharedMarketStore.create(capacity=4, layout=COMPACT_LAYOUT)
+    yield store
+    store.unlink()
+
+
+def test_compact_layout(compact_store):
+    market_cache = MarketCache(market_store=compact_store)
+    market_cache(image("1.1", 1.5))
+
+    reader = SharedMarketStore.attach(compact_store.name)
+    snapshot = reader.snapshot("1.1")
+    market_book = market_cache.market_books["1.1"]
+
+    assert reader.layout == COMPACT_LAYOUT
+    assert snapshot.compact
+    assert snapshot.full_price_ladder.dtype == np.float32
+    assert np.array_equal(snapshot.get_full_price_ladder(), market_book.get_full_price_ladder())
+    assert snapshot.get_trd()[0, FULL_PRICE_LADDER_INDEX[1.5]].tolist() == [1.5, 3]
+
+    reader.close()
+
+
+def test_definition_changes_and_new_images(store):
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5))
+
+    reader = SharedMarketStore.attach(store.name)
+    reader.snapshot("1.1")
+
+    # Reordered runners and a definition too large for the segment.
+    runners = [{"id": 20, "sortPriority": 1, "name": "x" * 5000}, {"id": 10, "sortPriority": 2}]
+    market_cache({"op": "mcm", "pt": 3, "mc": [{"id": "1.1", "marketDefinition": {"runners": runners}}]})
+
+    snapshot = reader.snapshot("1.1")
+
+    assert snapshot.sort_priority_mapping == {20: 1, 10: 2}
+    assert snapshot.market_definition["runners"][0]["name"] == "x" * 5000
+    assert np.array_equal(snapshot.full_price_ladder, market_cache.market_books["1.1"].full_price_ladder)
+    assert snapshot.full_price_ladder[1].any()
+
+    three_runners = {"runners": MARKET_DEFINITION["runners"] + [{"id": 30, "sortPriority": 3}]}
+    market_book = market_cache.market_books["1.1"]
+    market_cache(image("1.1", 2.5, three_runners))
+
+    # Market books handed out before the segment was replaced stay readable.
+    assert market_book.full_price_ladder[1].any()
+
+    snapshot = reader.snapshot("1.1")
+
+    assert snapshot.metadata.shape == (3, 2)
+    assert snapshot.metadata[0, 0] == 2.5
+
+    reader.close()
+
+
+def test_store_capacity(store):
+    market_cache = MarketCache(market_store=store)
+
+    for i in range(4):
+        market_cache(image(f"1.{i}", 1.5))
+
+    with pytest.raises(ValueError):
+        market_cache(image("1.5", 1.5))
+
+
+def read_ltp(name, queue):
+    reader = SharedMarketStore.attach(name)
+    queue.put(reader.snapshot("1.1").metadata[1, 0])
+    reader.close()
+
+
+def test_reader_process(store):
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5))
+    market_cache(delta("1.1", 7.0))
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=read_ltp, args=(store.name, queue))
+    process.start()
+    process.join(30)
+
+    assert queue.get(timeout=5) == 7.0
+    assert process.exitcode == 0
+
+
+def read_snapshots(name, seconds, queue):
+    reader = SharedMarketStore.attach(name)
+    deadline = time.monotonic() + seconds
+    names = set()
+    count = 0
+
+    while time.monotonic() < deadline:
+        names.add(reader.snapshot("1.1").market_definition["marketName"])
+        count += 1
+
+    queue.put((count, names))
+    reader.close()
+
+
+def test_snapshots_while_the_definition_changes(store):
+    definitions = [
+        {"marketName": "short", "runners": MARKET_DEFINITION["runners"]},
+        {"marketName": "long" * 200, "runners": MARKET_DEFINITION["runners"]},
+    ]
+
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5, definitions[0]))
+
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=read_snapshots, args=(store.name, 1.0, queue))
+    process.start()
+
+    i = 0
+
+    # Torn definitions would make the reader fail to decode them and exit without a result.
+    while process.is_alive():
+        i += 1
+        market_cache({"op": "mcm", "pt": 2 + i, "mc": [{"id": "1.1", "marketDefinition": definitions[i % 2]}]})
+
+    count, names = queue.get(timeout=5)
+
+    assert process.exitcode == 0
+    assert count > 0
+    assert names <= {"short", "long" * 200}
+
+
+def test_snapshot_retries_a_torn_definition(store, monkeypatch):
+    definitions = [
+        {"marketName": "short", "runners": MARKET_DEFINITION["runners"]},
+        {"marketName": "long" * 200, "runners": MARKET_DEFINITION["runners"]},
+    ]
+
+    market_cache = MarketCache(market_store=store)
+    market_cache(image("1.1", 1.5, definitions[0]))
+
+    reader = SharedMarketStore.attach(store.name)
+    segment = store.segments["1.1"]
+    definition = np.frombuffer(codec.dumps(definitions[1]), dtype=np.uint8)
+    get_cached_definition = SharedMarketStore.get_cached_definition
+
+    def start_write(self, *args):
+        # The writer starts replacing the definition after the reader read the sequence.
+        if segment.header[SEQUENCE] % 2 == 0 and segment.header[DEFINITION_VERSION] == 1:
+            segment.header[SEQUENCE] += 1
+            segment.definition[:10] = definition[:10]
+            segment.header[DEFINITION_LENGTH] = len(definition)
+
+        return get_cached_definition(self, *args)
+
+    def finish_write(*args):
+        if segment.header[SEQUENCE] % 2:
+            segment.definition[: len(definition)] = definition
+            segment.header[DEFINITION_VERSION] += 1
+            segment.header[SEQUENCE] += 1
+
+    monkeypatch.setattr(SharedMarketStore, "get_cached_definition", start_write)
+    monkeypatch.setattr(shared_market_store, "wait_for_writer", finish_write)
+
+    assert reader.snapshot("1.1").market_definition == definitions[1]
+    assert segment.header[DEFINITION_VERSION] == 2
+
+    del segment
+    reader.close()
@@ -0,0 +1,40 @@
+from test.generators import generate_message
+
+import hypothesis.strategies as st
+from hypothesis import given
+
+from betfairstreamer.stream.stream_parser import BufferParser, Parser
+
+
+def split(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@given(part_size=st.integers(1, 100), msg=generate_message())
+def test_buffer_parser_matches_parser(part_size, msg):
+    count, byte_msg, _ = msg
+
+    parser = Parser()
+    buffer_parser = BufferParser()
+
+    messages = []
+    buffer_messages = []
+
+    for part in split(byte_msg, part_size):
+        messages.extend(parser.parse_message(part))
+        buffer_messages.extend(buffer_parser.parse_message(part))
+
+    assert buffer_messages == messages == byte_msg.split(b"\r\n")[:-1]
+    assert len(buffer_messages) == count
+
+
+def test_buffer_parser_frames_survive_next_feed():
+    parser = BufferParser()
+
+    frames = parser.parse_frames(b'{"op":"mcm"}\r\n{"op":')
+
+    parser.feed(b'"status"}\r\n')
+
+    assert bytes(frames[0]) == b'{"op":"mcm"}'
+    assert [bytes(f) for f in parser.frames()] == [b'{"op":"status"}']
+    assert parser.flush() == b""